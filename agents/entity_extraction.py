@@ -0,0 +1,158 @@
+# agents/entity_extraction.py
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from atomic_agents.agents.base_agent import BaseAgent
+from agents.entity_agent import create_entity_agent, EntityAgentInputSchema, EntityAgentOutputSchema
+from config.config import config
+
+ENTITY_MAX_WORKERS = config.get("entity_max_workers", 4)
+ENTITY_OVERLAP_CHUNKS = config.get("entity_overlap_chunks", 1)
+PARTY_SIMILARITY = 0.9
+OBLIGATION_SIMILARITY = 0.85
+
+_COMPANY_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "co", "company", "llc", "llp", "lp", "ltd", "limited", "plc", "gmbh", "ag", "bv", "nv", "sa", "pvt", "private"}
+_DATE_FORMATS = ["%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y", "%Y-%m-%d", "%m/%d/%Y", "%d.%m.%Y", "%B %Y"]
+# A duration on its own, optionally with the number spelled out first: "30 days", "thirty (30) days" (folded)
+_DURATION_RE = re.compile(r"(?:[a-z-]+ )?(\d+) (business day|day|week|month|year)s?")
+_CURRENCIES = {"$": "USD", "usd": "USD", "dollar": "USD", "dollars": "USD", "€": "EUR", "eur": "EUR", "euro": "EUR", "euros": "EUR",
+               "£": "GBP", "gbp": "GBP", "₹": "INR", "inr": "INR", "rs": "INR", "rupees": "INR"}
+_MULTIPLIERS = {"thousand": 1000, "k": 1000, "million": 1000000, "m": 1000000, "mn": 1000000, "billion": 1000000000, "bn": 1000000000}
+_CURRENCY_PATTERN = r"\$|€|£|₹|usd|eur|gbp|inr|rs|dollars?|euros?|rupees"
+_MONEY_RE = re.compile(
+    rf"(?P<before>{_CURRENCY_PATTERN})?\.?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<multiplier>thousand|million|billion|bn|mn|k|m)?\b\s*(?P<after>{_CURRENCY_PATTERN})?"
+)
+
+def _fold(text: str) -> str:
+    """Casefolded text without punctuation and with single spaces."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(re.sub(r"[^\w\s$€£₹%./-]", " ", text).split())
+
+def party_key(name: str) -> str:
+    words = re.sub(r"[^\w\s]", " ", unicodedata.normalize("NFKC", name).casefold()).split()
+    while len(words) > 1 and words[-1] in _COMPANY_SUFFIXES:
+        words.pop()
+    if words and words[0] == "the":
+        words.pop(0)
+    return " ".join(words)
+
+def date_key(value: str) -> str:
+    """ISO date if the whole value is a date, "<n> <unit>" if it is a duration, folded text otherwise.
+
+    Values that only mention a date or duration ("Notice period of 30 days") keep their own text,
+    so different terms of the same length are not merged.
+    """
+    text = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", _fold(value)).replace(",", " ")
+    text = " ".join(text.split()).rstrip(".")
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    duration = _DURATION_RE.fullmatch(text)
+    if duration:
+        return f"{int(duration.group(1))} {duration.group(2)}"
+    return text
+
+def money_key(value: str) -> Hashable:
+    """(currency, amount) if the whole value is an amount with a currency marker, folded text otherwise.
+
+    Values that only mention an amount ("$5,000 deposit") or have no currency ("2%") keep their own text.
+    """
+    match = _MONEY_RE.fullmatch(unicodedata.normalize("NFKC", value).casefold().strip().rstrip(".;,"))
+    if not match or not (match.group("before") or match.group("after")):
+        return _fold(value)
+    try:
+        amount = Decimal(match.group("amount").replace(",", ""))
+    except InvalidOperation:
+        return _fold(value)
+    if match.group("multiplier"):
+        amount *= _MULTIPLIERS[match.group("multiplier")]
+    currency = _CURRENCIES.get(match.group("before") or match.group("after") or "", "")
+    return currency, amount.normalize()
+
+def dedupe(values: List[str], key: Callable[[str], Hashable], similarity: float = None) -> List[str]:
+    """Keeps the first occurrence of each value, in order.
+
+    Values are duplicates when their keys are equal or, with a similarity threshold, when their
+    string keys are at least that similar (difflib ratio).
+    """
+    kept, kept_keys = [], []
+    for value in values:
+        if not value or not value.strip():
+            continue
+        value_key = key(value)
+        duplicate = value_key in kept_keys or (
+            similarity is not None
+            and isinstance(value_key, str)
+            and any(isinstance(k, str) and SequenceMatcher(None, value_key, k).ratio() >= similarity for k in kept_keys)
+        )
+        if not duplicate:
+            kept.append(value.strip())
+            kept_keys.append(value_key)
+    return kept
+
+def reduce_insights(insights: List[EntityAgentOutputSchema]) -> EntityAgentOutputSchema:
+    """Merges per-chunk insights into one, deterministically for a given chunk order."""
+    return EntityAgentOutputSchema(
+        parties=dedupe([p for i in insights for p in i.parties], party_key, PARTY_SIMILARITY),
+        dates_and_durations=dedupe([d for i in insights for d in i.dates_and_durations], date_key),
+        monetary_values=dedupe([m for i in insights for m in i.monetary_values], money_key),
+        obligated_actions=dedupe([o for i in insights for o in i.obligated_actions], _fold, OBLIGATION_SIMILARITY),
+    )
+
+def extract_chunk_entities(chunk: str, context: List[str], agent_factory: Callable[[], BaseAgent] = create_entity_agent) -> EntityAgentOutputSchema:
+    """Extracts the entities of one chunk with a fresh agent, given the text of neighbouring chunks."""
+    return agent_factory().run(EntityAgentInputSchema(chunk=chunk, context_so_far=context, prior_insights=[]))
+
+def extract_entities_parallel(chunks: List[str], max_workers: int = ENTITY_MAX_WORKERS, overlap: int = ENTITY_OVERLAP_CHUNKS, agent_factory: Callable[[], BaseAgent] = create_entity_agent, on_progress: Optional[Callable[[int, int], None]] = None) -> List[EntityAgentOutputSchema]:
+    """Map step: extracts entities from every chunk concurrently, returning insights in chunk order.
+
+    Each chunk sees the text of up to `overlap` neighbouring chunks on either side instead of the
+    insights of earlier chunks, so no call waits for another. Every call gets a fresh agent because
+    BaseAgent keeps its conversation in memory. on_progress(done, total) is called from the calling
+    thread as extractions finish.
+    """
+    def extract(index: int) -> EntityAgentOutputSchema:
+        context = chunks[max(0, index - overlap):index] + chunks[index + 1:index + 1 + overlap]
+        return extract_chunk_entities(chunks[index], context, agent_factory)
+
+    insights: List[Optional[EntityAgentOutputSchema]] = [None] * len(chunks)
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        futures = {executor.submit(extract, index): index for index in range(len(chunks))}
+        for done, future in enumerate(as_completed(futures), start=1):
+            insights[futures[future]] = future.result()
+            if on_progress:
+                on_progress(done, len(chunks))
+    return insights
+
+# Chunk and aggregate property names of the stored insight fields.
+STORED_ENTITY_FIELDS = {"parties": "parties", "dates": "dates_and_durations", "amounts": "monetary_values", "obligations": "obligated_actions"}
+
+def insight_to_properties(insight: EntityAgentOutputSchema) -> Dict[str, List[str]]:
+    return {name: list(getattr(insight, field)) for name, field in STORED_ENTITY_FIELDS.items()}
+
+def properties_to_insight(properties: Dict[str, Any]) -> EntityAgentOutputSchema:
+    return EntityAgentOutputSchema(**{field: list(properties.get(name) or []) for name, field in STORED_ENTITY_FIELDS.items()})
+
+class ChunkEntityExtractor:
+    """The entity stage of ingestion (see core.document.ingestion_pipeline.ingest_document).
+
+    extract() maps one chunk to its entity properties; reduce() merges the stored entity properties
+    of all chunks of a document into the aggregate record.
+    """
+    def __init__(self, agent_factory: Callable[[], BaseAgent] = create_entity_agent):
+        self.agent_factory = agent_factory
+
+    def extract(self, chunk: str, context: List[str]) -> Dict[str, List[str]]:
+        return insight_to_properties(extract_chunk_entities(chunk, context, self.agent_factory))
+
+    def reduce(self, chunk_properties: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        return insight_to_properties(reduce_insights([properties_to_insight(p) for p in chunk_properties]))
@@ -6,8 +6,9 @@ from atomic_agents.lib.base.base_io_schema import BaseIOSchema
 
 #from schemas.final_answer import FinalAnswerInputSchema, FinalAnswerOutputSchema
 from core.llm.atomic_llm import get_llm_client
+from core.tracing import first_item_span
 from pydantic import BaseModel
-from typing import List
+from typing import Iterator, List
 
 class FinalAnswerInputSchema(BaseIOSchema):
     """Input schema for the Orchestrator Agent. Contains the user's message to be processed."""
@@ -20,20 +21,45 @@ class FinalAnswerOutputSchema(BaseIOSchema):
     answer: str
 
 
-final_answer_agent = BaseAgent(
-    BaseAgentConfig(
-        client=get_llm_client(),
-        model="gpt-4o-mini",
-        system_prompt_generator=SystemPromptGenerator(
-            background=[
-                "You are a final answer generator agent.",
-                "Your task is to take a query and supporting context from document search results and return a precise, concise answer."
-            ],
-            output_instructions=[
-                "Summarize or synthesize the information to answer the query clearly."
-            ]
-        ),
-        input_schema=FinalAnswerInputSchema,
-        output_schema=FinalAnswerOutputSchema
+def create_final_answer_agent() -> BaseAgent:
+    """A new final answer agent; built on first use by ui.app_context.AppContext."""
+    return BaseAgent(
+        BaseAgentConfig(
+            client=get_llm_client(),
+            model="gpt-4o-mini",
+            system_prompt_generator=SystemPromptGenerator(
+                background=[
+                    "You are a final answer generator agent.",
+                    "Your task is to take a query and supporting context from document search results and return a precise, concise answer."
+                ],
+                output_instructions=[
+                    "Summarize or synthesize the information to answer the query clearly."
+                ]
+            ),
+            input_schema=FinalAnswerInputSchema,
+            output_schema=FinalAnswerOutputSchema
+        )
     )
-)
+
+def stream_final_answer(agent: BaseAgent, final_input: FinalAnswerInputSchema) -> Iterator[str]:
+    """Yields the agent's answer text as it is generated, instead of waiting like agent.run().
+
+    Uses instructor's create_partial with the agent's system prompt, client and model, and yields
+    what each partial FinalAnswerOutputSchema adds to `answer`. In MD_JSON mode instructor only
+    parses the ```json block, so <think> output before it never shows up. The wait for the first
+    piece is timed as a "first_token" span. Unlike run(), the exchange is not added to the agent's
+    memory; each question is answered on its own.
+    """
+    messages = [
+        {"role": "system", "content": agent.system_prompt_generator.generate_prompt()},
+        {"role": "user", "content": final_input.model_dump_json()},
+    ]
+    return first_item_span(_answer_deltas(agent, messages))
+
+def _answer_deltas(agent: BaseAgent, messages: List[dict]) -> Iterator[str]:
+    streamed = ""
+    for partial in agent.client.chat.completions.create_partial(model=agent.model, response_model=FinalAnswerOutputSchema, messages=messages):
+        answer = partial.answer or ""
+        if len(answer) > len(streamed) and answer.startswith(streamed):
+            yield answer[len(streamed):]
+            streamed = answer
@@ -20,28 +20,30 @@ class MetadataMatcherOutputSchema(BaseIOSchema):
     matched_property: Optional[str] = None  # e.g., "page_numbers", "roles", etc.
     value: Optional[str] = None
     
-metadata_matcher_agent = BaseAgent(
-    BaseAgentConfig(
-        client=get_llm_client(),
-        model="gpt-4o-mini",
-        system_prompt_generator=SystemPromptGenerator(
-    background=[
-        "You are a metadata matcher agent.",
-        "Determine if a user query refers to any metadata fields in a document.",
-        "Valid metadata fields are: 'page_number'.",
-        "Your job is to check if the query mentions one of these fields."
-    ],
-    output_instructions=[
-        "Respond with one object only.",
-        "Return 'matches_metadata=True' if the query refers to a metadata field, and include 'matched_property' and 'value'.",
-        "Do not return multiple tool calls or lists of results."
-        "If it does NOT refer to metadata, return 'matches_metadata=False', and leave 'matched_property' and 'value' as None.",
-        "Do NOT ask for clarification or additional context.",
-        "Do NOT include anything outside of the response object."
-    ]
-)
-,
-        input_schema=MetadataMatcherInputSchema,
-        output_schema=MetadataMatcherOutputSchema
+def create_metadata_matcher_agent() -> BaseAgent:
+    """A new metadata matcher agent; built on first use by ui.app_context.AppContext."""
+    return BaseAgent(
+        BaseAgentConfig(
+            client=get_llm_client(),
+            model="gpt-4o-mini",
+            system_prompt_generator=SystemPromptGenerator(
+        background=[
+            "You are a metadata matcher agent.",
+            "Determine if a user query refers to any metadata fields in a document.",
+            "Valid metadata fields are: 'page_number'.",
+            "Your job is to check if the query mentions one of these fields."
+        ],
+        output_instructions=[
+            "Respond with one object only.",
+            "Return 'matches_metadata=True' if the query refers to a metadata field, and include 'matched_property' and 'value'.",
+            "Do not return multiple tool calls or lists of results."
+            "If it does NOT refer to metadata, return 'matches_metadata=False', and leave 'matched_property' and 'value' as None.",
+            "Do NOT ask for clarification or additional context.",
+            "Do NOT include anything outside of the response object."
+        ]
+    )
+    ,
+            input_schema=MetadataMatcherInputSchema,
+            output_schema=MetadataMatcherOutputSchema
+        )
     )
-)
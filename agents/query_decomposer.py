@@ -0,0 +1,131 @@
+# agents/query_decomposer.py
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from config.config import config
+from core.cache import LRUCache
+from core.tracing import add_to_span
+
+DECOMPOSE_BYPASS_ENABLED = config.get("decompose_bypass_enabled", True)
+DECOMPOSE_SIMPLE_MAX_WORDS = config.get("decompose_simple_max_words", 16)
+DECOMPOSE_CACHE_SIZE = config.get("decompose_cache_size", 512)
+
+_WORD_RE = re.compile(r"[\w'’-]+")
+# A conjunction that starts a second question ("... and when does it end?") rather than joining two nouns ("terms and conditions")
+_CLAUSE_CONJUNCTION_RE = re.compile(r"\b(?:and|or|but)\s+(?:what|which|who|whom|whose|when|where|why|how|whether|is|are|was|were|does|do|did|can|could|should|must|will|would|has|have)\b", re.IGNORECASE)
+# Two items joined in one question ("the term and the renewal period") are asked about separately,
+# except in fixed contract pairs that name a single thing
+_COORDINATION_RE = re.compile(r"\b(?:and|or)\b", re.IGNORECASE)
+_FIXED_PAIR_RE = re.compile(r"\b(?:terms and conditions|representations and warranties|successors and assigns|null and void)\b", re.IGNORECASE)
+_MULTI_PART_RE = re.compile(r"\b(?:as well as|in addition|additionally|also|along with|respectively|each of|all of the|list|compare|comparison|versus|vs\.?|difference|differences|differ|between)\b", re.IGNORECASE)
+# Sentence ends; a dot only counts before whitespace, so clause numbers like "14.1" don't split
+_SENTENCE_SPLIT_RE = re.compile(r"[?!;\n]+|\.(?=\s|$)")
+_ENUMERATION_RE = re.compile(r"(?:^|\s)(?:\d+[.)]|[a-z][.)]|[-*•])\s", re.IGNORECASE)
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: lowercased, whitespace collapsed, trailing punctuation dropped."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+def classify_query(query: str, max_words: int = DECOMPOSE_SIMPLE_MAX_WORDS) -> Tuple[bool, str]:
+    """(simple, reason): whether decomposition can be skipped for query, and why (not).
+
+    Only confident cases count as simple: one short question with no second clause, list, coordinated
+    items or comparison. Everything else goes to the decomposition agent, which may still keep it whole.
+    """
+    text = query.strip()
+    words = len(_WORD_RE.findall(text))
+    if words == 0:
+        return False, "empty"
+    if words > max_words:
+        return False, f"{words} words"
+    if text.count("?") > 1 or len([s for s in _SENTENCE_SPLIT_RE.split(text) if _WORD_RE.search(s)]) > 1:
+        return False, "several sentences or questions"
+    if _ENUMERATION_RE.search(text) or "," in text:
+        return False, "enumeration"
+    if _CLAUSE_CONJUNCTION_RE.search(text):
+        return False, "conjoined questions"
+    if _MULTI_PART_RE.search(text):
+        return False, "multi-part or comparison wording"
+    if _COORDINATION_RE.search(_FIXED_PAIR_RE.sub(" ", text)):
+        return False, "coordinated items"
+    return True, "short single question"
+
+class QueryDecomposer:
+    """Splits questions into sub-queries, calling the decomposition agent only when needed.
+
+    Questions that classify_query finds simple are passed through as they are, and agent results
+    are cached by normalize_query, so repeated questions skip the LLM round trip too. The agent is
+    only requested (and so built) on the first question that needs it. stats() reports how often
+    the LLM call was avoided and an estimate of the time that saved, from the mean agent latency.
+    """
+
+    def __init__(self, get_agent: Callable[[], Any], bypass_enabled: bool = DECOMPOSE_BYPASS_ENABLED, max_simple_words: int = DECOMPOSE_SIMPLE_MAX_WORDS, cache_size: int = DECOMPOSE_CACHE_SIZE):
+        self.get_agent = get_agent
+        self.bypass_enabled = bypass_enabled
+        self.max_simple_words = max_simple_words
+        self.cache = LRUCache(cache_size)
+        self.queries = 0
+        self.bypassed = 0
+        self.cache_hits = 0
+        self.llm_calls = 0
+        self.llm_unchanged = 0
+        self.llm_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def decompose(self, query: str) -> Tuple[List[str], str]:
+        """(sub_queries, source), where source is "bypass", "cache" or "llm"."""
+        with self._lock:
+            self.queries += 1
+        if self.bypass_enabled:
+            simple, _ = classify_query(query, self.max_simple_words)
+            if simple:
+                with self._lock:
+                    self.bypassed += 1
+                add_to_span(decompose_bypassed=1)
+                return [query], "bypass"
+
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._lock:
+                self.cache_hits += 1
+            add_to_span(decompose_cache_hits=1)
+            return list(cached), "cache"
+
+        from agents.decompose_query_agent import DecomposeInputSchema
+
+        start = time.perf_counter()
+        output = self.get_agent().run(DecomposeInputSchema(query=query))
+        seconds = time.perf_counter() - start
+        sub_queries = [q for q in (output.subqueries or []) if q.strip()] or [query]
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+            if len(sub_queries) == 1 and normalize_query(sub_queries[0]) == key:
+                self.llm_unchanged += 1
+        add_to_span(decompose_llm_calls=1)
+        self.cache.put(key, tuple(sub_queries))
+        return sub_queries, "llm"
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts by path, bypass and LLM-avoided rates, mean agent latency and estimated time saved.
+
+        llm_unchanged counts agent calls that returned the question as it was, i.e. calls a more
+        permissive classifier could have skipped.
+        """
+        with self._lock:
+            avoided = self.bypassed + self.cache_hits
+            mean_llm_seconds = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+            return {
+                "queries": self.queries,
+                "bypassed": self.bypassed,
+                "cache_hits": self.cache_hits,
+                "llm_calls": self.llm_calls,
+                "llm_unchanged": self.llm_unchanged,
+                "bypass_rate": self.bypassed / self.queries if self.queries else 0.0,
+                "llm_avoided_rate": avoided / self.queries if self.queries else 0.0,
+                "mean_llm_ms": mean_llm_seconds * 1000,
+                "saved_ms": avoided * mean_llm_seconds * 1000,
+            }
@@ -0,0 +1,173 @@
+# benchmarks/chunker_benchmark.py
+"""Throughput and memory of chunk_document on synthetic DI layouts.
+
+Each case (see synthetic_layout.CASES) is chunked with a FakeLLMClient, so no LM Studio is needed
+and embedding cost is only the fake's hashing plus the optional --embed-latency per request. For
+every case this reports sections/s and chunks/s (best of --repeat), the time split between
+reference resolution (building the ReferenceIndex), table rendering and embedding, and the
+tracemalloc peak from a separate run (tracemalloc slows everything down, so it is not timed).
+
+Results can be saved with --json and compared with an earlier run with --compare, e.g. before
+and after a change to the chunker:
+
+    python -m benchmarks.chunker_benchmark --json before.json
+    python -m benchmarks.chunker_benchmark --compare before.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_llm_client import FakeLLMClient
+from benchmarks.synthetic_layout import CASES, generate_layout
+from core.document import chunker
+
+PHASES = ("reference_index", "table_rendering", "embedding")
+
+@contextlib.contextmanager
+def _phase_timers(timings: Dict[str, float]):
+    """Adds the time spent in the chunker's phases to timings while active, by wrapping module globals."""
+    original_index = chunker.ReferenceIndex
+    original_table = chunker.extract_indexed_table_html
+    original_embeddings = chunker.get_embeddings
+
+    def timed(name, function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings[name] += time.perf_counter() - start
+        return wrapper
+
+    chunker.ReferenceIndex = timed("reference_index", original_index)
+    chunker.extract_indexed_table_html = timed("table_rendering", original_table)
+    chunker.get_embeddings = timed("embedding", original_embeddings)
+    try:
+        yield
+    finally:
+        chunker.ReferenceIndex = original_index
+        chunker.extract_indexed_table_html = original_table
+        chunker.get_embeddings = original_embeddings
+
+def _chunk(data: Dict[str, Any], client: FakeLLMClient, min_chunk_tokens: int) -> List[Any]:
+    # chunk_document prints per section and writes sections.txt / chunks.txt to the working directory
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return chunker.chunk_document(client, data, min_chunk_tokens, "fake-embedding", "benchmark.pdf")
+
+def run_case(name: str, params: Dict[str, Any], repeat: int = 3, min_chunk_tokens: int = chunker.MIN_CHUNK_TOKENS, embed_latency: float = 0.0) -> Dict[str, Any]:
+    data = generate_layout(**params)
+    best = None
+    for _ in range(repeat):
+        timings = dict.fromkeys(PHASES, 0.0)
+        client = FakeLLMClient(latency_seconds=embed_latency)
+        with _phase_timers(timings):
+            start = time.perf_counter()
+            chunks = _chunk(data, client, min_chunk_tokens)
+            seconds = time.perf_counter() - start
+        if best is None or seconds < best["seconds"]:
+            best = {"seconds": seconds, "chunks": len(chunks), "embedding_requests": client.requests, **{f"{phase}_seconds": timings[phase] for phase in PHASES}}
+
+    tracemalloc.start()
+    try:
+        _chunk(data, FakeLLMClient(latency_seconds=embed_latency), min_chunk_tokens)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    sections = len(data["sections"])
+    return {
+        "case": name,
+        "params": params,
+        "sections": sections,
+        "paragraphs": len(data["paragraphs"]),
+        "tables": len(data["tables"]),
+        **best,
+        "other_seconds": best["seconds"] - sum(best[f"{phase}_seconds"] for phase in PHASES),
+        "sections_per_second": sections / best["seconds"],
+        "chunks_per_second": best["chunks"] / best["seconds"],
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+
+def print_results(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]] = None):
+    header = f"{'case':<12} {'sections':>8} {'chunks':>7} {'total ms':>9} {'sect/s':>9} {'chunks/s':>9} {'refs ms':>8} {'tables ms':>9} {'embed ms':>9} {'other ms':>9} {'peak MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['case']:<12} {row['sections']:>8} {row['chunks']:>7} {row['seconds'] * 1000:>9.1f} {row['sections_per_second']:>9.0f} {row['chunks_per_second']:>9.0f} "
+            f"{row['reference_index_seconds'] * 1000:>8.1f} {row['table_rendering_seconds'] * 1000:>9.1f} {row['embedding_seconds'] * 1000:>9.1f} {row['other_seconds'] * 1000:>9.1f} {row['peak_memory_mb']:>8.1f}"
+        )
+    if not baseline:
+        return
+    print("\nChange vs baseline (negative is faster / smaller)")
+    for row in results:
+        old = baseline.get(row["case"])
+        if old is None:
+            print(f"{row['case']:<12} not in baseline")
+            continue
+        if old.get("params") != row["params"]:
+            print(f"{row['case']:<12} [WARN] case parameters differ from the baseline")
+        deltas = [f"{label} {(row[key] - old[key]) / old[key] * 100:+6.1f}%" for label, key in (("total", "seconds"), ("refs", "reference_index_seconds"), ("tables", "table_rendering_seconds"), ("embed", "embedding_seconds"), ("peak", "peak_memory_mb")) if old.get(key)]
+        print(f"{row['case']:<12} " + "  ".join(deltas))
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunk_document on synthetic Azure DI layouts.")
+    parser.add_argument("--cases", nargs="*", default=list(CASES), choices=list(CASES), help="Cases to run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the fastest is reported.")
+    parser.add_argument("--min-chunk-tokens", type=int, default=chunker.MIN_CHUNK_TOKENS)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds slept per embedding request, to simulate the server.")
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--compare", help="Results file of an earlier run to compare against.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = {row["case"]: row for row in json.load(f)["results"]}
+
+    results = []
+    # Run in a scratch directory so the chunker's debug files don't land in the repo
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd()
+        os.chdir(scratch)
+        try:
+            for name in args.cases:
+                results.append(run_case(name, CASES[name], args.repeat, args.min_chunk_tokens, args.embed_latency))
+                print(f"✅ {name} done", file=sys.stderr)
+        finally:
+            os.chdir(cwd)
+
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": _git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "repeat": args.repeat,
+                "min_chunk_tokens": args.min_chunk_tokens,
+                "embed_latency": args.embed_latency,
+                "results": results,
+            }, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
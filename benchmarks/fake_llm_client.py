@@ -0,0 +1,56 @@
+# benchmarks/fake_llm_client.py
+import math
+import re
+import threading
+import time
+import zlib
+from typing import List
+
+from core.llm.llm_client import LLMClient
+
+_WORD_RE = re.compile(r"\w+")
+
+class FakeLLMClient(LLMClient):
+    """Offline LLMClient for benchmarks.
+
+    Embeddings are normalized hashed bags of words: deterministic and cheap, and texts sharing words
+    get similar vectors, which is enough for retrieval experiments. latency_seconds is slept once per
+    embedding request to stand in for the server round trip. Counts requests and embedded texts, and
+    the time spent inside embedding calls (embed_seconds).
+    """
+
+    def __init__(self, dimensions: int = 256, latency_seconds: float = 0.0):
+        self.dimensions = dimensions
+        self.latency_seconds = latency_seconds
+        self.requests = 0
+        self.embedded_texts = 0
+        self.embed_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for word in _WORD_RE.findall(text.lower()):
+            code = zlib.crc32(word.encode("utf-8"))
+            vector[code % self.dimensions] += 1.0 if code & 0x80000000 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_texts(self, texts: List[str], model: str) -> List[List[float]]:
+        start = time.perf_counter()
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        vectors = [self._vector(text) for text in texts]
+        with self._lock:
+            self.requests += 1
+            self.embedded_texts += len(texts)
+            self.embed_seconds += time.perf_counter() - start
+        return vectors
+
+    def embed_text(self, text: str, model: str) -> List[float]:
+        return self.embed_texts([text], model)[0]
+
+    def generate_text(self, prompt: str, model: str, system_prompt: str = None) -> str:
+        return ""
+
+    def generate_text_tool(self, prompt: str, model: str, system_prompt: str = None) -> str:
+        return ""
@@ -0,0 +1,227 @@
+# benchmarks/retrieval_eval.py
+"""Offline retrieval quality and latency for a sweep of retrieval settings.
+
+The corpus is either an Azure DI layout JSON, which is re-chunked for every --min-chunk-tokens
+value, or a chunks.txt dump from the chunker, whose chunks are used as they are. Questions come
+from a JSON list (or JSONL) of {"question": ..., "relevant_sections": [section indexes]}; a
+retrieved chunk is relevant if it contains one of those sections. For every combination of
+min_chunk_tokens, mode, alpha and top_k the questions are searched through Retriever and this
+reports recall@k (share of the relevant sections found in the top k), MRR and p50/p95 search
+latency including query embedding.
+
+Everything runs in-process: the embedder defaults to the hashing FakeLLMClient and the store to
+OfflineHybridStore, a LocalVectorDBClient with a BM25 keyword side so alpha behaves as in
+Weaviate. Either can be swapped with --embedder / --store, given as module:callable returning an
+LLMClient / VectorDBClient, e.g. --embedder core.llm.openai_client:OpenAIClient to use the real
+embedding model served by LM Studio.
+
+    python -m benchmarks.retrieval_eval --corpus chunks.txt --questions benchmarks/retrieval_eval_questions.json
+    python -m benchmarks.retrieval_eval --corpus layout.json --questions q.json --min-chunk-tokens 128 256 512 --json eval.json
+"""
+import argparse
+import contextlib
+import datetime
+import importlib
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.document import chunker
+from core.document.chunk_record import ChunkRecord
+from core.llm.llm_client import LLMClient
+from core.vector_database.local_vector_db_client import LocalVectorDBClient
+from core.vector_database.vector_db_client import SearchResult, VectorDBClient
+from retrieval.bm25 import BM25Index
+from retrieval.fusion import relative_score_fusion
+from retrieval.retriever import Retriever, FUSION_CANDIDATES
+
+MODES = ("hybrid", "rrf")
+_CHUNK_HEADER_RE = re.compile(r"^\[CHUNK composed of sections \[([\d,\s]*)\]\]$")
+
+class OfflineHybridStore(LocalVectorDBClient):
+    """In-memory LocalVectorDBClient whose hybrid_search also has a keyword side, like Weaviate's.
+
+    Each collection gets a BM25 index next to its vectors. hybrid_search fetches `candidates`
+    results from both and merges them by relative score fusion with weights [alpha, 1 - alpha],
+    so alpha 1.0 is pure vector search and 0.0 pure keyword search.
+    """
+    def __init__(self, candidates: int = FUSION_CANDIDATES):
+        super().__init__(path=None)
+        self.candidates = candidates
+        self.keyword_indexes: Dict[str, BM25Index] = {}
+
+    def add_data_objects(self, collection_name: str, data_objects: List[ChunkRecord]):
+        super().add_data_objects(collection_name, data_objects)
+        self.keyword_indexes.setdefault(collection_name, BM25Index()).add_documents(data_objects)
+
+    def hybrid_search(self, collection_name: str, query: str, alpha: float, limit: int, filters=None, vector: List[float] = None) -> List[SearchResult]:
+        candidates = max(limit, self.candidates)
+        dense = super().hybrid_search(collection_name, query, alpha, candidates, filters, vector) if alpha > 0 else []
+        keyword_index = self.keyword_indexes.get(collection_name)
+        sparse = keyword_index.search(query, limit=candidates, filters=filters) if alpha < 1 and keyword_index is not None else []
+        return relative_score_fusion([dense, sparse], [alpha, 1 - alpha], limit=limit)
+
+def load_callable(path: str) -> Callable[..., Any]:
+    """The callable named by "package.module:name"."""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    questions = json.loads(text) if text.lstrip().startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+    for question in questions:
+        if not question.get("question") or not question.get("relevant_sections"):
+            raise ValueError(f"Question needs 'question' and 'relevant_sections': {question}")
+    return questions
+
+def parse_chunks_dump(path: str, filename: str) -> List[tuple[str, ChunkRecord]]:
+    """(embedding text, record) pairs for the chunks in a chunks.txt dump written by iter_chunks."""
+    chunks = []
+    section_indexes, lines = None, []
+
+    def close():
+        if section_indexes is not None:
+            full_text = "\n".join(lines).strip()
+            # The dump has no page numbers, and roles only as upper-cased text prefixes
+            chunks.append((full_text, chunker.create_chunk_object(full_text, section_indexes, [], [], filename, len(chunks) + 1)))
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f.read().splitlines():
+            header = _CHUNK_HEADER_RE.match(line.strip())
+            if header:
+                close()
+                section_indexes, lines = [int(i) for i in header.group(1).split(",") if i.strip()], []
+            elif section_indexes is not None:
+                lines.append(line)
+    close()
+    return chunks
+
+def build_corpus(corpus: str, min_chunk_tokens: int, llm_client: LLMClient, embedding_model: str) -> List[ChunkRecord]:
+    """Embedded chunk records for the corpus; a DI layout is chunked with min_chunk_tokens."""
+    filename = os.path.basename(corpus)
+    if corpus.endswith(".json"):
+        with open(corpus, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # iter_chunks prints per section and writes sections.txt / chunks.txt to the working directory
+        with tempfile.TemporaryDirectory() as scratch, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            cwd = os.getcwd()
+            os.chdir(scratch)
+            try:
+                chunks = list(chunker.iter_chunks(data, min_chunk_tokens, filename))
+            finally:
+                os.chdir(cwd)
+    else:
+        chunks = parse_chunks_dump(corpus, filename)
+    embeddings = chunker.get_embeddings(llm_client, [text for text, _ in chunks], embedding_model)
+    records = [record for _, record in chunks]
+    for record, embedding in zip(records, embeddings):
+        record.set_vector(embedding)
+    return records
+
+def _percentile(sorted_values: List[float], quantile: float) -> float:
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(quantile * len(sorted_values)) - 1)]
+
+def evaluate(retriever: Retriever, questions: List[Dict[str, Any]], mode: str, alpha: float, top_k: int) -> Dict[str, Any]:
+    """Recall@top_k, MRR and search latency over the questions for one configuration."""
+    recalls, reciprocal_ranks, latencies = [], [], []
+    for question in questions:
+        relevant = set(question["relevant_sections"])
+        start = time.perf_counter()
+        if mode == "rrf":
+            results = retriever.fused_search(question["question"], top_k=top_k)
+        else:
+            results = retriever.retrieve_relevant_chunks(question["question"], top_k=top_k, alpha=alpha)
+        latencies.append(time.perf_counter() - start)
+
+        found = set()
+        reciprocal_rank = 0.0
+        for rank, result in enumerate(results, start=1):
+            hits = relevant.intersection(result.properties.get("section_indexes") or [])
+            if hits and not reciprocal_rank:
+                reciprocal_rank = 1.0 / rank
+            found |= hits
+        recalls.append(len(found) / len(relevant))
+        reciprocal_ranks.append(reciprocal_rank)
+
+    latencies.sort()
+    return {
+        "recall@k": sum(recalls) / len(recalls),
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+    }
+
+def sweep(corpus: str, questions: List[Dict[str, Any]], min_chunk_tokens_values: List[int], modes: List[str], alphas: List[float], top_ks: List[int], embedder: Callable[[], LLMClient], store: Callable[[], VectorDBClient], embedding_model: str) -> List[Dict[str, Any]]:
+    llm_client = embedder()
+    rows = []
+    for min_chunk_tokens in min_chunk_tokens_values:
+        records = build_corpus(corpus, min_chunk_tokens, llm_client, embedding_model)
+        vector_db_client = store()
+        bm25_index = BM25Index()
+        bm25_index.add_documents(records)
+        for mode in modes:
+            for alpha in (alphas if mode == "hybrid" else [None]):
+                for top_k in top_ks:
+                    # A new Retriever per configuration, so no configuration is served from another's caches
+                    retriever = Retriever(vector_db_client, llm_client, embedding_model, bm25_index=bm25_index, fusion=mode == "rrf")
+                    if not vector_db_client.check_collection_exists(retriever.collection_name):
+                        vector_db_client.add_data_objects(retriever.collection_name, records)
+                    metrics = evaluate(retriever, questions, mode, alpha, top_k)
+                    rows.append({"min_chunk_tokens": min_chunk_tokens if corpus.endswith(".json") else None, "chunks": len(records), "mode": mode, "alpha": alpha, "top_k": top_k, **metrics})
+    return rows
+
+def print_rows(rows: List[Dict[str, Any]]):
+    header = f"{'min_tokens':>10} {'chunks':>6} {'mode':<6} {'alpha':>5} {'top_k':>5} {'recall@k':>8} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        min_tokens = row["min_chunk_tokens"] if row["min_chunk_tokens"] is not None else "-"
+        alpha = f"{row['alpha']:.2f}" if row["alpha"] is not None else "-"
+        print(f"{min_tokens:>10} {row['chunks']:>6} {row['mode']:<6} {alpha:>5} {row['top_k']:>5} {row['recall@k']:>8.3f} {row['mrr']:>6.3f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep retrieval settings offline and report recall@k, MRR and latency.")
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "chunks.txt"), help="Azure DI layout JSON, or a chunks.txt dump.")
+    parser.add_argument("--questions", default=os.path.join(ROOT, "benchmarks", "retrieval_eval_questions.json"), help="JSON list or JSONL of {question, relevant_sections}.")
+    parser.add_argument("--min-chunk-tokens", nargs="*", type=int, default=[chunker.MIN_CHUNK_TOKENS], help="Chunk sizes to try (DI layout corpora only).")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=MODES, help="hybrid: Weaviate-style alpha search; rrf: dense + BM25 reciprocal rank fusion.")
+    parser.add_argument("--alphas", nargs="*", type=float, default=[0.0, 0.3, 0.5, 0.7, 1.0], help="Hybrid alphas; 1.0 is pure vector search.")
+    parser.add_argument("--top-k", nargs="*", type=int, default=[3, 5, 10])
+    parser.add_argument("--embedder", default="benchmarks.fake_llm_client:FakeLLMClient", help="module:callable returning an LLMClient.")
+    parser.add_argument("--store", default="benchmarks.retrieval_eval:OfflineHybridStore", help="module:callable returning a VectorDBClient.")
+    parser.add_argument("--embedding-model", default=chunker.EMBED_MODEL)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    if not args.corpus.endswith(".json") and args.min_chunk_tokens != [chunker.MIN_CHUNK_TOKENS]:
+        print("[WARN] --min-chunk-tokens only applies to DI layout corpora; chunks.txt is used as chunked.")
+        args.min_chunk_tokens = [chunker.MIN_CHUNK_TOKENS]
+
+    questions = load_questions(args.questions)
+    rows = sweep(args.corpus, questions, args.min_chunk_tokens, args.modes, args.alphas, args.top_k, load_callable(args.embedder), load_callable(args.store), args.embedding_model)
+    print_rows(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "corpus": args.corpus,
+                "questions": len(questions),
+                "embedder": args.embedder,
+                "store": args.store,
+                "results": rows,
+            }, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
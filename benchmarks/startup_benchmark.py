@@ -0,0 +1,117 @@
+# benchmarks/startup_benchmark.py
+"""Startup cost of the Streamlit apps, per component.
+
+Imports are timed in a fresh interpreter per module, so each number is the cold cost of that module
+together with whatever it pulls in. Init times come from one in-process AppContext, built in
+dependency order so each component is timed without the components it depends on. Components that
+need a running service (Weaviate, LM Studio) are reported as failed, not skipped, when it is down.
+
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --components embedding_cache llm_client --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = [
+    "streamlit",
+    "numpy",
+    "httpx",
+    "openai",
+    "weaviate",
+    "azure.ai.documentintelligence",
+    "pydantic",
+    "instructor",
+    "atomic_agents.agents.base_agent",
+    "ui.app_context",
+    "core.document.ingestion_pipeline",
+    "retrieval.retriever",
+    "agents.decompose_query_agent",
+    "agents.entity_extraction",
+]
+
+# In dependency order
+COMPONENTS = [
+    "embedding_cache",
+    "llm_client",
+    "llm_handler",
+    "vector_db_client",
+    "document_collection",
+    "bm25_index",
+    "retriever",
+    "answer_cache",
+    "query_decomposer",
+    "decompose_query_agent",
+    "metadata_matcher_agent",
+    "final_answer_agent",
+    "multi_query_tool",
+    "document_analyzer",
+]
+
+_IMPORT_SNIPPET = "import time, importlib; start = time.perf_counter(); importlib.import_module({module!r}); print(time.perf_counter() - start)"
+
+def time_import(module: str, repeat: int = 3) -> Dict[str, Any]:
+    """Best of `repeat` cold imports of module, each in a new interpreter."""
+    best, error = None, None
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET.format(module=module)], cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            error = (completed.stderr.strip().splitlines() or ["import failed"])[-1]
+            break
+        seconds = float(completed.stdout.strip().splitlines()[-1])
+        best = seconds if best is None else min(best, seconds)
+    return {"name": module, "seconds": best, "error": error}
+
+def time_components(names: List[str]) -> List[Dict[str, Any]]:
+    sys.path.insert(0, ROOT)
+    from ui.app_context import AppContext
+
+    context = AppContext()
+    results = []
+    for name in names:
+        start = time.perf_counter()
+        try:
+            component = getattr(context, name)
+            error = None if component is not None else "build returned None"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        results.append({"name": name, "seconds": time.perf_counter() - start, "error": error})
+    return results
+
+def print_table(title: str, rows: List[Dict[str, Any]]):
+    print(f"\n{title}")
+    width = max(len(row["name"]) for row in rows)
+    for row in rows:
+        timing = f"{row['seconds'] * 1000:9.1f} ms" if row["seconds"] is not None else "        - ms"
+        print(f"  {row['name']:<{width}}  {timing}  {'[FAILED] ' + row['error'] if row['error'] else ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and init time of the Streamlit app components.")
+    parser.add_argument("--imports", nargs="*", default=IMPORTS, help="Modules to time cold imports of.")
+    parser.add_argument("--components", nargs="*", default=COMPONENTS, help="AppContext components to build, in order.")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold imports per module; the best is reported.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    imports = [time_import(module, args.repeat) for module in args.imports]
+    if imports:
+        print_table("Cold import time (fresh interpreter per module)", imports)
+    components = time_components(args.components) if args.components else []
+    if components:
+        print_table("Init time (one AppContext, dependency order)", components)
+        total = sum(row["seconds"] for row in components)
+        print(f"  {'total':<{max(len(row['name']) for row in components)}}  {total * 1000:9.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "imports": imports, "components": components}, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/synthetic_layout.py
+"""Synthetic Azure DI layout results, for benchmarking the chunker without Azure.
+
+The output has the shape of AnalyzeResult.as_dict() as far as core/document reads it: paragraphs
+with content, role and boundingRegions; tables whose cells reference their paragraphs; sections
+whose elements reference paragraphs, tables and child sections.
+"""
+import random
+from typing import Any, Dict, List
+
+_WORDS = (
+    "agreement party supplier customer shall deliver services fees invoice payment days term notice "
+    "termination breach confidential information liability indemnify warranty goods schedule period "
+    "written consent assign obligations effective date renewal law jurisdiction dispute remedy"
+).split()
+_CLAUSE_FRAGMENTS = ["pursuant to Section {a}.{b}({c})", "within {n} days", "USD {n},000", "Confidential Information", "the Effective Date"]
+
+def _sentence(rng: random.Random, words: int) -> str:
+    tokens = [rng.choice(_WORDS) for _ in range(words)]
+    if words > 8 and rng.random() < 0.5:
+        fragment = rng.choice(_CLAUSE_FRAGMENTS).format(a=rng.randint(1, 20), b=rng.randint(1, 9), c="abcd"[rng.randint(0, 3)], n=rng.randint(1, 90))
+        tokens.insert(rng.randint(0, len(tokens)), fragment)
+    return " ".join(tokens).capitalize() + "."
+
+def generate_layout(pages: int = 20, sections: int = 100, paragraphs_per_section: int = 5, tables: int = 10, table_rows: int = 5, table_columns: int = 4, nested_ratio: float = 0.1, mixed_ref_ratio: float = 0.05, words_per_paragraph: int = 40, seed: int = 0) -> Dict[str, Any]:
+    """A DI layout dict with the given counts.
+
+    Section 0 is the root listing the top-level sections, as in real DI output. Each other section
+    starts with a sectionHeading paragraph followed by body paragraphs. About nested_ratio of the
+    sections become children of the section before them, which makes the parent "mixed". About
+    mixed_ref_ratio of the sections get references the chunker has to skip or warn about (figures,
+    out-of-range paragraphs), and as many extra sections use the bare "table<N>" form, some invalid.
+    Tables are spread evenly over the sections.
+    """
+    rng = random.Random(seed)
+    paragraphs: List[Dict[str, Any]] = []
+    section_list: List[Dict[str, Any]] = [{"elements": []}]
+    table_list: List[Dict[str, Any]] = []
+
+    def page_of(position: float) -> int:
+        return 1 + min(pages - 1, int(position * pages))
+
+    def add_paragraph(content: str, page: int, role: str = None) -> str:
+        paragraph = {"content": content, "boundingRegions": [{"pageNumber": page}]}
+        if role:
+            paragraph["role"] = role
+        paragraphs.append(paragraph)
+        return f"/paragraphs/{len(paragraphs) - 1}"
+
+    def add_table(page: int) -> str:
+        cells = []
+        for row in range(table_rows):
+            for column in range(table_columns):
+                content = f"Header {column + 1}" if row == 0 else _sentence(rng, rng.randint(1, 6))
+                cell = {"rowIndex": row, "columnIndex": column, "content": content, "elements": [add_paragraph(content, page)], "boundingRegions": [{"pageNumber": page}]}
+                if row == 0:
+                    cell["kind"] = "columnHeader"
+                cells.append(cell)
+        table_list.append({"rowCount": table_rows, "columnCount": table_columns, "cells": cells, "boundingRegions": [{"pageNumber": page}]})
+        return f"/tables/{len(table_list) - 1}"
+
+    tables_per_section = [0] * sections
+    for table in range(tables):
+        tables_per_section[table * sections // tables] += 1
+
+    for number in range(sections):
+        page = page_of(number / sections)
+        elements = [add_paragraph(f"{number + 1}. {rng.choice(_WORDS).upper()} {rng.choice(_WORDS).upper()}", page, "sectionHeading")]
+        for _ in range(paragraphs_per_section):
+            elements.append(add_paragraph(_sentence(rng, max(1, int(rng.gauss(words_per_paragraph, words_per_paragraph / 4)))), page))
+        for _ in range(tables_per_section[number]):
+            elements.insert(rng.randint(1, len(elements)), add_table(page))
+        if rng.random() < mixed_ref_ratio:
+            elements.append(rng.choice(["/figures/0", f"/paragraphs/{10 ** 7}", "/keyValuePairs/0"]))
+        section_list.append({"elements": elements, "boundingRegions": [{"pageNumber": page}]})
+        ref = f"/sections/{len(section_list) - 1}"
+        # Nest under the previous section, unless that is the root
+        parent = section_list[-2] if number > 0 and rng.random() < nested_ratio else section_list[0]
+        parent["elements"].append(ref)
+
+    if table_list:
+        for _ in range(int(sections * mixed_ref_ratio)):
+            section_list.append({"elements": [rng.choice([f"table{rng.randrange(len(table_list))}", f"table{len(table_list) + 5}", "tableX"])]})
+            section_list[0]["elements"].append(f"/sections/{len(section_list) - 1}")
+
+    return {"pages": [{"pageNumber": page} for page in range(1, pages + 1)], "paragraphs": paragraphs, "tables": table_list, "sections": section_list}
+
+# Named cases covering the shapes the chunker handles differently
+CASES = {
+    "small": dict(pages=5, sections=30, paragraphs_per_section=4, tables=2),
+    "medium": dict(pages=50, sections=400, paragraphs_per_section=5, tables=25),
+    "large": dict(pages=200, sections=2000, paragraphs_per_section=6, tables=120),
+    "table_heavy": dict(pages=60, sections=200, paragraphs_per_section=2, tables=200, table_rows=12, table_columns=6),
+    "nested": dict(pages=40, sections=400, paragraphs_per_section=3, tables=10, nested_ratio=0.6),
+    "mixed_refs": dict(pages=40, sections=400, paragraphs_per_section=4, tables=40, mixed_ref_ratio=0.5),
+}
@@ -0,0 +1,52 @@
+# core/document/chunk_record.py
+from array import array
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, List, Optional, Sequence
+
+@dataclass(slots=True)
+class ChunkRecord:
+    """One chunk on its way from the chunker to a vector database.
+
+    The embedding is kept as a contiguous float32 array('f') (4 bytes per dimension) rather than a
+    list of Python floats (about 32). Vector DB clients convert at their own boundary: Weaviate
+    takes vector_list(), numpy code can wrap the buffer without copying.
+    """
+    PROPERTY_NAMES: ClassVar[tuple] = ("content", "token_length", "char_length", "section_indexes", "roles", "heading", "page_numbers", "chunk_number", "filename")
+    # Filled in by the optional entity extraction stage of ingestion; stored only when set.
+    ENTITY_PROPERTY_NAMES: ClassVar[tuple] = ("parties", "dates", "amounts", "obligations")
+
+    content: str
+    token_length: int
+    char_length: int
+    section_indexes: List[int]
+    roles: List[str]
+    heading: Optional[str]
+    page_numbers: List[int]
+    chunk_number: int
+    filename: str
+    id: str
+    vector: Optional[array] = None
+    parties: Optional[List[str]] = None
+    dates: Optional[List[str]] = None
+    amounts: Optional[List[str]] = None
+    obligations: Optional[List[str]] = None
+
+    def set_vector(self, embedding: Sequence[float]):
+        self.vector = embedding if isinstance(embedding, array) and embedding.typecode == "f" else array("f", embedding)
+
+    def vector_list(self) -> Optional[List[float]]:
+        return self.vector.tolist() if self.vector is not None else None
+
+    def properties(self) -> Dict[str, Any]:
+        """The stored properties, i.e. everything except id and vector."""
+        properties = {name: getattr(self, name) for name in self.PROPERTY_NAMES}
+        for name in self.ENTITY_PROPERTY_NAMES:
+            if getattr(self, name) is not None:
+                properties[name] = getattr(self, name)
+        return properties
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The legacy Weaviate-style dict, with id and vector under "_additional"."""
+        data_object = self.properties()
+        data_object["_additional"] = {"id": self.id, "vector": self.vector_list()}
+        return data_object
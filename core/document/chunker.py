@@ -1,59 +1,107 @@
 # rag_app/core/document/chunker.py
+import hashlib
 import json
-from typing import List, Dict, Any, Set
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Any, Set, Iterator
 from core.llm.llm_client import LLMClient  # Import our LLMClient
+from core.document.reference_index import ReferenceIndex, REF_PARAGRAPH, REF_TABLE, REF_INVALID, REF_TABLE_OUT_OF_RANGE, REF_TABLE_BAD_FORMAT
 from config.config import config  # Import configuration
+from core.document.chunk_record import ChunkRecord
 
 # Configuration from config.yaml
 EMBED_MODEL = config.get("embedding_model")
 MIN_CHUNK_TOKENS = config.get("min_chunk_tokens", 256) # Default to 256 if not in config
+EMBED_BATCH_SIZE = config.get("embedding_batch_size", 32)
+EMBED_BATCH_MAX_TOKENS = config.get("embedding_batch_max_tokens", 8192)
+EMBED_MAX_CONCURRENCY = config.get("embedding_max_concurrency", 4)
+EMBED_MAX_RETRIES = config.get("embedding_max_retries", 3)
+CHUNK_ID_NAMESPACE = uuid.UUID("5f0c2b9e-7c1d-4f3a-9a57-3e2f1c6d8b40")
 
 def get_embedding(llm_client: LLMClient, text: str, model: str = EMBED_MODEL) -> List[float]:
     """Generates an embedding for the given text using the provided client."""
     return llm_client.embed_text(text, model)
 
-def resolve_reference(ref: str, data: Dict[str, Any]) -> Any:
-    """Resolves a reference string to its corresponding object in the JSON data."""
-    ref = ref.lstrip("/")
-    parts = ref.split("/")
-    if len(parts) == 2:
-        collection_name = parts[0]
+def make_embedding_batches(texts: List[str], batch_size: int = EMBED_BATCH_SIZE, max_batch_tokens: int = EMBED_BATCH_MAX_TOKENS) -> List[List[str]]:
+    """Groups texts into consecutive batches bounded by item count and whitespace token count."""
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for text in texts:
+        text_tokens = len(text.split())
+        if current_batch and (len(current_batch) >= batch_size or current_tokens + text_tokens > max_batch_tokens):
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(text)
+        current_tokens += text_tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+def embed_batch_with_retry(llm_client: LLMClient, batch: List[str], model: str, max_retries: int = EMBED_MAX_RETRIES) -> List[List[float]]:
+    """Embeds one batch, retrying only this batch with exponential backoff on failure."""
+    for attempt in range(1, max_retries + 1):
         try:
-            index = int(parts[1])
-            return data.get(collection_name, [])[index]
-        except (ValueError, IndexError):
-            return None
-    return None
-
-def extract_table_content_html(table: Dict[str, Any], paragraphs: List[Dict[str, Any]]) -> tuple[str, List[int]]:
-    """Extracts text content from all cells of a table and formats it as an HTML table."""
+            vectors = llm_client.embed_texts(batch, model)
+            if len(vectors) != len(batch):
+                raise ValueError(f"Expected {len(batch)} embeddings, got {len(vectors)}")
+            return vectors
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            print(f"[WARN] Embedding batch of {len(batch)} failed (attempt {attempt}/{max_retries}): {e}")
+            time.sleep(0.5 * 2 ** (attempt - 1))
+
+def get_embeddings(llm_client: LLMClient, texts: List[str], model: str = EMBED_MODEL, batch_size: int = EMBED_BATCH_SIZE, max_concurrency: int = EMBED_MAX_CONCURRENCY) -> List[List[float]]:
+    """Embeds texts in size-bounded batches with up to max_concurrency requests in flight.
+
+    Vectors are returned in the same order as the input texts.
+    """
+    batches = make_embedding_batches(texts, batch_size)
+    if not batches:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as executor:
+        batch_vectors = list(executor.map(lambda batch: embed_batch_with_retry(llm_client, batch, model), batches))
+    return [vector for vectors in batch_vectors for vector in vectors]
+
+def get_page_numbers(element: Dict[str, Any]) -> List[int]:
+    """Extracts unique page numbers from the bounding regions of an element."""
+    page_numbers: Set[int] = set()
+    for region in element.get("boundingRegions", []):
+        page_numbers.add(region.get("pageNumber"))
+    return list(page_numbers)
+
+@dataclass
+class RenderedSection:
+    """A section rendered once, shared by the sections.txt dump, chunk packing and chunk metadata."""
+    index: int
+    text: str  # Text that goes into chunks; paragraph roles are prefixed, e.g. "[TITLE] ..."
+    debug_text: str  # Plain text written to sections.txt
+    roles: List[str]
+    page_numbers: Set[int]
+    token_count: int
+    skipped: bool  # True if the section contributes no chunk text (section links only, or unknown structure)
+
+def extract_indexed_table_html(ref_index: ReferenceIndex, table: Dict[str, Any]) -> tuple[str, List[int]]:
+    """Renders a table as HTML, reading cell paragraphs from a ReferenceIndex; returns (html, page numbers)."""
     html_table = "<table>\n"
     rows = {}  # Group cells by rowIndex
-
-    # Organize cells by row
     for cell in table.get("cells", []):
-        row_index = cell.get("rowIndex", 0)
-        if row_index not in rows:
-            rows[row_index] = []
-        rows[row_index].append(cell)
+        rows.setdefault(cell.get("rowIndex", 0), []).append(cell)
 
-    # Sort rows by index
-    sorted_rows = sorted(rows.items())
     page_numbers: Set[int] = set()
-
-    for row_index, cells_in_row in sorted_rows:
+    for row_index, cells_in_row in sorted(rows.items()):
         html_table += "  <tr>\n"
-        # Sort cells in the row by columnIndex
-        sorted_cells = sorted(cells_in_row, key=lambda c: c.get("columnIndex", 0))
-        for cell in sorted_cells:
-            element_refs = cell.get("elements", [])
+        for cell in sorted(cells_in_row, key=lambda c: c.get("columnIndex", 0)):
             cell_content = []
-            for ref in element_refs:
-                paragraph = resolve_reference(ref, {"paragraphs": paragraphs})
-                if paragraph and isinstance(paragraph, dict) and "content" in paragraph:
-                    cell_content.append(paragraph["content"].strip())
-                    for region in paragraph.get("boundingRegions", []):
-                        page_numbers.add(region.get("pageNumber"))
+            for ref in cell.get("elements", []):
+                paragraph_index = ref_index.resolve_paragraph(ref)
+                if paragraph_index >= 0:
+                    cell_content.append(ref_index.paragraph_texts[paragraph_index])
+                    page_numbers.update(ref_index.paragraph_pages[paragraph_index])
 
             tag = "th" if cell.get("kind") == "columnHeader" else "td"
             html_table += f"    <{tag}>{' '.join(cell_content)}</{tag}>\n"
@@ -62,101 +110,83 @@ def extract_table_content_html(table: Dict[str, Any], paragraphs: List[Dict[str,
     html_table += "</table>\n"
     return html_table, list(page_numbers)
 
-def get_page_numbers(element: Dict[str, Any]) -> List[int]:
-    """Extracts unique page numbers from the bounding regions of an element."""
-    page_numbers: Set[int] = set()
-    for region in element.get("boundingRegions", []):
-        page_numbers.add(region.get("pageNumber"))
-    return list(page_numbers)
+def render_table(ref_index: ReferenceIndex, target: int, table_cache: Dict[int, tuple[str, List[int]]]) -> tuple[str, List[int]]:
+    """Renders the table at position target of ref_index.objects, at most once per document."""
+    if target not in table_cache:
+        table_cache[target] = extract_indexed_table_html(ref_index, ref_index.objects[target])
+    return table_cache[target]
 
-def classify_refs(refs: List[str]) -> str:
-    """Classifies a list of references based on whether they point to sections."""
-    normalized = [ref.lstrip("/") for ref in refs]
-    has_sections = any(ref.startswith("sections/") for ref in normalized)
-    has_tables = any(ref.startswith("table") for ref in normalized)
-    has_non_sections_or_tables = any(not ref.startswith("sections/") and not ref.startswith("table") for ref in normalized)
-
-    if has_sections and not has_non_sections_or_tables and not has_tables:
-        return "only_sections"
-    elif has_tables and not has_non_sections_or_tables and not has_sections:
-        return "only_tables"
-    elif (has_sections and has_non_sections_or_tables) or \
-            (has_tables and has_non_sections_or_tables) or \
-            (has_sections and has_tables):
-        return "mixed"
-    elif not has_sections and not has_tables and has_non_sections_or_tables:
-        return "only_non_sections"
-    else:
-        return "empty_or_unknown"
-
-def process_section(section: Dict[str, Any], sections: List[Dict[str, Any]], paragraphs: List[Dict[str, Any]], tables: List[Dict[str, Any]], all_section_texts: List[str], current_chunk_texts: List[str], current_roles: List[str], current_token_count: int, current_section_indexes: List[int], current_page_numbers: Set[int], idx: int) -> tuple[List[str], List[str], int, List[int], Set[int]]:
-    """Processes a single section to extract text and update the current chunk."""
-    elements = section.get("elements", [])
-    section_type = classify_refs(elements)
+def render_section(ref_index: ReferenceIndex, idx: int, table_cache: Dict[int, tuple[str, List[int]]]) -> RenderedSection:
+    """Renders a section from its compiled references, rendering each table exactly once."""
+    section = ref_index.sections[idx]
+    section_type = ref_index.section_types[idx]
     processed_texts = []
+    debug_texts = []
     section_roles = []
-    section_page_numbers = get_page_numbers(section)
-    current_page_numbers.update(section_page_numbers)
+    page_numbers: Set[int] = set(get_page_numbers(section))
 
     if section_type == "only_sections":
         print(f"[SKIP] Section {idx} has only section links.")
-        return current_chunk_texts, current_roles, current_token_count, current_section_indexes, current_page_numbers
+        return RenderedSection(idx, "", "", [], page_numbers, 0, True)
+    elif section_type == "empty_or_unknown":
+        print(f"[WARN] Section {idx} has unknown reference structure.")
+        return RenderedSection(idx, "", "", [], page_numbers, 0, True)
     elif section_type == "only_tables":
         print(f"[INFO] Section {idx} has only table links. Processing tables directly.")
-        for ref in elements:
-            table_index_str = ref.lstrip("table")
-            try:
-                table_index = int(table_index_str)
-                if 0 <= table_index < len(tables):
-                    html_table, table_pages = extract_table_content_html(tables[table_index], paragraphs)
-                    processed_texts.append(html_table)
-                    current_page_numbers.update(table_pages)
-                else:
-                    print(f"[WARN] Invalid table reference: {ref} in Section {idx}")
-            except ValueError:
-                print(f"[WARN] Invalid table reference format: {ref} in Section {idx}")
-    elif section_type in ["only_non_sections", "mixed"]:
-        if section_type == "mixed":
-            print(f"[MIXED] Section {idx} has mixed content in it.")
-        for ref in elements:
-            referenced = resolve_reference(ref, {"paragraphs": paragraphs, "sections": sections, "tables": tables})
-            if referenced:
-                if isinstance(referenced, dict) and "content" in referenced:
-                    # It's a paragraph
-                    content = referenced.get("content", "").strip()
-                    role = referenced.get("role", "")
-                    paragraph_pages = get_page_numbers(referenced)
-                    current_page_numbers.update(paragraph_pages)
-                    if role:
-                        section_roles.append(role)
-                        formatted = f"[{role.upper()}] {content}"
-                    else:
-                        formatted = content
-                    processed_texts.append(formatted)
-                elif isinstance(referenced, dict) and "cells" in referenced:
-                    # It's a table
-                    html_table, table_pages = extract_table_content_html(referenced, paragraphs)
-                    processed_texts.append(html_table)
-                    current_page_numbers.update(table_pages)
-                else:
-                    print(f"[WARN] Invalid reference: {ref} in Section {idx}")
-    else:
-        print(f"[WARN] Section {idx} has unknown reference structure.")
-        return current_chunk_texts, current_roles, current_token_count, current_section_indexes, current_page_numbers
+    elif section_type == "mixed":
+        print(f"[MIXED] Section {idx} has mixed content in it.")
+
+    start = ref_index.ref_offsets[idx]
+    ref_kinds = ref_index.ref_kinds
+    ref_targets = ref_index.ref_targets
+    for pos in range(start, ref_index.ref_offsets[idx + 1]):
+        kind = ref_kinds[pos]
+        if kind == REF_PARAGRAPH:
+            target = ref_targets[pos]
+            paragraph = ref_index.objects[target]
+            role = paragraph.get("role", "")
+            if target < len(ref_index.paragraphs):
+                content = ref_index.paragraph_texts[target]
+                page_numbers.update(ref_index.paragraph_pages[target])
+            else:
+                content = paragraph.get("content", "").strip()
+                page_numbers.update(get_page_numbers(paragraph))
+            if role:
+                section_roles.append(role)
+                formatted = f"[{role.upper()}] {content}"
+            else:
+                formatted = content
+            processed_texts.append(formatted)
+            debug_texts.append(content)
+        elif kind == REF_TABLE:
+            html_table, table_pages = render_table(ref_index, ref_targets[pos], table_cache)
+            processed_texts.append(html_table)
+            debug_texts.append(html_table)
+            page_numbers.update(table_pages)
+        elif kind == REF_INVALID:
+            print(f"[WARN] Invalid reference: {section['elements'][pos - start]} in Section {idx}")
+        elif kind == REF_TABLE_OUT_OF_RANGE:
+            print(f"[WARN] Invalid table reference: {section['elements'][pos - start]} in Section {idx}")
+        elif kind == REF_TABLE_BAD_FORMAT:
+            print(f"[WARN] Invalid table reference format: {section['elements'][pos - start]} in Section {idx}")
 
     section_text = "\n".join(processed_texts)
-    section_token_count = len(section_text.split())
-    all_section_texts.append(f"[SECTION {idx}]\n{section_text}\n\n")
-    current_chunk_texts.append(section_text)
-    current_roles.extend(section_roles)
-    current_token_count += section_token_count
-    current_section_indexes.append(idx)
-
-    return current_chunk_texts, current_roles, current_token_count, current_section_indexes, current_page_numbers
-
-def create_chunk_object(llm_client: LLMClient, full_text: str, current_section_indexes: List[int], current_roles: List[str], page_numbers: List[int], embedding_model: str, filename:str, chunk_number:int) -> Dict[str, Any]:
-    """Creates a data object for a chunk to be inserted into Weaviate."""
-    embedding = get_embedding(llm_client, full_text, embedding_model)
+    return RenderedSection(idx, section_text, "\n".join(debug_texts), section_roles, page_numbers, len(section_text.split()), False)
+
+def chunk_object_id(filename: str, chunk_number: int, full_text: str) -> str:
+    """Deterministic object UUID for a chunk, derived from (filename, chunk_number, content hash).
+
+    Re-ingesting an unchanged document yields the same IDs, which makes re-ingestion idempotent.
+    """
+    content_hash = hashlib.sha256(full_text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{filename}\x1f{chunk_number}\x1f{content_hash}"))
+
+def create_chunk_object(full_text: str, current_section_indexes: List[int], current_roles: List[str], page_numbers: List[int], filename:str, chunk_number:int, embedding: List[float] = None) -> ChunkRecord:
+    """Creates the record for a chunk to be inserted into Weaviate.
+
+    The embedding is usually filled in afterwards by chunk_document, which embeds all chunks in batches.
+    """
+    object_id = chunk_object_id(filename, chunk_number, full_text)
     token_count = len(full_text.split())
     char_count = len(full_text)
 
@@ -169,97 +199,81 @@ def create_chunk_object(llm_client: LLMClient, full_text: str, current_section_i
             # Optionally, remove the heading from the content if you don't want it duplicated
             full_text = lines[1].strip() if len(lines) > 1 else ""
 
-    return {
-        "content": full_text,
-        "token_length": token_count,
-        "char_length": char_count,
-        "section_indexes": current_section_indexes.copy(),
-        "roles": list(set(current_roles)),
-        "heading": heading,  # Add the extracted heading
-        "page_numbers": sorted(list(set(page_numbers))), # Ensure unique and sorted page numbers
-        "chunk_number" : chunk_number,
-        "filename": filename,
-
-        "_additional": {"vector": embedding}
-    }
-
-def chunk_document(llm_client: LLMClient, data: Dict[str, Any], min_chunk_tokens: int, embedding_model: str, filename:str) -> List[Dict[str, Any]]:
-    """Processes the JSON data and chunks it."""
-    sections = data.get("sections", [])
-    paragraphs = data.get("paragraphs", [])
-    tables = data.get("tables", [])
-    data_objects = []
-    all_chunks = []
-    all_section_texts = []
+    record = ChunkRecord(
+        content=full_text,
+        token_length=token_count,
+        char_length=char_count,
+        section_indexes=current_section_indexes.copy(),
+        roles=list(set(current_roles)),
+        heading=heading,  # Add the extracted heading
+        page_numbers=sorted(list(set(page_numbers))), # Ensure unique and sorted page numbers
+        chunk_number=chunk_number,
+        filename=filename,
+        id=object_id,
+    )
+    if embedding is not None:
+        record.set_vector(embedding)
+    return record
+
+def iter_chunks(data: Dict[str, Any], min_chunk_tokens: int, filename: str) -> Iterator[tuple[str, ChunkRecord]]:
+    """Chunks the JSON data, yielding (embedding text, chunk record) pairs as each chunk closes.
+
+    Sections are rendered one at a time, so only the chunk being packed is held in memory.
+    sections.txt and chunks.txt are written as the document is processed. The yielded
+    records have no vector yet.
+    """
+    ref_index = ReferenceIndex(data)
     current_chunk_texts = []
     current_roles = []
     current_token_count = 0
     current_section_indexes = []
     current_page_numbers: Set[int] = set()
     chunk_number = 1
+    table_cache: Dict[int, tuple[str, List[int]]] = {}
 
-    # Collect all section texts
-    for idx, section in enumerate(sections):
-        elements = section.get("elements", [])
-        section_type = classify_refs(elements)
-        processed_texts = []
-        if section_type == "only_sections":
-            print(f"[SKIP] Section {idx} has only section links.")
-        elif section_type == "only_tables":
-            for ref in elements:
-                table_index_str = ref.lstrip("table")
-                try:
-                    table_index = int(table_index_str)
-                    if 0 <= table_index < len(tables):
-                        html_table, _ = extract_table_content_html(tables[table_index], paragraphs)
-                        processed_texts.append(html_table)
-                except ValueError:
-                    pass
-        elif section_type in ["only_non_sections", "mixed"]:
-            for ref in elements:
-                referenced = resolve_reference(ref, {"paragraphs": paragraphs, "sections": sections, "tables": tables})
-                if referenced and isinstance(referenced, dict) and "content" in referenced:
-                    processed_texts.append(referenced["content"].strip())
-                elif referenced and isinstance(referenced, dict) and "cells" in referenced:
-                    html_table, _ = extract_table_content_html(referenced, paragraphs)
-                    processed_texts.append(html_table)
-
-        section_text = "\n".join(processed_texts)
-        all_section_texts.append(f"[SECTION {idx}]\n{section_text}\n\n")
-
-    with open("sections.txt", "w", encoding="utf-8") as f_sections:
-        f_sections.writelines(all_section_texts)
-        print("✅ All sections written to sections.txt")
+    with open("sections.txt", "w", encoding="utf-8") as f_sections, open("chunks.txt", "w", encoding="utf-8") as f_chunks:
+        for idx in range(len(ref_index.sections)):
+            rendered = render_section(ref_index, idx, table_cache)
+            f_sections.write(f"[SECTION {rendered.index}]\n{rendered.debug_text}\n\n")
 
-    # Chunk the document
-    for idx, section in enumerate(sections):
-        current_chunk_texts, current_roles, current_token_count, current_section_indexes, current_page_numbers = process_section(
-            section, sections, paragraphs, tables, all_section_texts, current_chunk_texts, current_roles, current_token_count, current_section_indexes, current_page_numbers, idx
-        )
+            current_page_numbers.update(rendered.page_numbers)
+            if not rendered.skipped:
+                current_chunk_texts.append(rendered.text)
+                current_roles.extend(rendered.roles)
+                current_token_count += rendered.token_count
+                current_section_indexes.append(rendered.index)
+
+            if current_token_count >= min_chunk_tokens:
+                full_text = "\n".join(current_chunk_texts)
+                f_chunks.write(f"[CHUNK composed of sections {current_section_indexes}]\n{full_text}\n\n")
+                yield full_text, create_chunk_object(full_text, current_section_indexes, current_roles, list(current_page_numbers), filename, chunk_number)
+                chunk_number += 1
+                current_chunk_texts = []
+                current_roles = []
+                current_token_count = 0
+                current_section_indexes = []
+                current_page_numbers = set()
+        print("✅ All sections written to sections.txt")
 
-        if current_token_count >= min_chunk_tokens:
+        # Final chunk
+        if current_chunk_texts:
             full_text = "\n".join(current_chunk_texts)
-            data_object = create_chunk_object(llm_client, full_text, current_section_indexes, current_roles, list(current_page_numbers), embedding_model, filename, chunk_number)
-            data_objects.append(data_object)
-            all_chunks.append(f"[CHUNK composed of sections {current_section_indexes}]\n{full_text}\n\n")
-            chunk_number += 1
-            current_chunk_texts = []
-            current_roles = []
-            current_token_count = 0
-            current_section_indexes = []
-            current_page_numbers = set()
-
-    # Final chunk
-    if current_chunk_texts:
-        full_text = "\n".join(current_chunk_texts)
-        data_object = create_chunk_object(llm_client, full_text, current_section_indexes, current_roles, list(current_page_numbers), embedding_model, filename, chunk_number)
-        data_objects.append(data_object)
-        all_chunks.append(f"[CHUNK composed of sections {current_section_indexes}]\n{full_text}\n\n")
+            f_chunks.write(f"[CHUNK composed of sections {current_section_indexes}]\n{full_text}\n\n")
+            yield full_text, create_chunk_object(full_text, current_section_indexes, current_roles, list(current_page_numbers), filename, chunk_number)
+        print("✅ Chunks written to chunks.txt")
 
-    print(f"Total number of chunks (sections): {len(data_objects)}")
+def chunk_document(llm_client: LLMClient, data: Dict[str, Any], min_chunk_tokens: int, embedding_model: str, filename:str, embedding_batch_size: int = EMBED_BATCH_SIZE, max_concurrent_embeddings: int = EMBED_MAX_CONCURRENCY) -> List[ChunkRecord]:
+    """Processes the JSON data and chunks it.
 
-    with open("chunks.txt", "w", encoding="utf-8") as f_chunks:
-        f_chunks.writelines(all_chunks)
-        print("✅ Chunks written to chunks.txt")
+    Collects all chunks from iter_chunks and embeds them in batches, see get_embeddings.
+    Callers that keep a BM25 index should index the chunks only once they are written to the vector DB.
+    For bounded-memory ingestion use core.document.ingestion_pipeline instead.
+    """
+    chunks = list(iter_chunks(data, min_chunk_tokens, filename))
+    data_objects = [data_object for _, data_object in chunks]
+    print(f"Total number of chunks (sections): {len(data_objects)}")
 
-    return data_objects
\ No newline at end of file
+    embeddings = get_embeddings(llm_client, [text for text, _ in chunks], embedding_model, embedding_batch_size, max_concurrent_embeddings)
+    for data_object, embedding in zip(data_objects, embeddings):
+        data_object.set_vector(embedding)
+    return data_objects
@@ -1,17 +1,160 @@
+import gzip
+import hashlib
+import io
+import json
 import os
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.core.credentials import AzureKeyCredential
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Union
 
-def load_document(endpoint: str, key: str, file_path: str) -> dict:
-    client = DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+from config.config import config
+
+LAYOUT_MODEL_ID = config.get("di_model_id", "prebuilt-layout")
+DI_CACHE_DIR = config.get("di_cache_dir", "di_cache")
+
+class DocumentAnalyzer(ABC):
+    """Turns raw document bytes into an Azure DI layout dict."""
+    model_id: str
+
+    @abstractmethod
+    def analyze(self, document_bytes: bytes) -> dict:
+        pass
+
+class AzureDocumentAnalyzer(DocumentAnalyzer):
+    """Azure DI layout analysis.
+
+    The Azure SDK is a noticeable share of app startup, so it is imported and the client built on the
+    first analyze() call; behind a CachingDocumentAnalyzer, cache hits never import it at all.
+    """
+    def __init__(self, endpoint: str, key: str, model_id: str = LAYOUT_MODEL_ID):
+        self.endpoint = endpoint
+        self.key = key
+        self.model_id = model_id
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from azure.ai.documentintelligence import DocumentIntelligenceClient
+            from azure.core.credentials import AzureKeyCredential
+            self._client = DocumentIntelligenceClient(endpoint=self.endpoint, credential=AzureKeyCredential(self.key))
+        return self._client
+
+    def analyze(self, document_bytes: bytes) -> dict:
+        poller = self.client.begin_analyze_document(self.model_id, body=io.BytesIO(document_bytes))
+        return poller.result().as_dict()
+
+class LocalDocumentAnalyzer(DocumentAnalyzer):
+    """Offline stand-in for Azure, for tests and benchmarks.
+
+    Returns either a fixed DI dict or whatever the given function builds from the document bytes.
+    """
+    def __init__(self, result: Union[dict, Callable[[bytes], dict]], model_id: str = "local-fake"):
+        self.result = result
+        self.model_id = model_id
+
+    def analyze(self, document_bytes: bytes) -> dict:
+        return self.result(document_bytes) if callable(self.result) else self.result
+
+    @classmethod
+    def from_json_file(cls, path: str, model_id: str = "local-fake") -> "LocalDocumentAnalyzer":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), model_id)
+
+class AnalysisCache:
+    """Gzipped DI results on disk, keyed by the SHA-256 of the document bytes and the model ID."""
+    def __init__(self, cache_dir: str = DI_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, document_bytes: bytes, model_id: str) -> str:
+        digest = hashlib.sha256(document_bytes).hexdigest()
+        safe_model_id = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_id)
+        return os.path.join(self.cache_dir, safe_model_id, f"{digest}.json.gz")
+
+    def get(self, document_bytes: bytes, model_id: str) -> Optional[dict]:
+        """The cached analysis, or None on a miss. Unreadable entries are deleted and count as misses."""
+        path = self.path_for(document_bytes, model_id)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (EOFError, OSError, ValueError) as e:
+            # Truncated or corrupt gzip/JSON (JSONDecodeError and UnicodeDecodeError are ValueErrors)
+            print(f"[WARN] Discarding unreadable DI cache entry {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, document_bytes: bytes, model_id: str, result: dict):
+        path = self.path_for(document_bytes, model_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(result, f, separators=(",", ":"))
+        os.replace(tmp_path, path)  # Readers never see a partially written entry
+
+class CachingDocumentAnalyzer(DocumentAnalyzer):
+    """Serves analyses from an AnalysisCache and only calls the wrapped analyzer on a miss."""
+    def __init__(self, analyzer: DocumentAnalyzer, cache: AnalysisCache):
+        self.analyzer = analyzer
+        self.cache = cache
+        self.model_id = analyzer.model_id
+
+    def analyze(self, document_bytes: bytes) -> dict:
+        result = self.cache.get(document_bytes, self.model_id)
+        if result is None:
+            result = self.analyzer.analyze(document_bytes)
+            self.cache.put(document_bytes, self.model_id, result)
+        return result
+
+def get_document_analyzer(endpoint: str, key: str, cache_dir: str = DI_CACHE_DIR) -> DocumentAnalyzer:
+    """The default analyzer: Azure layout analysis behind the on-disk cache."""
+    return CachingDocumentAnalyzer(AzureDocumentAnalyzer(endpoint, key), AnalysisCache(cache_dir))
+
+def prewarm_analysis_cache(directory: str, analyzer: DocumentAnalyzer) -> Dict[str, int]:
+    """Analyzes every PDF in directory through analyzer (normally a CachingDocumentAnalyzer)."""
+    counts = {"analyzed": 0, "failed": 0}
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                analyzer.analyze(f.read())
+            counts["analyzed"] += 1
+            print(f"✅ Cached analysis for {name}")
+        except Exception as e:
+            counts["failed"] += 1
+            print(f"⚠️ Failed to analyze {name}: {e}")
+    return counts
+
+def load_document(endpoint: str, key: str, file_path: str, analyzer: DocumentAnalyzer = None) -> dict:
+    analyzer = analyzer or get_document_analyzer(endpoint, key)
     with open(file_path, "rb") as f:
-        poller = client.begin_analyze_document("prebuilt-layout", body=f)
-        result = poller.result()
-        return result.as_dict()
-
-def load_document_from_upload(endpoint: str, key: str, uploaded_file) -> dict:
-    client = DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(key))
-    poller = client.begin_analyze_document("prebuilt-layout", body=uploaded_file)
-    result = poller.result()
-    print(poller.result())
-    return result.as_dict()
\ No newline at end of file
+        return analyzer.analyze(f.read())
+
+def load_document_from_upload(endpoint: str, key: str, uploaded_file, analyzer: DocumentAnalyzer = None) -> dict:
+    analyzer = analyzer or get_document_analyzer(endpoint, key)
+    # Streamlit's UploadedFile exposes getvalue(); plain file objects are read from the start.
+    if hasattr(uploaded_file, "getvalue"):
+        document_bytes = uploaded_file.getvalue()
+    else:
+        uploaded_file.seek(0)
+        document_bytes = uploaded_file.read()
+    return analyzer.analyze(document_bytes)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-warm the Azure DI analysis cache from a directory of PDFs.")
+    parser.add_argument("directory")
+    parser.add_argument("--cache-dir", default=DI_CACHE_DIR)
+    args = parser.parse_args()
+    print(prewarm_analysis_cache(args.directory, get_document_analyzer(config.get("azure_di_endpoint"), config.get("azure_di_key"), args.cache_dir)))
@@ -0,0 +1,232 @@
+# core/document/ingestion_pipeline.py
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from config.config import config
+from core.document.chunk_record import ChunkRecord
+from core.document.chunker import iter_chunks, embed_batch_with_retry, EMBED_BATCH_SIZE, EMBED_BATCH_MAX_TOKENS, EMBED_MAX_CONCURRENCY
+from core.llm.llm_client import LLMClient
+from core.vector_database.vector_db_client import BatchWriteError, VectorDBClient
+from retrieval.bm25 import BM25Index
+
+INGEST_QUEUE_SIZE = config.get("ingest_queue_size", 64)
+ENTITY_MAX_WORKERS = config.get("entity_max_workers", 4)
+ENTITY_OVERLAP_CHUNKS = config.get("entity_overlap_chunks", 1)
+ENTITY_COLLECTION_NAME = config.get("entity_collection_name", "DocumentEntities")
+
+class _StageFailure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+_STAGE_DONE = object()
+
+def iter_in_background(items: Iterable[Any], maxsize: int = INGEST_QUEUE_SIZE) -> Iterator[Any]:
+    """Consumes items on a worker thread and hands them over through a bounded queue.
+
+    The worker blocks once maxsize items are waiting (backpressure). Exceptions raised by
+    the worker are re-raised in the consumer, and closing the consumer stops the worker.
+    """
+    handoff = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_STAGE_DONE)
+        except BaseException as e:
+            put(_StageFailure(e))
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = handoff.get()
+            if item is _STAGE_DONE:
+                return
+            if isinstance(item, _StageFailure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+def iter_embedded_chunks(llm_client: LLMClient, chunks: Iterable[Tuple[str, ChunkRecord]], embedding_model: str, batch_size: int = EMBED_BATCH_SIZE, max_batch_tokens: int = EMBED_BATCH_MAX_TOKENS, max_concurrency: int = EMBED_MAX_CONCURRENCY) -> Iterator[ChunkRecord]:
+    """Embeds (text, chunk record) pairs in bounded batches, yielding records in input order.
+
+    At most max_concurrency batches are in flight. Once that many are pending, the stage waits
+    for the oldest batch before reading further chunks.
+    """
+    pending = deque()
+
+    def drain_oldest():
+        batch_records, future = pending.popleft()
+        for record, embedding in zip(batch_records, future.result()):
+            record.set_vector(embedding)
+        return batch_records
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        def submit(batch: List[Tuple[str, ChunkRecord]]):
+            texts = [text for text, _ in batch]
+            future = executor.submit(embed_batch_with_retry, llm_client, texts, embedding_model)
+            pending.append(([record for _, record in batch], future))
+
+        batch = []
+        batch_tokens = 0
+        for text, record in chunks:
+            text_tokens = len(text.split())
+            if batch and (len(batch) >= batch_size or batch_tokens + text_tokens > max_batch_tokens):
+                submit(batch)
+                batch = []
+                batch_tokens = 0
+                while len(pending) >= max_concurrency:
+                    yield from drain_oldest()
+            batch.append((text, record))
+            batch_tokens += text_tokens
+        if batch:
+            submit(batch)
+        while pending:
+            yield from drain_oldest()
+
+def has_stored_entities(chunk: Dict[str, Any]) -> bool:
+    """Whether a stored chunk, as returned by fetch_document_chunks, carries extracted entity properties."""
+    return any(chunk.get(name) is not None for name in ChunkRecord.ENTITY_PROPERTY_NAMES)
+
+def stored_entity_chunk_numbers(vector_db_client: VectorDBClient, collection_name: str, filename: str) -> Set[int]:
+    """chunk_numbers of filename whose stored chunks all carry entity properties."""
+    extracted: Dict[int, bool] = {}
+    for chunk in vector_db_client.fetch_document_chunks(collection_name, filename, properties=list(ChunkRecord.ENTITY_PROPERTY_NAMES)):
+        extracted[chunk["chunk_number"]] = extracted.get(chunk["chunk_number"], True) and has_stored_entities(chunk)
+    return {chunk_number for chunk_number, complete in extracted.items() if complete}
+
+def iter_entity_annotated_chunks(chunks: Iterable[Tuple[str, ChunkRecord]], entity_extractor, skip: Callable[[ChunkRecord], bool] = None, max_concurrency: int = ENTITY_MAX_WORKERS, overlap: int = ENTITY_OVERLAP_CHUNKS) -> Iterator[Tuple[str, ChunkRecord]]:
+    """Sets the entity properties of each record via entity_extractor.extract(text, context), in input order.
+
+    The context is the text of up to `overlap` neighbouring chunks on either side, so the stage reads
+    that far ahead. At most max_concurrency extractions are in flight. Records for which skip(record)
+    is true are passed through untouched but still serve as context for their neighbours.
+    """
+    ahead = deque()
+    recent = deque(maxlen=overlap)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        def submit_next():
+            text, record = ahead.popleft()
+            context = list(recent) + [t for t, _ in islice(ahead, overlap)]
+            future = None if skip is not None and skip(record) else executor.submit(entity_extractor.extract, text, context)
+            pending.append((text, record, future))
+            recent.append(text)
+
+        def drain_oldest():
+            text, record, future = pending.popleft()
+            if future is not None:
+                for name, values in future.result().items():
+                    setattr(record, name, values)
+            return text, record
+
+        for item in chunks:
+            ahead.append(item)
+            if len(ahead) > overlap:
+                submit_next()
+                while len(pending) >= max_concurrency:
+                    yield drain_oldest()
+        while ahead:
+            submit_next()
+        while pending:
+            yield drain_oldest()
+
+def ingest_document(llm_client: LLMClient, vector_db_client: VectorDBClient, collection_name: str, data: Dict[str, Any], min_chunk_tokens: int, embedding_model: str, filename: str, queue_size: int = INGEST_QUEUE_SIZE, embedding_batch_size: int = EMBED_BATCH_SIZE, max_concurrent_embeddings: int = EMBED_MAX_CONCURRENCY, bm25_index: BM25Index = None, entity_extractor=None) -> Dict[str, int]:
+    """Chunks, embeds and writes a document as a streaming pipeline.
+
+    Chunking, embedding and the vector DB writer run concurrently and are joined by bounded queues.
+    Peak memory therefore depends on the queue and batch sizes, not on the document length, and
+    the first chunks become searchable while later sections are still being processed.
+
+    Ingestion is idempotent: chunks whose deterministic ID is already stored are neither embedded
+    nor written again, and stored chunks of filename that the document no longer produces are deleted.
+    Returns counts of written, unchanged and deleted objects. If the writer raises BatchWriteError,
+    it is re-raised before anything is deleted, so a failed re-ingest never loses the old chunks.
+
+    If a BM25 index is given, it is kept in step with the vector DB: new chunks are indexed once the
+    writer has stored them, stored chunks it lacks are indexed and stale ones are removed.
+
+    With an entity_extractor (see agents.entity_extraction.ChunkEntityExtractor), new or changed chunks
+    get their entities extracted before embedding and stored as chunk properties; stored chunks whose
+    entity properties are missing are extracted and written again. Afterwards the entities of all
+    chunks of filename are merged with entity_extractor.reduce and stored as one aggregate record in
+    ENTITY_COLLECTION_NAME; if no chunk has any, the aggregate is deleted. Without an extractor, a
+    stored aggregate is deleted whenever chunks are written or deleted, as it no longer matches them.
+    """
+    existing_ids = vector_db_client.get_object_ids(collection_name, filename)
+    seen_ids = set()
+    unindexed = []
+    unchanged = 0
+    # Stored chunks that lack entities are extracted and written again, under the same ID
+    extracted_numbers = stored_entity_chunk_numbers(vector_db_client, collection_name, filename) if entity_extractor is not None and existing_ids else set()
+
+    def is_unchanged(record: ChunkRecord) -> bool:
+        return record.id in existing_ids and (entity_extractor is None or record.chunk_number in extracted_numbers)
+
+    def changed_chunks():
+        nonlocal unchanged
+        all_chunks = iter_chunks(data, min_chunk_tokens, filename)
+        if entity_extractor is not None:
+            all_chunks = iter_entity_annotated_chunks(all_chunks, entity_extractor, skip=is_unchanged)
+        for text, record in all_chunks:
+            seen_ids.add(record.id)
+            if is_unchanged(record):
+                unchanged += 1
+                if bm25_index is not None and record.id not in bm25_index:
+                    bm25_index.add_documents([record])
+            else:
+                if bm25_index is not None:
+                    # Properties only, so the index doesn't keep the vectors alive until the write ends
+                    unindexed.append((record.id, record.properties()))
+                yield text, record
+
+    chunks = iter_in_background(changed_chunks(), queue_size)
+    embedded = iter_in_background(
+        iter_embedded_chunks(llm_client, chunks, embedding_model, embedding_batch_size, max_concurrency=max_concurrent_embeddings),
+        queue_size,
+    )
+    try:
+        written = vector_db_client.add_data_object_stream(collection_name, embedded)
+    except BatchWriteError as e:
+        # Keep the stale chunks, the BM25 index and the entity aggregate: the document is incomplete without them
+        if e.written:
+            vector_db_client.bump_document_generation(filename)
+        print(f"[WARN] '{filename}': {e.written} chunks written, {len(e.failed_ids)} failed; stale chunks kept")
+        raise
+    if bm25_index is not None:
+        for object_id, properties in unindexed:
+            bm25_index.add(object_id, properties)
+    stale_ids = existing_ids - seen_ids
+    deleted = vector_db_client.delete_objects(collection_name, list(stale_ids)) if stale_ids else 0
+    if bm25_index is not None:
+        bm25_index.remove(stale_ids)
+    if written or deleted:
+        vector_db_client.bump_document_generation(filename)
+    if entity_extractor is not None:
+        chunk_entities = vector_db_client.fetch_document_chunks(collection_name, filename, properties=list(ChunkRecord.ENTITY_PROPERTY_NAMES))
+        if any(has_stored_entities(chunk) for chunk in chunk_entities):
+            vector_db_client.upsert_document_entities(ENTITY_COLLECTION_NAME, filename, entity_extractor.reduce(chunk_entities))
+        else:
+            vector_db_client.delete_document_entities(ENTITY_COLLECTION_NAME, filename)
+    elif written or deleted:
+        vector_db_client.delete_document_entities(ENTITY_COLLECTION_NAME, filename)
+    print(f"✅ '{filename}': {written} chunks written, {unchanged} unchanged, {deleted} stale deleted")
+    return {"written": written, "unchanged": unchanged, "deleted": deleted}
@@ -0,0 +1,136 @@
+# core/document/reference_index.py
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+# Kinds of compiled section element references.
+REF_SKIP = 0  # Reference does not resolve (or resolves to an empty object); ignored
+REF_PARAGRAPH = 1  # Resolves to an object with "content"
+REF_TABLE = 2  # Resolves to an object with "cells"
+REF_INVALID = 3  # Resolves to something else, e.g. a nested section
+REF_TABLE_OUT_OF_RANGE = 4  # "only_tables" section: table index outside the tables list
+REF_TABLE_BAD_FORMAT = 5  # "only_tables" section: reference is not in "table<N>" form
+
+def classify_normalized_refs(normalized: List[str]) -> str:
+    """Classifies a section by the kinds of its element refs, already stripped of leading slashes."""
+    has_sections = has_tables = has_other = False
+    for ref in normalized:
+        if ref.startswith("sections/"):
+            has_sections = True
+        elif ref.startswith("table"):
+            has_tables = True
+        else:
+            has_other = True
+
+    if has_sections and not has_other and not has_tables:
+        return "only_sections"
+    elif has_tables and not has_other and not has_sections:
+        return "only_tables"
+    elif (has_sections and has_other) or (has_tables and has_other) or (has_sections and has_tables):
+        return "mixed"
+    elif not has_sections and not has_tables and has_other:
+        return "only_non_sections"
+    else:
+        return "empty_or_unknown"
+
+class ReferenceIndex:
+    """Azure DI layout with every section's element references compiled to integer arrays.
+
+    paragraphs, sections and tables are addressed through one combined `objects` list
+    (paragraphs first, then sections, then tables). The references of section i are
+    ref_kinds[ref_offsets[i]:ref_offsets[i + 1]], with the matching positions in `objects`
+    in ref_targets. Paragraph page sets and stripped contents are computed once up front,
+    so chunking only does array lookups.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.paragraphs: List[Dict[str, Any]] = data.get("paragraphs", [])
+        self.sections: List[Dict[str, Any]] = data.get("sections", [])
+        self.tables: List[Dict[str, Any]] = data.get("tables", [])
+        self.objects = self.paragraphs + self.sections + self.tables
+        self.table_offset = len(self.paragraphs) + len(self.sections)
+        self._collections = {
+            "paragraphs": (self.paragraphs, 0),
+            "sections": (self.sections, len(self.paragraphs)),
+            "tables": (self.tables, self.table_offset),
+        }
+
+        self.paragraph_pages: List[Tuple[int, ...]] = []
+        self.paragraph_texts: List[Optional[str]] = []
+        for paragraph in self.paragraphs:
+            if isinstance(paragraph, dict):
+                self.paragraph_pages.append(tuple({region.get("pageNumber") for region in paragraph.get("boundingRegions", [])}))
+                self.paragraph_texts.append(paragraph["content"].strip() if "content" in paragraph else None)
+            else:
+                self.paragraph_pages.append(())
+                self.paragraph_texts.append(None)
+
+        self.section_types: List[str] = []
+        self.ref_offsets = array("i", [0])
+        self.ref_kinds = array("b")
+        self.ref_targets = array("i")
+        for section in self.sections:
+            self._compile_section(section)
+
+    def resolve(self, ref: str) -> Tuple[int, int]:
+        """Compiles one reference like "/paragraphs/12" to a (kind, position in objects) pair."""
+        parts = ref.lstrip("/").split("/")
+        if len(parts) != 2 or parts[0] not in self._collections:
+            return REF_SKIP, -1
+        collection, offset = self._collections[parts[0]]
+        try:
+            index = int(parts[1])
+        except ValueError:
+            return REF_SKIP, -1
+        if not -len(collection) <= index < len(collection):
+            return REF_SKIP, -1
+        if index < 0:
+            index += len(collection)
+        referenced = collection[index]
+        if not referenced:
+            return REF_SKIP, -1
+        if isinstance(referenced, dict) and "content" in referenced:
+            return REF_PARAGRAPH, offset + index
+        if isinstance(referenced, dict) and "cells" in referenced:
+            return REF_TABLE, offset + index
+        return REF_INVALID, offset + index
+
+    def resolve_paragraph(self, ref: str) -> int:
+        """Returns the paragraph index a table cell reference points to, or -1."""
+        parts = ref.lstrip("/").split("/")
+        if len(parts) != 2 or parts[0] != "paragraphs":
+            return -1
+        try:
+            index = int(parts[1])
+        except ValueError:
+            return -1
+        if not -len(self.paragraphs) <= index < len(self.paragraphs):
+            return -1
+        if index < 0:
+            index += len(self.paragraphs)
+        return index if self.paragraph_texts[index] is not None else -1
+
+    def _compile_section(self, section: Dict[str, Any]):
+        elements = section.get("elements", [])
+        section_type = classify_normalized_refs([ref.lstrip("/") for ref in elements])
+        self.section_types.append(section_type)
+
+        if section_type == "only_tables":
+            for ref in elements:
+                try:
+                    table_index = int(ref.lstrip("table"))
+                except ValueError:
+                    self.ref_kinds.append(REF_TABLE_BAD_FORMAT)
+                    self.ref_targets.append(-1)
+                    continue
+                if 0 <= table_index < len(self.tables):
+                    self.ref_kinds.append(REF_TABLE)
+                    self.ref_targets.append(self.table_offset + table_index)
+                else:
+                    self.ref_kinds.append(REF_TABLE_OUT_OF_RANGE)
+                    self.ref_targets.append(-1)
+        elif section_type in ("only_non_sections", "mixed"):
+            for ref in elements:
+                kind, target = self.resolve(ref)
+                self.ref_kinds.append(kind)
+                self.ref_targets.append(target)
+        self.ref_offsets.append(len(self.ref_kinds))
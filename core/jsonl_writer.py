@@ -0,0 +1,103 @@
+# core/jsonl_writer.py
+
+import json
+import os
+import queue
+import threading
+from typing import Any, Dict
+
+_STOP = object()
+
+class BackgroundJsonlWriter:
+    """Appends one JSON line per submitted entry from a background thread.
+
+    submit() never waits: the queue is bounded, and when the writer falls behind (slow disk) entries
+    are dropped and counted instead. Entries are turned into records by _record() on the writer
+    thread, so subclasses can defer serialization work there. The file is rotated like
+    logging.handlers.RotatingFileHandler, to path.1 ... path.<backup_count>, once it would grow past
+    max_bytes (0 disables rotation).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3, queue_size: int = 1000, name: str = "jsonl-writer"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, entry: Any) -> bool:
+        """Queues an entry for writing; False if it was dropped because the queue is full."""
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Waits until everything queued so far is on disk; False if that took longer than timeout."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "dropped": self.dropped, "failed": self.failed, "queued": self._queue.qsize()}
+
+    def _record(self, entry: Any) -> Dict[str, Any]:
+        return entry
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                break
+            if isinstance(entry, threading.Event):
+                if self._file:
+                    self._file.flush()
+                entry.set()
+                continue
+            try:
+                self._write(json.dumps(self._record(entry), ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️ Failed to write to {self.path}: {e}")
+            if self._queue.empty() and self._file:
+                self._file.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write(self, line: str):
+        data = line.encode("utf-8")
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        if self.max_bytes > 0 and self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{index}"):
+                    os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
@@ -0,0 +1,49 @@
+import asyncio
+from openai import AsyncOpenAI
+from core.llm.llm_client import AsyncLLMClient
+from core.llm.http_pool import get_shared_async_http_client, LLM_MAX_CONCURRENCY, LLM_TIMEOUT
+from core.llm.call_log import llm_usage
+from core.tracing import add_to_span
+
+
+class AsyncOpenAIClient(AsyncLLMClient):
+    """Async counterpart of OpenAIClient on the process-wide keep-alive connection pool.
+
+    At most max_concurrency requests are in flight per client, and each call is bounded by
+    timeout seconds (overridable per call).
+    """
+    def __init__(self, base_url: str, api_key: str, max_concurrency: int = LLM_MAX_CONCURRENCY, timeout: float = LLM_TIMEOUT):
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=get_shared_async_http_client(), timeout=timeout)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore belongs to the loop the client is used on.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def embed_text(self, text: str, model: str, timeout: float = None) -> list[float]:
+        return (await self.embed_texts([text], model, timeout))[0]
+
+    async def embed_texts(self, texts: list[str], model: str, timeout: float = None) -> list[list[float]]:
+        if not texts:
+            return []
+        async with self.semaphore:
+            response = await asyncio.wait_for(self.client.embeddings.create(input=texts, model=model), timeout or self.timeout)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def generate_text(self, prompt: str, model: str, system_prompt: str = None, timeout: float = None) -> str:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        async with self.semaphore:
+            response = await asyncio.wait_for(self.client.chat.completions.create(model=model, messages=messages), timeout or self.timeout)
+        add_to_span(llm_calls=1, **llm_usage(response))
+        return response.choices[0].message.content.strip()
+
+    async def generate_text_tool(self, prompt: str, model: str, system_prompt: str = None, timeout: float = None) -> str:
+        return await self.generate_text(prompt, model, system_prompt, timeout)
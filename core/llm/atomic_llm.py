@@ -2,45 +2,136 @@
 
 import instructor
 from instructor import from_openai
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from config.config import config
-import datetime
-import json
-import os
-
-LOG_PATH = "llm_calls_log.txt"
+from core.llm.http_pool import get_shared_http_client, get_shared_async_http_client, run_in_llm_loop, LLM_TIMEOUT
+from core.llm.call_log import get_call_logger, llm_usage
+from core.tracing import add_to_span
+import threading
+import time
 
 # --- Helper: Logging ---
-def log_llm_call(messages, response):
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(f"\n--- LLM CALL @ {datetime.datetime.now()} ---\n")
-        f.write(">> INPUT MESSAGES:\n")
-        f.write(json.dumps(messages, indent=2))
-        f.write("\n\n>> RESPONSE:\n")
-        f.write(json.dumps(response, indent=2))
-        f.write("\n" + "-" * 50 + "\n")
+def _call_messages(args, kwargs):
+    messages = kwargs.get("messages")
+    if messages is None and args and isinstance(args[0], dict):
+        messages = args[0].get("messages")
+    return messages or []
 
 # --- Singleton-like client for atomic agents ---
+_client_lock = threading.Lock()
+_wrapped_client = None
+_wrapped_async_client = None
+
 def get_llm_client():
-    client = OpenAI(
-        base_url=config.get("lm_studio_url"),
-        api_key="lm-studio"
-    )
+    """Returns the instructor client shared by all agent modules (one keep-alive connection pool)."""
+    global _wrapped_client
+    with _client_lock:
+        if _wrapped_client is not None:
+            return _wrapped_client
+
+        client = OpenAI(
+            base_url=config.get("lm_studio_url"),
+            api_key="lm-studio",
+            http_client=get_shared_http_client(),
+            timeout=LLM_TIMEOUT
+        )
+
+        wrapped_client = from_openai(client, mode=instructor.Mode.MD_JSON)
+
+        # Wrap the chat.completions.create method; the call log is written on a background thread
+        original_create = wrapped_client.chat.completions.create
+        call_logger = get_call_logger()
+
+        def logging_create(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = original_create(*args, **kwargs)
+            except Exception as e:
+                call_logger.log(kwargs.get("model"), time.perf_counter() - start, _call_messages(args, kwargs), error=e)
+                raise
+            call_logger.log(kwargs.get("model"), time.perf_counter() - start, _call_messages(args, kwargs), response)
+            add_to_span(llm_calls=1, **llm_usage(response))
+            return response
+
+        # Streamed structured output (create_partial) is logged once the stream is exhausted;
+        # streams carry no usage, so only latency is recorded
+        original_create_partial = wrapped_client.chat.completions.create_partial
 
-    wrapped_client = from_openai(client, mode=instructor.Mode.MD_JSON)
+        def logging_create_partial(*args, **kwargs):
+            start = time.perf_counter()
+            partial = None
+            try:
+                for partial in original_create_partial(*args, **kwargs):
+                    yield partial
+            except Exception as e:
+                call_logger.log(kwargs.get("model"), time.perf_counter() - start, _call_messages(args, kwargs), error=e)
+                raise
+            call_logger.log(kwargs.get("model"), time.perf_counter() - start, _call_messages(args, kwargs), partial)
+            add_to_span(llm_calls=1)
 
-    # Wrap the chat.completions.create method
-    original_create = wrapped_client.chat.completions.create
+        wrapped_client.chat.completions.create = logging_create
+        wrapped_client.chat.completions.create_partial = logging_create_partial
+        _wrapped_client = wrapped_client
+        return _wrapped_client
 
-    def logging_create(*args, **kwargs):
-        response = original_create(*args, **kwargs)
-        try:
-            # For logging
-            messages = kwargs.get("messages") or (args[0]["messages"] if args else [])
-            log_llm_call(messages, response.model_dump())
-        except Exception as e:
-            print(f"⚠️ Failed to log LLM call: {e}")
-        return response
+def get_async_llm_client():
+    """Async instructor client for agents, on the shared async connection pool.
+
+    Like AsyncOpenAIClient, it must be awaited on the shared LLM event loop (see core.llm.http_pool);
+    arun_agent and run_agent_in_llm_loop do that for atomic agents.
+    """
+    global _wrapped_async_client
+    with _client_lock:
+        if _wrapped_async_client is not None:
+            return _wrapped_async_client
+
+        client = AsyncOpenAI(
+            base_url=config.get("lm_studio_url"),
+            api_key="lm-studio",
+            http_client=get_shared_async_http_client(),
+            timeout=LLM_TIMEOUT
+        )
+
+        wrapped_client = from_openai(client, mode=instructor.Mode.MD_JSON)
+        original_create = wrapped_client.chat.completions.create
+        call_logger = get_call_logger()
+
+        async def logging_create(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = await original_create(*args, **kwargs)
+            except Exception as e:
+                call_logger.log(kwargs.get("model"), time.perf_counter() - start, _call_messages(args, kwargs), error=e)
+                raise
+            call_logger.log(kwargs.get("model"), time.perf_counter() - start, _call_messages(args, kwargs), response)
+            add_to_span(llm_calls=1, **llm_usage(response))
+            return response
+
+        wrapped_client.chat.completions.create = logging_create
+        _wrapped_async_client = wrapped_client
+        return _wrapped_async_client
+
+async def arun_agent(agent, user_input):
+    """Async counterpart of agent.run(user_input) for an atomic agent, over get_async_llm_client().
+
+    Sends the same request as BaseAgent.run (system prompt plus the agent's memory) with the agent's
+    model and output schema, and records the turn in its memory the same way. Await it on the shared
+    LLM event loop.
+    """
+    agent.memory.initialize_turn()
+    agent.current_user_input = user_input
+    agent.memory.add_message("user", user_input)
+    messages = [{"role": "system", "content": agent.system_prompt_generator.generate_prompt()}] + agent.memory.get_history()
+    response = await get_async_llm_client().chat.completions.create(
+        messages=messages,
+        model=agent.model,
+        response_model=agent.output_schema,
+        temperature=getattr(agent, "temperature", None),
+        max_tokens=getattr(agent, "max_tokens", None),
+    )
+    agent.memory.add_message("assistant", response)
+    return response
 
-    wrapped_client.chat.completions.create = logging_create
-    return wrapped_client
+def run_agent_in_llm_loop(agent, user_input, timeout: float = None):
+    """Runs arun_agent on the shared LLM event loop and blocks for the result, for synchronous callers."""
+    return run_in_llm_loop(arun_agent(agent, user_input), timeout)
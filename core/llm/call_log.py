@@ -0,0 +1,86 @@
+# core/llm/call_log.py
+
+import atexit
+import datetime
+import json
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+from config.config import config
+from core.jsonl_writer import BackgroundJsonlWriter
+
+LLM_LOG_PATH = config.get("llm_log_path", "llm_calls_log.jsonl")
+LLM_LOG_MAX_BYTES = config.get("llm_log_max_bytes", 10 * 1024 * 1024)
+LLM_LOG_BACKUP_COUNT = config.get("llm_log_backup_count", 3)
+LLM_LOG_SAMPLE_RATE = config.get("llm_log_sample_rate", 1.0)
+LLM_LOG_PAYLOAD_CHARS = config.get("llm_log_payload_chars", 2000)
+LLM_LOG_QUEUE_SIZE = config.get("llm_log_queue_size", 1000)
+
+def _truncate(value: Any, max_chars: int) -> str:
+    text = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    return text if len(text) <= max_chars else text[:max_chars] + f"...[{len(text) - max_chars} more chars]"
+
+def llm_usage(response: Any) -> Dict[str, Optional[int]]:
+    """Prompt and completion token counts of a chat completion, or of an instructor result."""
+    # instructor returns the parsed model and keeps the raw completion (with usage) on _raw_response
+    raw = getattr(response, "_raw_response", response)
+    usage = getattr(raw, "usage", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+    }
+
+class LLMCallLogger(BackgroundJsonlWriter):
+    """Writes one compact JSON line per LLM call from a background thread.
+
+    log() only samples and enqueues, and never waits (see BackgroundJsonlWriter); building the record
+    happens on the writer thread. payload_chars > 0 adds the messages and response, each truncated to
+    that many characters of JSON.
+    """
+
+    def __init__(self, path: str = LLM_LOG_PATH, max_bytes: int = LLM_LOG_MAX_BYTES, backup_count: int = LLM_LOG_BACKUP_COUNT, sample_rate: float = LLM_LOG_SAMPLE_RATE, payload_chars: int = LLM_LOG_PAYLOAD_CHARS, queue_size: int = LLM_LOG_QUEUE_SIZE):
+        self.sample_rate = sample_rate
+        self.payload_chars = payload_chars
+        self.sampled_out = 0
+        super().__init__(path, max_bytes, backup_count, queue_size, name="llm-call-log")
+
+    def log(self, model: Optional[str], latency_seconds: float, messages: Optional[List[Dict[str, Any]]] = None, response: Any = None, error: Optional[BaseException] = None):
+        """Records one call; cheap and non-blocking, safe to call from any thread."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        self.submit((datetime.datetime.now(datetime.timezone.utc), model, latency_seconds, messages, response, error))
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "sampled_out": self.sampled_out}
+
+    def _record(self, entry) -> Dict[str, Any]:
+        timestamp, model, latency_seconds, messages, response, error = entry
+        record = {
+            "timestamp": timestamp.isoformat(timespec="milliseconds"),
+            "model": model or getattr(getattr(response, "_raw_response", None), "model", None),
+            "latency_ms": round(latency_seconds * 1000, 1),
+            **llm_usage(response),
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        if self.payload_chars > 0:
+            if messages is not None:
+                record["messages"] = _truncate(messages, self.payload_chars)
+            if response is not None:
+                payload = response.model_dump() if hasattr(response, "model_dump") else response
+                record["response"] = _truncate(payload, self.payload_chars)
+        return record
+
+_lock = threading.Lock()
+_call_logger = None
+
+def get_call_logger() -> LLMCallLogger:
+    """The process-wide call logger; flushed at interpreter exit."""
+    global _call_logger
+    with _lock:
+        if _call_logger is None:
+            _call_logger = LLMCallLogger()
+            atexit.register(_call_logger.close)
+        return _call_logger
@@ -0,0 +1,181 @@
+# core/llm/embedding_cache.py
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Iterator, List, Optional
+
+from core.llm.llm_client import LLMClient
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text before hashing so whitespace-only differences share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (embedding model, hash of normalized text).
+
+    Vectors are stored as float32 blobs in SQLite. When the cache holds more than
+    max_entries vectors, the least recently used ones are evicted. The entry count is
+    kept as a running total, counted once on open and resynchronized by stats(), so
+    inserts don't scan the table.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, last_access INTEGER NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Returns the cached vector for each text, or None where there is no entry."""
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(unique_hashes), 500):
+                part = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *part],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time_ns()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found],
+                )
+                self._conn.commit()
+            vectors = [self._decode(found[h]) if h in found else None for h in hashes]
+            hit_count = sum(1 for vector in vectors if vector is not None)
+            self.hits += hit_count
+            self.misses += len(vectors) - hit_count
+        return vectors
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        now = time.time_ns()
+        rows = [(model, text_hash(text), self._encode(vector), now) for text, vector in zip(texts, vectors)]
+        with self._lock:
+            # Insert new keys first, so the change count is the number of added entries
+            changes = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            inserted = self._conn.total_changes - changes
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(vector, last_access, row_model, row_hash) for row_model, row_hash, vector, last_access in rows],
+                )
+            self._entries += inserted
+            self._evict_if_needed()
+            self._conn.commit()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def put(self, model: str, text: str, vector: List[float]):
+        self.put_many(model, [text], [vector])
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict_if_needed(self):
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            deleted = self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            ).rowcount
+            self._entries -= deleted
+            self.evictions += deleted
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+
+class CachingLLMClient(LLMClient):
+    """Wraps another LLMClient and serves embeddings from an EmbeddingCache where possible.
+
+    Everything else, including attributes of the wrapped client, is delegated to it unchanged.
+    """
+
+    def __init__(self, llm_client: LLMClient, embedding_cache: EmbeddingCache):
+        self.llm_client = llm_client
+        self.embedding_cache = embedding_cache
+
+    def embed_text(self, text: str, model: str) -> list[float]:
+        return self.embed_texts([text], model)[0]
+
+    def embed_texts(self, texts: list[str], model: str) -> list[list[float]]:
+        vectors = self.embedding_cache.get_many(model, texts)
+        # Embed one representative per missing cache key, even if it repeats within the batch.
+        missing = {}
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                missing.setdefault(text_hash(text), text)
+        if missing:
+            missing_texts = list(missing.values())
+            embedded = dict(zip(missing, self.llm_client.embed_texts(missing_texts, model)))
+            self.embedding_cache.put_many(model, missing_texts, list(embedded.values()))
+            vectors = [vector if vector is not None else embedded[text_hash(text)] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def generate_text(self, prompt: str, model: str, system_prompt: str = None) -> str:
+        return self.llm_client.generate_text(prompt, model, system_prompt)
+
+    def generate_text_tool(self, prompt: str, model: str, system_prompt: str = None) -> str:
+        return self.llm_client.generate_text_tool(prompt, model, system_prompt)
+
+    def stream_text(self, prompt: str, model: str, system_prompt: str = None) -> Iterator[str]:
+        return self.llm_client.stream_text(prompt, model, system_prompt)
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes not defined here, e.g. the wrapped client's usage counters
+        if name in ("llm_client", "embedding_cache"):
+            raise AttributeError(name)
+        return getattr(self.llm_client, name)
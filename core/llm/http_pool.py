@@ -0,0 +1,77 @@
+# core/llm/http_pool.py
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Awaitable
+
+import httpx
+from config.config import config
+
+LLM_MAX_CONNECTIONS = config.get("llm_max_connections", 32)
+LLM_MAX_KEEPALIVE_CONNECTIONS = config.get("llm_max_keepalive_connections", 16)
+LLM_MAX_CONCURRENCY = config.get("llm_max_concurrency", 8)
+LLM_TIMEOUT = config.get("llm_timeout", 120.0)
+
+_lock = threading.Lock()
+_http_client = None
+_async_http_client = None
+_loop = None
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS)
+
+def get_shared_http_client() -> httpx.Client:
+    """Process-wide keep-alive pool for synchronous LLM clients."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_limits(), timeout=LLM_TIMEOUT)
+        return _http_client
+
+def get_shared_async_http_client() -> httpx.AsyncClient:
+    """Process-wide keep-alive pool for async LLM clients.
+
+    Async connections belong to the event loop that opened them, so async clients should run on
+    the loop returned by get_llm_event_loop (synchronous callers use run_in_llm_loop).
+    """
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=LLM_TIMEOUT)
+        return _async_http_client
+
+def get_llm_event_loop() -> asyncio.AbstractEventLoop:
+    """A long-lived event loop on a daemon thread, shared by every async LLM call in the process."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+        return _loop
+
+def run_in_llm_loop(coro: Awaitable[Any], timeout: float = None) -> Any:
+    """Runs a coroutine on the shared LLM event loop and blocks the calling thread for its result.
+
+    The coroutine runs in a copy of the caller's contextvars, so e.g. the current tracing span
+    (see core.tracing) is visible to it.
+    """
+    loop = get_llm_event_loop()
+    context = contextvars.copy_context()
+    future = concurrent.futures.Future()
+
+    def start():
+        task = loop.create_task(coro, context=context)
+        task.add_done_callback(lambda done: _copy_result(done, future))
+
+    loop.call_soon_threadsafe(start)
+    return future.result(timeout)
+
+def _copy_result(task: asyncio.Task, future: concurrent.futures.Future):
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
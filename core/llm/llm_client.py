@@ -1,11 +1,20 @@
+import asyncio
+from typing import Iterator
 from abc import ABC, abstractmethod
-from openai import OpenAI
 
 class LLMClient(ABC):
     @abstractmethod
     def embed_text(self, text: str, model: str) -> list[float]:
         pass
 
+    def embed_texts(self, texts: list[str], model: str) -> list[list[float]]:
+        """Embeds several texts, returning one vector per text in input order.
+
+        Clients whose backend accepts batched input should override this to send
+        a single request instead of one per text.
+        """
+        return [self.embed_text(text, model) for text in texts]
+
     @abstractmethod
     def generate_text(self, prompt: str, model: str, system_prompt: str = None) -> str:
         pass
@@ -14,3 +23,29 @@ class LLMClient(ABC):
     def generate_text_tool(self, prompt: str, model: str, system_prompt: str = None) -> str:
         pass
 
+    def stream_text(self, prompt: str, model: str, system_prompt: str = None) -> Iterator[str]:
+        """Yields the completion as text deltas while it is generated.
+
+        Clients whose backend can stream should override this; the default yields the whole
+        generate_text result at once.
+        """
+        yield self.generate_text(prompt, model, system_prompt)
+
+
+class AsyncLLMClient(ABC):
+    """Async counterpart of LLMClient; timeout overrides the client's default per call."""
+
+    @abstractmethod
+    async def embed_text(self, text: str, model: str, timeout: float = None) -> list[float]:
+        pass
+
+    async def embed_texts(self, texts: list[str], model: str, timeout: float = None) -> list[list[float]]:
+        return list(await asyncio.gather(*(self.embed_text(text, model, timeout) for text in texts)))
+
+    @abstractmethod
+    async def generate_text(self, prompt: str, model: str, system_prompt: str = None, timeout: float = None) -> str:
+        pass
+
+    @abstractmethod
+    async def generate_text_tool(self, prompt: str, model: str, system_prompt: str = None, timeout: float = None) -> str:
+        pass
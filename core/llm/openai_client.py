@@ -1,22 +1,49 @@
+from typing import Iterator
 from openai import OpenAI
 from core.llm.llm_client import LLMClient
+from core.llm.http_pool import get_shared_http_client, LLM_TIMEOUT
+from core.llm.call_log import llm_usage
+from core.tracing import add_to_span
 
 
 class OpenAIClient(LLMClient):
     def __init__(self, base_url: str, api_key: str):
-        self.client = OpenAI(base_url=base_url, api_key=api_key)
+        self.client = OpenAI(base_url=base_url, api_key=api_key, http_client=get_shared_http_client(), timeout=LLM_TIMEOUT)
 
     def embed_text(self, text: str, model: str) -> list[float]:
         response = self.client.embeddings.create(input=[text], model=model)
         return response.data[0].embedding
 
-    def generate_text(self, prompt: str, model: str, system_prompt: str = None) -> str:
+    def embed_texts(self, texts: list[str], model: str) -> list[list[float]]:
+        if not texts:
+            return []
+        response = self.client.embeddings.create(input=texts, model=model)
+        # Each embedding carries the index of its input; don't rely on response order.
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _messages(self, prompt: str, system_prompt: str = None) -> list[dict]:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
-        response = self.client.chat.completions.create(model=model, messages=messages)
+        return messages
+
+    def generate_text(self, prompt: str, model: str, system_prompt: str = None) -> str:
+        response = self.client.chat.completions.create(model=model, messages=self._messages(prompt, system_prompt))
+        add_to_span(llm_calls=1, **llm_usage(response))
         return response.choices[0].message.content.strip()
 
+    def stream_text(self, prompt: str, model: str, system_prompt: str = None) -> Iterator[str]:
+        """Streams the completion; closing the generator early closes the HTTP response."""
+        usage_chunk = None
+        # include_usage asks for a final chunk with token counts; servers that don't support it ignore it
+        with self.client.chat.completions.create(model=model, messages=self._messages(prompt, system_prompt), stream=True, stream_options={"include_usage": True}) as stream:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        add_to_span(llm_calls=1, **llm_usage(usage_chunk))
+
     def generate_text_tool(self, prompt: str, model: str, system_prompt: str = None) -> str:
         return self.generate_text(prompt, model, system_prompt)
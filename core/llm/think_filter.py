@@ -0,0 +1,73 @@
+# core/llm/think_filter.py
+from typing import Iterable, Iterator
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+class ThinkFilter:
+    """Removes <think>...</think> spans from text that arrives in pieces.
+
+    feed() returns the visible part of everything fed so far that can already be decided on; only a
+    trailing fragment that may be the start of a tag is held back, so visible text is passed on as
+    soon as it arrives. Leading whitespace of the visible text is dropped, like the .strip() applied
+    to complete responses. A <think> span that is never closed is dropped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._inside = False
+        self._started = False
+
+    def feed(self, delta: str) -> str:
+        self._buffer += delta
+        visible = []
+        while self._buffer:
+            if self._inside:
+                end = self._buffer.find(THINK_CLOSE)
+                if end < 0:
+                    self._buffer = self._buffer[len(self._buffer) - _partial_tag_length(self._buffer, THINK_CLOSE):]
+                    break
+                self._buffer = self._buffer[end + len(THINK_CLOSE):]
+                self._inside = False
+            else:
+                start = self._buffer.find(THINK_OPEN)
+                if start < 0:
+                    held = _partial_tag_length(self._buffer, THINK_OPEN)
+                    visible.append(self._buffer[:len(self._buffer) - held])
+                    self._buffer = self._buffer[len(self._buffer) - held:]
+                    break
+                visible.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(THINK_OPEN):]
+                self._inside = True
+        return self._visible("".join(visible))
+
+    def flush(self) -> str:
+        """The held-back remainder at the end of the stream."""
+        remainder = "" if self._inside else self._buffer
+        self._buffer = ""
+        self._inside = False
+        return self._visible(remainder)
+
+    def _visible(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+def strip_think_stream(deltas: Iterable[str]) -> Iterator[str]:
+    """The non-empty visible pieces of a stream of text deltas, without <think> spans."""
+    think_filter = ThinkFilter()
+    for delta in deltas:
+        visible = think_filter.feed(delta)
+        if visible:
+            yield visible
+    remainder = think_filter.flush()
+    if remainder:
+        yield remainder
@@ -0,0 +1,228 @@
+# core/tracing.py
+
+import atexit
+import contextvars
+import datetime
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config.config import config
+from core.jsonl_writer import BackgroundJsonlWriter
+
+TRACING_ENABLED = config.get("tracing_enabled", True)
+TRACE_LOG_PATH = config.get("trace_log_path", "traces.jsonl")
+TRACE_LOG_MAX_BYTES = config.get("trace_log_max_bytes", 10 * 1024 * 1024)
+METRICS_WINDOW = config.get("metrics_window", 1024)
+METRICS_PORT = config.get("metrics_port", 9464)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Span:
+    """One timed stage. Numeric attributes (tokens, chunks, cache hits) are summed per stage by StageMetrics."""
+    __slots__ = ("name", "stage", "trace_id", "parent", "attributes", "children", "start", "seconds", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.parent = parent
+        self.stage = f"{parent.stage}/{name}" if parent else name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.attributes = dict(attributes or {})
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.error = None
+
+    def add(self, **counters: Optional[float]):
+        """Adds to numeric attributes, e.g. add(prompt_tokens=120, cache_hits=1); None values are ignored."""
+        for key, value in counters.items():
+            if value is not None:
+                self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {"name": self.name, "ms": round(self.seconds * 1000, 2), **self.attributes}
+        if self.error:
+            record["error"] = self.error
+        if self.children:
+            record["children"] = [child.to_dict() for child in self.children]
+        return record
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def add_to_span(**counters: Optional[float]):
+    """Adds counters to the innermost open span; a no-op outside any span."""
+    span_ = _current_span.get()
+    if span_ is not None:
+        span_.add(**counters)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Times the enclosed block as a child of the current span, or as a new trace.
+
+    The span is current for the block, in this thread and in contextvars copies made inside it
+    (contextvars.copy_context().run for worker threads; run_in_llm_loop does this for the LLM loop).
+    Finished spans go to the shared StageMetrics; finished traces also go to its sink.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    parent = _current_span.get()
+    span_ = Span(name, parent, attributes)
+    token = _current_span.set(span_)
+    try:
+        yield span_
+    except BaseException as e:
+        span_.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span_.seconds = time.perf_counter() - span_.start
+        _current_span.reset(token)
+        if parent is not None:
+            parent.children.append(span_)
+        get_stage_metrics().record(span_)
+
+_NOTHING = object()
+
+def first_item_span(items: Iterable[Any], name: str = "first_token") -> Iterator[Any]:
+    """Yields from items, timing the wait for the first item as span name (e.g. time to first token)."""
+    items = iter(items)
+    with span(name):
+        first = next(items, _NOTHING)
+    if first is not _NOTHING:
+        yield first
+        yield from items
+
+def _percentile(sorted_values: List[float], quantile: float) -> float:
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(quantile * len(sorted_values)) - 1)]
+
+class TraceSink(BackgroundJsonlWriter):
+    """Appends one JSON line per finished trace (the root span with all nested spans)."""
+
+    def _record(self, root: Span) -> Dict[str, Any]:
+        return {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"), "trace_id": root.trace_id, **root.to_dict()}
+
+class StageMetrics:
+    """Per-stage latency percentiles and counter totals over finished spans.
+
+    Latencies are kept for the last `window` spans of each stage; counters (tokens, chunks, cache
+    hits, ...) and span counts are totals since start. Stages are span paths such as "qa/decompose".
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW, sink: Optional[TraceSink] = None):
+        self.window = window
+        self.sink = sink
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, span_: Span):
+        with self._lock:
+            self._latencies.setdefault(span_.stage, deque(maxlen=self.window)).append(span_.seconds)
+            self._counts[span_.stage] = self._counts.get(span_.stage, 0) + 1
+            if span_.error:
+                self._errors[span_.stage] = self._errors.get(span_.stage, 0) + 1
+            totals = self._totals.setdefault(span_.stage, {})
+            for key, value in span_.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
+        if span_.parent is None and self.sink is not None:
+            self.sink.submit(span_)
+
+    def _stages(self):
+        with self._lock:
+            stages = {stage: (sorted(latencies), self._counts[stage], self._errors.get(stage, 0), dict(self._totals.get(stage, {}))) for stage, latencies in self._latencies.items()}
+        return sorted(stages.items())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{stage: {"count", "errors", "p50_ms", "p95_ms", "p99_ms", <counter totals>}}, by stage name."""
+        snapshot = {}
+        for stage, (latencies, count, errors, totals) in self._stages():
+            snapshot[stage] = {"count": count, "errors": errors, **{f"p{int(q * 100)}_ms": _percentile(latencies, q) * 1000 for q in QUANTILES}, **totals}
+        return snapshot
+
+    def render_text(self, prefix: str = "contractqa") -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        counters: Dict[str, List[str]] = {}
+        for stage, (latencies, count, errors, totals) in self._stages():
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                lines.append(f'{prefix}_stage_seconds{{stage="{label}",quantile="{q}"}} {_percentile(latencies, q):.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {count}')
+            counters.setdefault("errors", []).append(f'{prefix}_stage_errors_total{{stage="{label}"}} {errors}')
+            for key, value in sorted(totals.items()):
+                counters.setdefault(key, []).append(f'{prefix}_stage_{key}_total{{stage="{label}"}} {value:g}')
+        for key, samples in counters.items():
+            lines.append(f"# TYPE {prefix}_stage_{key}_total counter")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._counts.clear()
+            self._errors.clear()
+            self._totals.clear()
+
+_lock = threading.Lock()
+_stage_metrics = None
+_metrics_server = None
+
+def get_stage_metrics() -> StageMetrics:
+    """The process-wide aggregator, writing finished traces to TRACE_LOG_PATH if that is set."""
+    global _stage_metrics
+    with _lock:
+        if _stage_metrics is None:
+            sink = TraceSink(TRACE_LOG_PATH, TRACE_LOG_MAX_BYTES, name="trace-sink") if TRACE_LOG_PATH else None
+            if sink is not None:
+                atexit.register(sink.close)
+            _stage_metrics = StageMetrics(sink=sink)
+        return _stage_metrics
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serves get_stage_metrics().render_text() at /metrics on a daemon thread, once per process.
+
+    Returns None if the port is 0 or already taken (e.g. by another app process).
+    """
+    global _metrics_server
+    with _lock:
+        if _metrics_server is not None or not port:
+            return _metrics_server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = get_stage_metrics().render_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"[WARN] Metrics endpoint not started on port {port}: {e}")
+            return None
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"📈 Stage metrics at http://{host}:{port}/metrics")
+        return _metrics_server
@@ -0,0 +1,45 @@
+# core/vector_database/filters.py
+from typing import Callable
+
+import numpy as np
+
+_COMPARISONS = {"lessthan": np.less, "lessthanequal": np.less_equal, "greaterthan": np.greater, "greaterthanequal": np.greater_equal}
+
+def filter_mask(filters, column: Callable[[str], np.ndarray], size: int) -> np.ndarray:
+    """Evaluates filters to a boolean row mask, reading property values through column(name).
+
+    filters is either a Weaviate Filter (equality, comparisons, contains_any/contains_all, and/or)
+    or a dict of property -> value, where a list value matches if the property contains any of it.
+    Equality against a list-valued property matches any element, as in Weaviate.
+    """
+    if filters is None:
+        return np.ones(size, dtype=bool)
+    if isinstance(filters, dict):
+        mask = np.ones(size, dtype=bool)
+        for name, value in filters.items():
+            mask &= _match(column(name), "containsany" if isinstance(value, list) else "equal", value)
+        return mask
+    # Weaviate's _FilterAnd/_FilterOr hold their operands in .filters; leaf filters have target/operator/value.
+    if hasattr(filters, "filters"):
+        masks = [filter_mask(f, column, size) for f in filters.filters]
+        combine = np.logical_or if "or" in type(filters).__name__.lower() else np.logical_and
+        return combine.reduce(masks) if masks else np.ones(size, dtype=bool)
+    operator = getattr(filters.operator, "value", filters.operator)
+    if not isinstance(filters.target, str):
+        raise ValueError(f"Unsupported filter target: {filters.target!r}")
+    return _match(column(filters.target), str(operator).lower(), filters.value)
+
+def _match(column: np.ndarray, operator: str, value) -> np.ndarray:
+    if operator in ("equal", "notequal"):
+        if not any(isinstance(v, list) for v in column):
+            mask = column == value
+        else:
+            mask = np.fromiter((value in v if isinstance(v, list) else v == value for v in column), dtype=bool, count=len(column))
+        return ~mask if operator == "notequal" else mask
+    if operator in ("containsany", "containsall"):
+        wanted = set(value if isinstance(value, (list, tuple, set)) else [value])
+        test = (lambda v: not wanted.isdisjoint(v)) if operator == "containsany" else wanted.issubset
+        return np.fromiter((test(v if isinstance(v, list) else [v]) for v in column), dtype=bool, count=len(column))
+    if operator in _COMPARISONS:
+        return np.fromiter((v is not None and bool(_COMPARISONS[operator](v, value)) for v in column), dtype=bool, count=len(column))
+    raise ValueError(f"Unsupported filter operator: {operator}")
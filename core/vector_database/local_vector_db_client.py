@@ -0,0 +1,315 @@
+# core/vector_database/local_vector_db_client.py
+
+import json
+import os
+import shutil
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config.config import config
+from core.document.chunk_record import ChunkRecord
+from core.vector_database.filters import filter_mask
+from core.vector_database.vector_db_client import SearchResult, VectorDBClient
+
+LOCAL_VECTOR_DB_PATH = config.get("local_vector_db_path", "local_vector_db")
+
+class _LocalCollection:
+    """One collection: a float32 matrix of unit-length vectors plus ID and property columns, row-aligned.
+
+    The matrix is allocated with spare rows and grown geometrically, so appending a batch costs time
+    proportional to the batch, not to the collection; vectors is the filled part of it.
+    """
+    def __init__(self, name: str, property_names: List[str] = None):
+        self.name = name
+        self.property_names = property_names or []
+        self.ids: List[str] = []
+        self.properties: List[Dict[str, Any]] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self.row_of: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        # Held by writers and by readers of ids, vectors and columns, so searches running while a
+        # stream is being upserted never see the matrix and the id list at different lengths
+        self.lock = threading.RLock()
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self.ids)]
+
+    @vectors.setter
+    def vectors(self, value: np.ndarray):
+        self._matrix = value
+
+    def column(self, name: str) -> np.ndarray:
+        """Property values as an object array, rebuilt lazily after writes."""
+        with self.lock:
+            if name not in self._columns:
+                values = np.empty(len(self.ids), dtype=object)
+                values[:] = [p.get(name) for p in self.properties] if name != "_id" else self.ids
+                self._columns[name] = values
+            return self._columns[name]
+
+    def upsert(self, data_objects: List[ChunkRecord]):
+        with self.lock:
+            # Keyed by id, so an id repeated within the batch is stored once, with its last record
+            new_rows: Dict[str, tuple] = {}
+            for data_object in data_objects:
+                object_id = str(data_object.id)
+                properties = data_object.properties()
+                vector = np.frombuffer(data_object.vector, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                vector = vector / norm if norm else vector
+                if object_id in self.row_of:
+                    row = self.row_of[object_id]
+                    self._writable()[row] = vector
+                    self.properties[row] = properties
+                else:
+                    new_rows[object_id] = (properties, vector)
+            if new_rows:
+                start = len(self.ids)
+                self._reserve(start + len(new_rows), len(next(iter(new_rows.values()))[1]))
+                for row, (object_id, (properties, vector)) in enumerate(new_rows.items(), start):
+                    self._matrix[row] = vector
+                    self.row_of[object_id] = row
+                    self.ids.append(object_id)
+                    self.properties.append(properties)
+            self._columns.clear()
+
+    def _reserve(self, rows: int, dimensions: int):
+        """Makes room for rows vectors, at least doubling the allocation when it has to grow."""
+        with self.lock:
+            if not self.ids and self._matrix.shape[1:] != (dimensions,):
+                self._matrix = np.zeros((0, dimensions), dtype=np.float32)
+            if rows > self._matrix.shape[0] or not self._matrix.flags.writeable:
+                grown = np.zeros((max(rows, 2 * self._matrix.shape[0], 64), dimensions), dtype=np.float32)
+                grown[:len(self.ids)] = self.vectors
+                self._matrix = grown
+
+    def delete(self, object_ids: List[str]) -> int:
+        with self.lock:
+            rows = {self.row_of[object_id] for object_id in object_ids if object_id in self.row_of}
+            if not rows:
+                return 0
+            keep = np.ones(len(self.ids), dtype=bool)
+            keep[list(rows)] = False
+            self.vectors = self.vectors[keep]
+            self.ids = [object_id for object_id, kept in zip(self.ids, keep) if kept]
+            self.properties = [properties for properties, kept in zip(self.properties, keep) if kept]
+            self.row_of = {object_id: row for row, object_id in enumerate(self.ids)}
+            self._columns.clear()
+            return len(rows)
+
+    def _writable(self) -> np.ndarray:
+        # Collections loaded from disk start out as read-only memory maps; copy on first in-place write.
+        if not self._matrix.flags.writeable:
+            self._matrix = np.array(self._matrix)
+        return self._matrix
+
+    def save(self, directory: str):
+        with self.lock:
+            os.makedirs(directory, exist_ok=True)
+            vectors_path = os.path.join(directory, "vectors.npy")
+            objects_path = os.path.join(directory, "objects.json")
+            tmp_suffix = f".{os.getpid()}.tmp"
+            with open(vectors_path + tmp_suffix, "wb") as f:
+                np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+            with open(objects_path + tmp_suffix, "w", encoding="utf-8") as f:
+                json.dump({"name": self.name, "property_names": self.property_names, "ids": self.ids, "properties": self.properties}, f)
+            if isinstance(self._matrix, np.memmap):
+                self._matrix = np.array(self._matrix)  # Drop the memory map before replacing the file it points at
+            os.replace(vectors_path + tmp_suffix, vectors_path)
+            os.replace(objects_path + tmp_suffix, objects_path)
+
+    @classmethod
+    def load(cls, directory: str) -> "_LocalCollection":
+        with open(os.path.join(directory, "objects.json"), "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        collection = cls(stored["name"], stored["property_names"])
+        collection.ids = stored["ids"]
+        collection.properties = stored["properties"]
+        collection.row_of = {object_id: row for row, object_id in enumerate(collection.ids)}
+        collection.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        return collection
+
+class LocalVectorDBClient(VectorDBClient):
+    """In-process vector store for small deployments, tests and benchmarks; no Weaviate needed.
+
+    Each collection is a float32 matrix of normalized vectors, searched by exact cosine similarity with
+    one matrix-vector product. Collections persist under path as vectors.npy (memory-mapped on load)
+    and objects.json; with path None everything stays in memory.
+
+    There is no vectorizer and no keyword index: hybrid_search needs the query vector and ranks by
+    vector similarity only, whatever alpha is.
+    """
+    def __init__(self, path: Optional[str] = LOCAL_VECTOR_DB_PATH, autosave: bool = True):
+        super().__init__()
+        self.path = path
+        self.autosave = autosave
+        self.collections: Dict[str, _LocalCollection] = {}
+        self.document_entities: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if path:
+            self.connect(path)
+
+    def connect(self, url: str, headers: Dict[str, str] = None):
+        """Opens the store directory at url and loads the collections saved there."""
+        self.path = url
+        self.collections = {}
+        self.document_entities = {}
+        if os.path.exists(os.path.join(url, "document_entities.json")):
+            with open(os.path.join(url, "document_entities.json"), "r", encoding="utf-8") as f:
+                self.document_entities = json.load(f)
+        if os.path.isdir(url):
+            for name in sorted(os.listdir(url)):
+                if os.path.exists(os.path.join(url, name, "objects.json")):
+                    self.collections[name] = _LocalCollection.load(os.path.join(url, name))
+
+    def check_collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self.collections
+
+    def create_collection(self, collection_name: str, vector_index_config: Dict[str, Any] = None, vectorizer_config: Dict[str, Any] = None, properties: List[Any] = None):
+        property_names = [getattr(p, "name", p) for p in properties or []]
+        self.collections.setdefault(collection_name, _LocalCollection(collection_name, property_names))
+        self._save(collection_name)
+
+    def get_collection(self, collection_name: str) -> _LocalCollection:
+        if collection_name not in self.collections:
+            raise KeyError(f"Collection '{collection_name}' does not exist.")
+        return self.collections[collection_name]
+
+    def add_data_objects(self, collection_name: str, data_objects: List[ChunkRecord]):
+        """Inserts records, replacing any stored object with the same id."""
+        try:
+            self.collections.setdefault(collection_name, _LocalCollection(collection_name)).upsert(data_objects)
+        finally:
+            self.bump_generation()
+        self._save(collection_name)
+
+    def add_data_object_stream(self, collection_name: str, data_objects: Iterable[ChunkRecord], batch_size: int = 100) -> int:
+        """Upserts objects batch by batch as they arrive, but writes the collection to disk only once, at the end."""
+        collection = self.collections.setdefault(collection_name, _LocalCollection(collection_name))
+        written = 0
+        iterator = iter(data_objects)
+        try:
+            while batch := list(islice(iterator, batch_size)):
+                collection.upsert(batch)
+                written += len(batch)
+                self.bump_generation()  # Upserted objects are searchable while streaming
+        finally:
+            self.bump_generation()
+            self._save(collection_name)
+        return written
+
+    def get_object_ids(self, collection_name: str, filename: str) -> set[str]:
+        collection = self.collections.get(collection_name)
+        if collection is None:
+            return set()
+        with collection.lock:
+            return {collection.ids[row] for row in np.flatnonzero(collection.column("filename") == filename)}
+
+    def delete_objects(self, collection_name: str, object_ids: List[str]) -> int:
+        collection = self.collections.get(collection_name)
+        if collection is None:
+            return 0
+        try:
+            deleted = collection.delete([str(object_id) for object_id in object_ids])
+        finally:
+            self.bump_generation()
+        self._save(collection_name)
+        return deleted
+
+    def delete_document(self, collection_name: str, filename: str) -> int:
+        """Deletes every object of filename, returning the number deleted."""
+        try:
+            return self.delete_objects(collection_name, list(self.get_object_ids(collection_name, filename)))
+        finally:
+            self.bump_document_generation(filename)
+
+    def fetch_objects(self, collection_name: str, filters=None, limit: int = None) -> List[SearchResult]:
+        """Returns stored objects in insertion order, optionally filtered."""
+        collection = self.get_collection(collection_name)
+        with collection.lock:
+            rows = np.flatnonzero(filter_mask(filters, collection.column, len(collection.ids)))[:limit]
+            return [SearchResult(uuid=collection.ids[row], properties=collection.properties[row]) for row in rows]
+
+    def iter_objects(self, collection_name: str):
+        """Iterates over all objects of a collection with their properties, without vectors."""
+        return iter(self.fetch_objects(collection_name)) if collection_name in self.collections else iter(())
+
+    def fetch_document_chunks(self, collection_name: str, filename: str, properties: List[str] = None) -> List[Dict[str, Any]]:
+        collection = self.collections.get(collection_name)
+        if collection is None:
+            return []
+        with collection.lock:
+            rows = sorted(np.flatnonzero(collection.column("filename") == filename), key=lambda row: collection.properties[row].get("chunk_number", 0))
+            if properties is None:
+                return [dict(collection.properties[row]) for row in rows]
+            return [{name: collection.properties[row].get(name) for name in set(properties) | {"chunk_number"}} for row in rows]
+
+    def upsert_document_entities(self, collection_name: str, filename: str, entities: Dict[str, List[str]]):
+        self.document_entities.setdefault(collection_name, {})[filename] = {"filename": filename, **entities}
+        self._save_document_entities()
+
+    def _save_document_entities(self):
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            entities_path = os.path.join(self.path, "document_entities.json")
+            with open(entities_path + f".{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.document_entities, f)
+            os.replace(entities_path + f".{os.getpid()}.tmp", entities_path)
+
+    def get_document_entities(self, collection_name: str, filename: str) -> Optional[Dict[str, Any]]:
+        return self.document_entities.get(collection_name, {}).get(filename)
+
+    def delete_document_entities(self, collection_name: str, filename: str):
+        if self.document_entities.get(collection_name, {}).pop(filename, None) is not None:
+            self._save_document_entities()
+
+    def hybrid_search(self, collection_name: str, query: str, alpha: float, limit: int, filters=None, vector: List[float] = None) -> List[SearchResult]:
+        """Exact cosine top-k over the objects that pass filters (a Weaviate Filter or a dict, see filter_mask)."""
+        if vector is None:
+            raise ValueError("LocalVectorDBClient has no vectorizer; pass the query vector (Retriever does with client_side_query_vectors).")
+        collection = self.collections.get(collection_name)
+        if collection is None:
+            return []
+        query_vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        query_vector = query_vector / norm if norm else query_vector
+        with collection.lock:
+            if not collection.ids:
+                return []
+            scores = collection.vectors @ query_vector
+            mask = filter_mask(filters, collection.column, len(collection.ids))
+            candidates = np.flatnonzero(mask)
+            if limit < len(candidates):
+                candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [
+                SearchResult(uuid=collection.ids[row], properties=collection.properties[row], score=float(scores[row]), metadata={"score": float(scores[row]), "distance": 1.0 - float(scores[row])})
+                for row in ranked
+            ]
+
+    def delete_all_collections(self):
+        try:
+            for name in list(self.collections):
+                print(f"Deleting collection: {name}")
+                del self.collections[name]
+                if self.path:
+                    shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+            self.document_entities = {}
+            if self.path and os.path.exists(os.path.join(self.path, "document_entities.json")):
+                os.remove(os.path.join(self.path, "document_entities.json"))
+        finally:
+            self.bump_generation()
+            self.bump_document_generation()
+        print("✅ All collections deleted.")
+
+    def flush(self):
+        """Writes every collection to disk; only needed with autosave off."""
+        for name in self.collections:
+            self._save(name, force=True)
+
+    def _save(self, collection_name: str, force: bool = False):
+        if self.path and (self.autosave or force):
+            self.collections[collection_name].save(os.path.join(self.path, collection_name))
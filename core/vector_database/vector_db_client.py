@@ -1,7 +1,59 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable
 #from typing import list, dict, any
 
+from core.document.chunk_record import ChunkRecord
+
+class BatchWriteError(RuntimeError):
+    """Raised after a batch write in which some objects were not stored.
+
+    written is the number of objects that were stored; failed_ids are the IDs of the others.
+    """
+    def __init__(self, collection_name: str, written: int, failed_ids: list[str], messages: list[str]):
+        super().__init__(f"{len(failed_ids)} objects failed to write to '{collection_name}': {'; '.join(messages[:3])}")
+        self.written = written
+        self.failed_ids = failed_ids
+
+@dataclass
+class SearchResult:
+    """A stored object as returned by in-process indexes, shaped like Weaviate's result objects."""
+    uuid: str
+    properties: Dict[str, Any]
+    score: float = 0.0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
 class VectorDBClient(ABC):
+    def __init__(self):
+        self._generation = 0
+        self._documents_epoch = 0
+        self._document_generations: Dict[str, int] = {}
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every write or delete through this client.
+
+        Caches of search results include it in their keys, so nothing cached before a change is served after it.
+        Writers bump it once the change is complete (in a finally), so a search racing the write can only
+        cache its result under the old generation, which is unreachable afterwards.
+        """
+        return self._generation
+
+    def bump_generation(self):
+        self._generation += 1
+
+    def document_generation(self, filename: str) -> int:
+        """Counter bumped whenever the stored chunks of filename change through this client."""
+        return self._documents_epoch + self._document_generations.get(filename, 0)
+
+    def bump_document_generation(self, filename: str = None):
+        """Bumps the generation of filename, or of every document if filename is None."""
+        if filename is None:
+            self._documents_epoch += 1
+        else:
+            self._document_generations[filename] = self._document_generations.get(filename, 0) + 1
+
     @abstractmethod
     def connect(self, url: str, headers: dict[str, str] = None):
         pass
@@ -15,11 +67,68 @@ class VectorDBClient(ABC):
         pass
 
     @abstractmethod
-    def add_data_objects(self, collection_name: str, data_objects: list[dict[str, any]]):
+    def add_data_objects(self, collection_name: str, data_objects: list[ChunkRecord]):
+        pass
+
+    def add_data_object_stream(self, collection_name: str, data_objects: Iterable[ChunkRecord], batch_size: int = 100) -> int:
+        """Inserts objects from an iterable as they arrive, returning how many were written.
+
+        Clients with a native streaming batch writer should override this.
+        """
+        written = 0
+        iterator = iter(data_objects)
+        while batch := list(islice(iterator, batch_size)):
+            self.add_data_objects(collection_name, batch)
+            written += len(batch)
+        return written
+
+    @abstractmethod
+    def get_object_ids(self, collection_name: str, filename: str) -> set[str]:
+        """Returns the IDs of all stored objects belonging to filename."""
+        pass
+
+    @abstractmethod
+    def fetch_document_chunks(self, collection_name: str, filename: str, properties: list[str] = None) -> list[dict[str, any]]:
+        """Returns the properties of all chunks of filename, ordered by chunk_number, without vectors."""
+        pass
+
+    @abstractmethod
+    def upsert_document_entities(self, collection_name: str, filename: str, entities: dict[str, list[str]]):
+        """Stores the aggregate entity record of filename, replacing any earlier one."""
+        pass
+
+    @abstractmethod
+    def get_document_entities(self, collection_name: str, filename: str) -> dict[str, any] | None:
+        """Returns the aggregate entity record of filename, or None if none was stored."""
         pass
 
     @abstractmethod
-    def hybrid_search(self, collection_name: str, query: str, vector: list[float], alpha: float, limit: int):
+    def delete_document_entities(self, collection_name: str, filename: str):
+        """Deletes the aggregate entity record of filename, if any."""
+        pass
+
+    @abstractmethod
+    def delete_objects(self, collection_name: str, object_ids: list[str]) -> int:
+        pass
+
+    def replace_document(self, collection_name: str, filename: str, data_objects: list[ChunkRecord]) -> dict[str, int]:
+        """Makes the stored chunks of filename match data_objects.
+
+        Objects carry deterministic IDs (see chunker.chunk_object_id), so unchanged chunks are left
+        in place, new or changed ones are inserted and chunks that no longer exist are deleted.
+        """
+        existing_ids = self.get_object_ids(collection_name, filename)
+        new_objects = [o for o in data_objects if o.id not in existing_ids]
+        stale_ids = existing_ids - {o.id for o in data_objects}
+        if new_objects:
+            self.add_data_objects(collection_name, new_objects)
+        deleted = self.delete_objects(collection_name, list(stale_ids)) if stale_ids else 0
+        if new_objects or deleted:
+            self.bump_document_generation(filename)
+        return {"written": len(new_objects), "unchanged": len(data_objects) - len(new_objects), "deleted": deleted}
+
+    @abstractmethod
+    def hybrid_search(self, collection_name: str, query: str, alpha: float, limit: int, filters=None, vector: list[float] = None):
         pass
 
     @abstractmethod
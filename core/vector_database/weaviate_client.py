@@ -1,14 +1,19 @@
 #core/vector_database/weaviate_client.py
 
+import uuid
 import weaviate
 from weaviate.classes.config import Configure, Property, DataType, VectorDistances
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable
 
-from core.vector_database.vector_db_client import VectorDBClient
-from weaviate.classes.query import Filter
+from core.document.chunk_record import ChunkRecord
+from core.vector_database.vector_db_client import BatchWriteError, VectorDBClient
+from weaviate.classes.query import Filter, Sort
+
+DOCUMENT_ENTITIES_NAMESPACE = uuid.UUID("0b6f3d2a-8e41-4c57-b1d9-6a2e7f4c9d13")
 
 class WeaviateClient(VectorDBClient):
     def __init__(self):
+        super().__init__()
         self.client = None
 
     def connect(self, url: str, headers: Dict[str, str] = None):
@@ -29,30 +34,173 @@ class WeaviateClient(VectorDBClient):
     def get_collection(self, collection_name: str):
         return self.client.collections.get(collection_name)
 
-    def add_data_objects(self, collection_name: str, data_objects: List[Dict[str, Any]]):
+    def add_data_objects(self, collection_name: str, data_objects: List[ChunkRecord]):
+        """Writes the objects in one dynamic batch; raises BatchWriteError if any of them was not stored."""
+        collection = self.client.collections.get(collection_name)
+        submitted = 0
+        try:
+            with collection.batch.dynamic() as batch:
+                for data_object in data_objects:
+                    # float32 records become plain lists only here, one object at a time
+                    batch.add_object(properties=data_object.properties(), vector=data_object.vector_list(), uuid=data_object.id)
+                    submitted += 1
+        finally:
+            self.bump_generation()
+        self._check_batch(collection, collection_name, submitted)
+
+    def add_data_object_stream(self, collection_name: str, data_objects: Iterable[ChunkRecord], batch_size: int = 100) -> int:
+        """Streams objects into one dynamic batch; Weaviate flushes them while the iterable is still producing.
+
+        The dynamic batch only collects per-object errors, so they are checked once it has closed:
+        if any object was not stored, BatchWriteError is raised with the count of those that were.
+        """
         collection = self.client.collections.get(collection_name)
-        with collection.batch.dynamic() as batch:
-            for data_object in data_objects:
-                batch.add_object(
-                    properties={k: v for k, v in data_object.items() if k != "_additional"},
-                    vector=data_object["_additional"]["vector"]
-                )
-
-    def hybrid_search(self, collection_name: str, query: str, alpha: float, limit: int, filters: Filter = None):
+        written = 0
+        try:
+            with collection.batch.dynamic() as batch:
+                for data_object in data_objects:
+                    batch.add_object(properties=data_object.properties(), vector=data_object.vector_list(), uuid=data_object.id)
+                    written += 1
+                    if written % batch_size == 0:
+                        self.bump_generation()  # Flushed objects become visible while streaming
+        finally:
+            self.bump_generation()
+        return self._check_batch(collection, collection_name, written)
+
+    @staticmethod
+    def _check_batch(collection, collection_name: str, submitted: int) -> int:
+        """Number of submitted objects that were stored; raises BatchWriteError if that is not all of them."""
+        failed = collection.batch.failed_objects
+        if failed:
+            failed_ids = [str(error.object_.uuid) for error in failed]
+            raise BatchWriteError(collection_name, submitted - len(failed), failed_ids, [error.message for error in failed])
+        return submitted
+
+    def get_object_ids(self, collection_name: str, filename: str, page_size: int = 1000) -> set[str]:
+        """Returns the IDs of all objects of filename, without fetching properties or vectors."""
+        collection = self.client.collections.get(collection_name)
+        object_ids = set()
+        offset = 0
+        while True:
+            response = collection.query.fetch_objects(
+                filters=Filter.by_property("filename").equal(filename),
+                return_properties=[],
+                limit=page_size,
+                offset=offset
+            )
+            object_ids.update(str(obj.uuid) for obj in response.objects)
+            if len(response.objects) < page_size:
+                return object_ids
+            offset += page_size
+
+    def fetch_document_chunks(self, collection_name: str, filename: str, properties: List[str] = None, page_size: int = 500) -> List[Dict[str, Any]]:
+        """Returns the properties of all chunks of filename, ordered by chunk_number, without vectors.
+
+        Weaviate's cursor API cannot be combined with filters, so pages are fetched by keyset instead:
+        filename filter plus chunk_number at least the last one seen, sorted by chunk_number and then
+        object ID. chunk_number is not unique while a re-ingest is replacing a document, so the objects
+        already seen with the last chunk_number are skipped by offset rather than by the filter.
+        Only the requested properties are transferred (chunk_number is always included).
+        """
+        collection = self.client.collections.get(collection_name)
+        return_properties = None
+        if properties is not None:
+            return_properties = list(properties) + (["chunk_number"] if "chunk_number" not in properties else [])
+        chunks = []
+        last_chunk_number = None
+        seen_with_last = 0  # Objects already returned whose chunk_number equals last_chunk_number
+        while True:
+            filters = Filter.by_property("filename").equal(filename)
+            if last_chunk_number is not None:
+                filters = filters & Filter.by_property("chunk_number").greater_or_equal(last_chunk_number)
+            response = collection.query.fetch_objects(
+                filters=filters,
+                sort=Sort.by_property("chunk_number", ascending=True).by_property("_id", ascending=True),
+                return_properties=return_properties,
+                include_vector=False,
+                offset=seen_with_last,
+                limit=page_size
+            )
+            chunks.extend(obj.properties for obj in response.objects)
+            if len(response.objects) < page_size:
+                return chunks
+            chunk_number = chunks[-1]["chunk_number"]
+            tied = sum(1 for obj in response.objects if obj.properties["chunk_number"] == chunk_number)
+            seen_with_last = tied + (seen_with_last if chunk_number == last_chunk_number else 0)
+            last_chunk_number = chunk_number
+
+    def upsert_document_entities(self, collection_name: str, filename: str, entities: Dict[str, List[str]]):
+        """Stores the aggregate entity record of filename as one vectorless object keyed by a UUID of the filename."""
+        if not self.check_collection_exists(collection_name):
+            self.client.collections.create(
+                name=collection_name,
+                vectorizer_config=Configure.Vectorizer.none(),
+                properties=[Property(name="filename", data_type=DataType.TEXT)]
+                + [Property(name=name, data_type=DataType.TEXT_ARRAY) for name in entities]
+            )
+        collection = self.client.collections.get(collection_name)
+        object_id = str(uuid.uuid5(DOCUMENT_ENTITIES_NAMESPACE, filename))
+        properties = {"filename": filename, **entities}
+        if collection.data.exists(object_id):
+            collection.data.replace(uuid=object_id, properties=properties)
+        else:
+            collection.data.insert(properties=properties, uuid=object_id)
+
+    def get_document_entities(self, collection_name: str, filename: str) -> Dict[str, Any] | None:
+        if not self.check_collection_exists(collection_name):
+            return None
+        obj = self.client.collections.get(collection_name).query.fetch_object_by_id(str(uuid.uuid5(DOCUMENT_ENTITIES_NAMESPACE, filename)))
+        return obj.properties if obj else None
+
+    def delete_document_entities(self, collection_name: str, filename: str):
+        if self.check_collection_exists(collection_name):
+            self.client.collections.get(collection_name).data.delete_by_id(str(uuid.uuid5(DOCUMENT_ENTITIES_NAMESPACE, filename)))
+
+    def iter_objects(self, collection_name: str):
+        """Iterates over all objects of a collection with their properties, without vectors."""
+        return self.client.collections.get(collection_name).iterator()
+
+    def delete_objects(self, collection_name: str, object_ids: List[str], batch_size: int = 500) -> int:
+        """Batch-deletes objects by ID, returning the number deleted."""
+        collection = self.client.collections.get(collection_name)
+        deleted = 0
+        try:
+            for start in range(0, len(object_ids), batch_size):
+                result = collection.data.delete_many(where=Filter.by_id().contains_any(object_ids[start:start + batch_size]))
+                deleted += result.successful
+        finally:
+            self.bump_generation()
+        return deleted
+
+    def delete_document(self, collection_name: str, filename: str) -> int:
+        """Deletes every object of filename, returning the number deleted."""
+        collection = self.client.collections.get(collection_name)
+        try:
+            return collection.data.delete_many(where=Filter.by_property("filename").equal(filename)).successful
+        finally:
+            self.bump_generation()
+            self.bump_document_generation(filename)
+
+    def hybrid_search(self, collection_name: str, query: str, alpha: float, limit: int, filters: Filter = None, vector: List[float] = None):
+        """Hybrid search; when vector is given, Weaviate uses it instead of vectorizing the query itself."""
         collection = self.client.collections.get(collection_name)
-        return collection.query.hybrid(query=query, alpha=alpha, limit=limit, filters=filters).objects
+        return collection.query.hybrid(query=query, vector=vector, alpha=alpha, limit=limit, filters=filters).objects
 
     def delete_all_collections(self):
         """Deletes all collections in the Weaviate instance."""
         if self.client:
-            for collection in self.client.collections.list().keys():
-                print(f"Deleting collection: {collection}")
-                self.client.collections.delete(collection)
+            try:
+                for collection in self.client.collections.list().keys():
+                    print(f"Deleting collection: {collection}")
+                    self.client.collections.delete(collection)
+            finally:
+                self.bump_generation()
+                self.bump_document_generation()
             print("✅ All collections deleted.")
         else:
             print("⚠️ Weaviate client is not connected.")
 
-    def retrieve_with_metadata_filter(self, collection_name: str, query: str, metadata_filter: Dict[str, Any], top_k: int = 5, alpha: float = 0.0):
+    def retrieve_with_metadata_filter(self, collection_name: str, query: str, metadata_filter: Dict[str, Any], top_k: int = 5, alpha: float = 0.0, vector: List[float] = None):
         """Retrieves objects with a complex metadata filter."""
         collection = self.client.collections.get(collection_name)
         compound_filter = None
@@ -67,4 +215,4 @@ class WeaviateClient(VectorDBClient):
                 else:
                     compound_filter = conditions[0]
 
-        return self.hybrid_search(collection_name, query, alpha, top_k, filters=compound_filter)
\ No newline at end of file
+        return self.hybrid_search(collection_name, query, alpha, top_k, filters=compound_filter, vector=vector)
\ No newline at end of file
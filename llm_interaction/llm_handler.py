@@ -1,15 +1,18 @@
 # llm_interaction/llm_handler.py
 
-from core.llm.llm_client import LLMClient
+from core.llm.llm_client import LLMClient, AsyncLLMClient
+from core.llm.think_filter import strip_think_stream
+from core.tracing import first_item_span
 from llm_interaction.prompt_builder import build_rag_prompt, build_system_prompt, build_agent_action_prompt, build_query_decomposition_prompt, build_final_answer_prompt
 import re
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 
 class LLMHandler:
-    def __init__(self, llm_client: LLMClient, chat_model: str):
+    def __init__(self, llm_client: LLMClient, chat_model: str, async_llm_client: Optional[AsyncLLMClient] = None):
         self.llm_client = llm_client
         self.chat_model = chat_model
+        self.async_llm_client = async_llm_client
 
     def generate_rag_response(self, query: str, context_chunks: list[str]) -> str:
         """
@@ -29,6 +32,32 @@ class LLMHandler:
         clean_text = re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL).strip()
         return clean_text
 
+    def stream_rag_response(self, query: str, context_chunks: list[str]) -> Iterator[str]:
+        """
+        Streaming version of generate_rag_response, yielding the answer as it is generated.
+
+        <think> spans are filtered out as they arrive, so the first yielded piece is the first
+        visible text. The wait for it is timed as a "first_token" span.
+        """
+        prompt = build_rag_prompt(query, context_chunks)
+        system_prompt = build_system_prompt()
+        return first_item_span(strip_think_stream(self.llm_client.stream_text(prompt=prompt, model=self.chat_model, system_prompt=system_prompt)))
+
+    async def agenerate_rag_response(self, query: str, context_chunks: list[str]) -> str:
+        """
+        Async version of generate_rag_response, using the handler's AsyncLLMClient.
+
+        Many questions can be awaited concurrently; the client bounds in-flight requests.
+        """
+        if self.async_llm_client is None:
+            raise ValueError("LLMHandler was created without an async_llm_client.")
+        prompt = build_rag_prompt(query, context_chunks)
+        system_prompt = build_system_prompt()
+        response = await self.async_llm_client.generate_text(prompt=prompt, model=self.chat_model, system_prompt=system_prompt)
+
+        clean_text = re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL).strip()
+        return clean_text
+
     def decide_action(self, query: str, available_tools: Dict[str, Dict[str, Any]], previous_steps: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Decides which action to take based on the user query and available tools.
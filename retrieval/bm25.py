@@ -0,0 +1,203 @@
+# retrieval/bm25.py
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+from config.config import config
+from core.document.chunk_record import ChunkRecord
+from core.vector_database.filters import filter_mask
+from core.vector_database.vector_db_client import SearchResult
+
+BM25_K1 = config.get("bm25_k1", 1.2)
+BM25_B = config.get("bm25_b", 0.75)
+
+# Clause references first so "12.3(b)" and "4(a)(ii)" stay one token, then plain numbers ("1,000.00", "5%"), then words.
+_TOKEN_RE = re.compile(
+    r"\d+(?:\.\d+)*(?:\([a-z0-9]{1,4}\))+"
+    r"|\d+(?:\.\d+)+[a-z]?"
+    r"|\d[\d,]*(?:\.\d+)?%?"
+    r"|[a-z]+(?:['’][a-z]+)?"
+)
+# Runs of two or more capitalized words on one line, e.g. "Confidential Information" or "EFFECTIVE DATE".
+_DEFINED_TERM_RE = re.compile(r"[A-Z][A-Za-z'’-]*(?:[ \t]+[A-Z][A-Za-z'’-]*)+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+_TERM_LEADING_WORDS = frozenset("the this that these those each any all such a an in if no".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased BM25 tokens that keep contract vocabulary intact.
+
+    Clause references ("12.3(b)") and numbers are single tokens. Capitalized multi-word defined
+    terms ("Confidential Information") are emitted as one extra token next to their words, so
+    queries naming a defined term rank chunks that use the exact term first.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token[0].isdigit():
+            tokens.append(token.replace(",", ""))
+        elif token not in _STOPWORDS:
+            tokens.append(token)
+    for term in _DEFINED_TERM_RE.findall(text):
+        words = term.lower().split()
+        while words and words[0] in _TERM_LEADING_WORDS:
+            words.pop(0)
+        if len(words) > 1:
+            tokens.append(" ".join(words))
+    return tokens
+
+class BM25Index:
+    """Incrementally updatable BM25 index over chunk content and heading.
+
+    Postings are parallel array('I') lists of document numbers and term frequencies per term, scored
+    with numpy. Removed chunks are only marked dead; the postings are compacted once dead documents
+    outnumber live ones. Properties are kept alongside, so the index can answer queries on its own
+    when the vector database is unavailable.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B, tokenizer: Callable[[str], List[str]] = tokenize):
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer
+        self._lock = threading.RLock()
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self.doc_of)
+
+    def __contains__(self, object_id) -> bool:
+        return str(object_id) in self.doc_of
+
+    def add(self, object_id, properties: Dict[str, Any]):
+        """Indexes one chunk, replacing any earlier version with the same ID."""
+        object_id = str(object_id)
+        term_frequencies = Counter(self.tokenizer(properties.get("heading") or ""))
+        term_frequencies.update(self.tokenizer(properties.get("content") or ""))
+        with self._lock:
+            self._remove(object_id)
+            doc = len(self.object_ids)
+            for term, frequency in term_frequencies.items():
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    term_id = self.term_ids[term] = len(self.posting_docs)
+                    self.posting_docs.append(array("I"))
+                    self.posting_tfs.append(array("I"))
+                self.posting_docs[term_id].append(doc)
+                self.posting_tfs[term_id].append(frequency)
+            length = sum(term_frequencies.values())
+            self.doc_lengths.append(length)
+            self.alive.append(1)
+            self.object_ids.append(object_id)
+            self.properties.append(properties)
+            self.doc_of[object_id] = doc
+            self.total_length += length
+
+    def add_documents(self, records: Iterable[ChunkRecord]):
+        """Indexes chunk records as produced by the chunker; vectors are ignored."""
+        for record in records:
+            self.add(record.id, record.properties())
+
+    def add_objects(self, objects: Iterable[Any]):
+        """Indexes stored objects with uuid and properties, e.g. to rebuild the index from the vector database at startup."""
+        for obj in objects:
+            self.add(obj.uuid, obj.properties)
+
+    def rebuild(self, objects: Iterable[Any]):
+        """Replaces the contents with stored objects (see add_objects); searches use the old contents until the new ones are built."""
+        fresh = BM25Index(self.k1, self.b, self.tokenizer)
+        fresh.add_objects(objects)
+        with self._lock:
+            for name in ("term_ids", "posting_docs", "posting_tfs", "doc_lengths", "alive", "object_ids", "properties", "doc_of", "total_length"):
+                setattr(self, name, getattr(fresh, name))
+
+    def remove(self, object_ids: Iterable[str]) -> int:
+        with self._lock:
+            removed = sum(self._remove(str(object_id)) for object_id in object_ids)
+            if len(self.object_ids) - len(self.doc_of) > max(len(self.doc_of), 1024):
+                self._compact()
+            return removed
+
+    def remove_document(self, filename: str) -> int:
+        with self._lock:
+            return self.remove([object_id for object_id, doc in self.doc_of.items() if self.properties[doc].get("filename") == filename])
+
+    def clear(self):
+        with self._lock:
+            self.term_ids: Dict[str, int] = {}
+            self.posting_docs: List[array] = []
+            self.posting_tfs: List[array] = []
+            self.doc_lengths = array("I")
+            self.alive = bytearray()
+            self.object_ids: List[str] = []
+            self.properties: List[Dict[str, Any]] = []
+            self.doc_of: Dict[str, int] = {}
+            self.total_length = 0
+
+    def search(self, query: str, limit: int = 5, filters=None) -> List[SearchResult]:
+        """Top chunks by BM25 score; filters is a Weaviate Filter or a dict, see core.vector_database.filters."""
+        query_terms = Counter(self.tokenizer(query))
+        with self._lock:
+            if not self.doc_of or not query_terms:
+                return []
+            size = len(self.object_ids)
+            alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.uintc).astype(np.float32)
+            norms = self.k1 * (1 - self.b + self.b * lengths / (self.total_length / len(self.doc_of) or 1.0))
+            scores = np.zeros(size, dtype=np.float32)
+            for term, query_frequency in query_terms.items():
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    continue
+                docs = np.frombuffer(self.posting_docs[term_id], dtype=np.uintc).astype(np.intp)
+                tfs = np.frombuffer(self.posting_tfs[term_id], dtype=np.uintc).astype(np.float32)
+                live = alive[docs]
+                docs, tfs = docs[live], tfs[live]
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (len(self.doc_of) - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += query_frequency * idf * tfs * (self.k1 + 1) / (tfs + norms[docs])
+            mask = alive & (scores > 0)
+            if filters is not None:
+                mask &= filter_mask(filters, self._column, size)
+            candidates = np.flatnonzero(mask)
+            if limit < len(candidates):
+                candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [
+                SearchResult(uuid=self.object_ids[doc], properties=self.properties[doc], score=float(scores[doc]), metadata={"score": float(scores[doc])})
+                for doc in ranked
+            ]
+
+    def _column(self, name: str) -> np.ndarray:
+        values = np.empty(len(self.properties), dtype=object)
+        values[:] = [properties.get(name) if properties is not None else None for properties in self.properties]
+        return values
+
+    def _remove(self, object_id: str) -> bool:
+        doc = self.doc_of.pop(object_id, None)
+        if doc is None:
+            return False
+        self.alive[doc] = 0
+        self.total_length -= self.doc_lengths[doc]
+        self.properties[doc] = None
+        return True
+
+    def _compact(self):
+        alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+        new_doc = np.cumsum(alive) - 1
+        for term_id in range(len(self.posting_docs)):
+            docs = np.frombuffer(self.posting_docs[term_id], dtype=np.uintc).astype(np.intp)
+            live = alive[docs]
+            self.posting_docs[term_id] = array("I", new_doc[docs[live]].astype(np.uintc).tobytes())
+            self.posting_tfs[term_id] = array("I", np.frombuffer(self.posting_tfs[term_id], dtype=np.uintc)[live].tobytes())
+        kept = np.flatnonzero(alive)
+        self.doc_lengths = array("I", np.frombuffer(self.doc_lengths, dtype=np.uintc)[kept].tobytes())
+        self.object_ids = [self.object_ids[doc] for doc in kept]
+        self.properties = [self.properties[doc] for doc in kept]
+        self.alive = bytearray(b"\x01" * len(kept))
+        self.doc_of = {object_id: doc for doc, object_id in enumerate(self.object_ids)}
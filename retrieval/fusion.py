@@ -0,0 +1,46 @@
+# retrieval/fusion.py
+from dataclasses import replace
+from typing import Any, Dict, List, Sequence
+
+from config.config import config
+
+RRF_K = config.get("rrf_k", 60)
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[Any]], limit: int = None, k: int = RRF_K) -> List[Any]:
+    """Merges ranked result lists by reciprocal rank fusion.
+
+    Each object scores sum(1 / (k + rank)) over the lists it appears in, matched by str(uuid). Only
+    ranks are used, so lists with incomparable scores (vector similarity, BM25) fuse fairly. Where an
+    object appears in several lists, the instance from the earliest list is returned.
+    """
+    scores: Dict[str, float] = {}
+    objects: Dict[str, Any] = {}
+    for results in ranked_lists:
+        for rank, result in enumerate(results, start=1):
+            key = str(result.uuid)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            objects.setdefault(key, result)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [objects[key] for key in fused[:limit]]
+
+def relative_score_fusion(ranked_lists: Sequence[Sequence[Any]], weights: Sequence[float], limit: int = None) -> List[Any]:
+    """Merges SearchResult lists the way Weaviate's relativeScoreFusion does.
+
+    Each list's scores are min-max normalized to [0, 1] and weighted, and an object scores the sum
+    over the lists it appears in; hybrid search with alpha is [dense, sparse] with weights
+    [alpha, 1 - alpha]. Returned objects carry the fused score.
+    """
+    scores: Dict[str, float] = {}
+    objects: Dict[str, Any] = {}
+    for results, weight in zip(ranked_lists, weights):
+        if not results or weight <= 0:
+            continue
+        low = min(result.score for result in results)
+        spread = max(result.score for result in results) - low
+        for result in results:
+            key = str(result.uuid)
+            normalized = (result.score - low) / spread if spread else 1.0
+            scores[key] = scores.get(key, 0.0) + weight * normalized
+            objects.setdefault(key, result)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [replace(objects[key], score=scores[key], metadata={**objects[key].metadata, "score": scores[key]}) for key in fused[:limit]]
@@ -2,13 +2,148 @@
 from core.vector_database.vector_db_client import VectorDBClient
 from core.llm.llm_client import LLMClient
 from weaviate.classes.query import Filter  # Make sure Filter is imported here
-from typing import Union, List
+from typing import Union, List, Tuple, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import contextvars
+import threading
+from config.config import config
+from core.cache import LRUCache
+from core.tracing import span, add_to_span
+from retrieval.bm25 import BM25Index
+from retrieval.fusion import reciprocal_rank_fusion
+import time
+
+RETRIEVAL_MAX_WORKERS = config.get("retrieval_max_workers", 4)
+CLIENT_SIDE_QUERY_VECTORS = config.get("client_side_query_vectors", True)
+QUERY_VECTOR_CACHE_SIZE = config.get("query_vector_cache_size", 1024)
+RESULT_CACHE_SIZE = config.get("retrieval_cache_size", 256)
+RESULT_CACHE_TTL = config.get("retrieval_cache_ttl_seconds", 300)
+RETRIEVAL_FUSION = config.get("retrieval_fusion", False)
+BM25_REFRESH_SECONDS = config.get("bm25_refresh_seconds", 300)
+FUSION_CANDIDATES = config.get("fusion_candidates", 20)
+FUSION_DENSE_ALPHA = config.get("fusion_dense_alpha", 1.0)  # In Weaviate 1.0 is pure vector search
+DENSE_SEARCH_TIMEOUT = config.get("dense_search_timeout_seconds", 5.0)
+
 class Retriever:
-    def __init__(self, vector_db_client: VectorDBClient, llm_client: LLMClient, embedding_model: str):
+    def __init__(self, vector_db_client: VectorDBClient, llm_client: LLMClient, embedding_model: str, client_side_vectors: bool = CLIENT_SIDE_QUERY_VECTORS, bm25_index: BM25Index = None, fusion: bool = RETRIEVAL_FUSION, bm25_refresh_seconds: float = BM25_REFRESH_SECONDS):
         self.vector_db_client = vector_db_client
         self.llm_client = llm_client
         self.embedding_model = embedding_model
         self.collection_name = "Document"  # Assuming your collection name
+        self.client_side_vectors = client_side_vectors and llm_client is not None
+        self.query_vector_cache = LRUCache(QUERY_VECTOR_CACHE_SIZE)
+        self.result_cache = LRUCache(RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+        self.saved_seconds = 0.0
+        self.bm25_index = bm25_index
+        self.fusion = fusion and bm25_index is not None
+        self.sparse_fallbacks = 0
+        self.bm25_refresh_seconds = bm25_refresh_seconds
+        self._bm25_built_at = time.monotonic()
+        self._bm25_refresh_lock = threading.Lock()
+        self._dense_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="dense-search")
+
+    def embed_query(self, query: str) -> Optional[List[float]]:
+        """
+        Embeds a query in-process so searches don't depend on Weaviate calling the embedding server.
+
+        Repeated queries are served from an LRU cache. Returns None when client-side vectors are
+        disabled; the search then only has a dense side if the collection has a server-side
+        vectorizer, which the collections created by this app (Vectorizer.none()) do not.
+        """
+        if not self.client_side_vectors:
+            return None
+        key = (self.embedding_model, query)
+        vector = self.query_vector_cache.get(key)
+        if vector is None:
+            vector = self.llm_client.embed_text(query, self.embedding_model)
+            self.query_vector_cache.put(key, vector)
+        return vector
+
+    def cached_hybrid_search(self, query: str, alpha: float, limit: int, filters: Filter = None):
+        """
+        Runs a hybrid search on the vector database through a bounded LRU+TTL result cache.
+
+        The key includes the vector DB client's generation counter, so a write or delete through that
+        client makes all earlier entries unreachable. The TTL bounds staleness from writers in other processes.
+        """
+        key = (self.collection_name, self.vector_db_client.generation, query, alpha, limit, repr(filters))
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            results, seconds = cached
+            self.saved_seconds += seconds
+            add_to_span(cache_hits=1)
+            return results
+        add_to_span(cache_misses=1)
+
+        start = time.perf_counter()
+        results = self.vector_db_client.hybrid_search(
+            collection_name=self.collection_name,
+            query=query,
+            vector=self.embed_query(query),
+            alpha=alpha,
+            limit=limit,
+            filters=filters
+        )
+        self.result_cache.put(key, (results, time.perf_counter() - start))
+        return results
+
+    def fused_search(self, query: str, top_k: int = 5, filters: Filter = None, candidates: int = FUSION_CANDIDATES, dense_timeout: float = DENSE_SEARCH_TIMEOUT):
+        """
+        Fuses dense results from the vector database with sparse results from the BM25 index.
+
+        Both searches fetch `candidates` results and are merged by reciprocal rank fusion. If the
+        dense search fails or takes longer than dense_timeout seconds, the sparse results are
+        returned on their own, so search keeps working while the vector database is slow or down.
+
+        The BM25 index is kept current only by ingestion in this process; see refresh_bm25_if_stale
+        for writes from elsewhere.
+        """
+        self.refresh_bm25_if_stale()
+        dense_future = self._dense_executor.submit(contextvars.copy_context().run, self.cached_hybrid_search, query, FUSION_DENSE_ALPHA, candidates, filters)
+        sparse = self.bm25_index.search(query, limit=candidates, filters=filters)
+        try:
+            dense = dense_future.result(timeout=dense_timeout)
+        except FutureTimeoutError:
+            print(f"[WARN] Dense search took longer than {dense_timeout}s, using BM25 results only")
+            self.sparse_fallbacks += 1
+            add_to_span(sparse_fallbacks=1)
+            return sparse[:top_k]
+        except Exception as e:
+            print(f"[WARN] Dense search failed ({e}), using BM25 results only")
+            self.sparse_fallbacks += 1
+            add_to_span(sparse_fallbacks=1)
+            return sparse[:top_k]
+        return reciprocal_rank_fusion([dense, sparse], limit=top_k)
+
+    def refresh_bm25_if_stale(self):
+        """Starts a background rebuild of the BM25 index from the vector DB once it is bm25_refresh_seconds old.
+
+        Searches keep using the current index until the rebuilt one is swapped in, so chunks ingested
+        or deleted by other processes are reflected within about one refresh interval.
+        """
+        if not self.bm25_refresh_seconds or time.monotonic() - self._bm25_built_at < self.bm25_refresh_seconds:
+            return
+        if not self._bm25_refresh_lock.acquire(blocking=False):
+            return  # Already rebuilding
+
+        def rebuild():
+            try:
+                self.bm25_index.rebuild(self.vector_db_client.iter_objects(self.collection_name))
+            except Exception as e:
+                print(f"[WARN] BM25 index refresh failed ({e}), retrying after the next interval")
+            finally:
+                self._bm25_built_at = time.monotonic()
+                self._bm25_refresh_lock.release()
+
+        threading.Thread(target=rebuild, name="bm25-refresh", daemon=True).start()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the result cache and the search latency its hits saved."""
+        stats = self.result_cache.stats()
+        stats["saved_ms"] = self.saved_seconds * 1000
+        stats["query_vector_cache"] = self.query_vector_cache.stats()
+        stats["sparse_fallbacks"] = self.sparse_fallbacks
+        return stats
 
     def retrieve_relevant_chunks(self, query: str, top_k: int = 5, alpha: float = 0.0, filters: Filter = None):
         
@@ -24,8 +159,7 @@ class Retriever:
         Returns:
             A list of retrieved document objects from the vector database.
         """
-        results = self.vector_db_client.hybrid_search(
-            collection_name=self.collection_name,
+        results = self.cached_hybrid_search(
             query=query,
             alpha=alpha,
             limit=top_k,
@@ -45,8 +179,7 @@ class Retriever:
 
     def retrieve_by_metadata_filter(self, query: str, filter_property: str, filter_value: str, top_k: int = 5, alpha: float = 0.0):
 
-        results = self.vector_db_client.hybrid_search(
-            collection_name=self.collection_name,
+        results = self.cached_hybrid_search(
             query=query,
             filters=Filter.by_property(filter_property).equal(filter_value),
             alpha=alpha,
@@ -68,8 +201,7 @@ class Retriever:
                 else:
                     compound_filter = conditions[0]
 
-        results = self.vector_db_client.hybrid_search(
-            collection_name=self.collection_name,
+        results = self.cached_hybrid_search(
             query=query,
             alpha=alpha,
             limit=top_k,
@@ -90,15 +222,57 @@ class Retriever:
         Returns:
             A list of retrieved document objects from the vector database.
         """
-        results = self.vector_db_client.hybrid_search(
-            collection_name=self.collection_name,
+        if self.fusion:
+            return self.fused_search(query=query, top_k=top_k)
+        results = self.cached_hybrid_search(
             query=query,
             alpha=0.3,
             limit=top_k,
            # Pass the filters to the hybrid_search method
         )
         return results        
-        
+
+    def retrieve_for_queries(self, queries: List[str], top_k: int = 5, max_workers: int = RETRIEVAL_MAX_WORKERS) -> Tuple[List[Any], List[Dict[str, Any]]]:
+        """
+        Runs hybrid_search for several sub-queries concurrently and merges the results.
+
+        Args:
+            queries: The sub-queries to search for.
+            top_k: The number of results to retrieve per sub-query.
+            max_workers: The maximum number of searches in flight at once.
+
+        Returns:
+            A tuple (results, timings). results holds the retrieved objects in sub-query order and
+            then rank order, with each object ID kept only at its first occurrence. timings holds one
+            {"query", "seconds", "results"} entry per sub-query.
+        """
+        def timed_search(query: str):
+            start = time.perf_counter()
+            with span("hybrid_search"):
+                results = self.hybrid_search(query=query, top_k=top_k)
+                add_to_span(chunks=len(results))
+            return results, time.perf_counter() - start
+
+        if not queries:
+            return [], []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries)))) as executor:
+            # Each search runs in a copy of this context, so its span nests under the caller's
+            futures = [executor.submit(contextvars.copy_context().run, timed_search, query) for query in queries]
+            searches = [future.result() for future in futures]
+
+        merged = []
+        seen_ids = set()
+        timings = []
+        with span("dedupe"):
+            for query, (results, seconds) in zip(queries, searches):
+                timings.append({"query": query, "seconds": seconds, "results": len(results)})
+                for result in results:
+                    if str(result.uuid) not in seen_ids:
+                        seen_ids.add(str(result.uuid))
+                        merged.append(result)
+            add_to_span(chunks=len(merged))
+        return merged, timings
+
     def targeted_search(self, query: str, top_k: int = 5, key: str = '', value: Union[str, int, List[Union[str, int]]] = None):
         """
         Retrieves relevant document chunks based on a user query using hybrid search.
@@ -114,12 +288,12 @@ class Retriever:
         """
         if not isinstance(value, list):
             value = [value]        
-        filters=Filter.by_property(key).containsAny(value)
-        results = self.vector_db_client.hybrid_search(
-            collection_name=self.collection_name,
+        # Also matches the entity properties (parties, dates, amounts, obligations) stored at ingestion
+        filters=Filter.by_property(key).contains_any(value)
+        results = self.cached_hybrid_search(
             query=query,
             alpha=0.3,
             limit=top_k,
-           # Pass the filters to the hybrid_search method
+            filters=filters
         )
         return results         
\ No newline at end of file
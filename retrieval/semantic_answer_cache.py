@@ -0,0 +1,102 @@
+# retrieval/semantic_answer_cache.py
+import math
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from config.config import config
+from core.llm.llm_client import LLMClient
+from core.vector_database.vector_db_client import VectorDBClient
+
+SEMANTIC_CACHE_THRESHOLD = config.get("semantic_cache_threshold", 0.92)
+SEMANTIC_CACHE_MAX_ENTRIES = config.get("semantic_cache_max_entries_per_document", 256)
+SEMANTIC_CACHE_TTL = config.get("semantic_cache_ttl_seconds", 300)
+
+def _normalized(vector: List[float]) -> array:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return array("f", (v / norm for v in vector))
+
+class SemanticAnswerCache:
+    """Answers to earlier questions about a document, looked up by question similarity.
+
+    Questions are embedded and compared by cosine similarity against earlier questions for the same
+    filename. Retrieval for an answer searches the whole collection, not only that document, so each
+    entry remembers the generation of the vector DB client (bumped by every write to any document)
+    when it was stored and stops matching after any write through this client. Writes from other
+    processes are not seen; entries expire after ttl seconds to bound that staleness.
+    """
+
+    def __init__(self, llm_client: LLMClient, embedding_model: str, vector_db_client: VectorDBClient, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries_per_document: int = SEMANTIC_CACHE_MAX_ENTRIES, ttl: float = SEMANTIC_CACHE_TTL):
+        self.llm_client = llm_client
+        self.embedding_model = embedding_model
+        self.vector_db_client = vector_db_client
+        self.threshold = threshold
+        self.max_entries_per_document = max_entries_per_document
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def embed_question(self, question: str) -> array:
+        return _normalized(self.llm_client.embed_text(question, self.embedding_model))
+
+    def lookup(self, filename: str, question: str, question_vector: Optional[array] = None) -> Optional[Dict[str, Any]]:
+        """Returns the best stored entry above the similarity threshold, or None.
+
+        The entry holds "question", "answer", "source_ids" and the "similarity" of the match.
+        """
+        question_vector = question_vector if question_vector is not None else self.embed_question(question)
+        generation = self.vector_db_client.generation
+        expired_before = time.monotonic() - self.ttl if self.ttl else None
+        best, best_similarity = None, self.threshold
+        with self._lock:
+            entries = self._entries.get(filename, [])
+            # Entries from before a write, or past their TTL, can never match again; drop them.
+            entries[:] = [entry for entry in entries if entry["generation"] == generation and (expired_before is None or entry["stored_at"] >= expired_before)]
+            for entry in entries:
+                similarity = sum(a * b for a, b in zip(question_vector, entry["vector"]))
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            best["last_used"] = time.monotonic()
+            return {"question": best["question"], "answer": best["answer"], "source_ids": list(best["source_ids"]), "similarity": best_similarity}
+
+    def store(self, filename: str, question: str, answer: str, source_ids: List[str], question_vector: Optional[array] = None):
+        question_vector = question_vector if question_vector is not None else self.embed_question(question)
+        entry = {
+            "question": question,
+            "vector": question_vector,
+            "answer": answer,
+            "source_ids": list(source_ids),
+            "generation": self.vector_db_client.generation,
+            "stored_at": time.monotonic(),
+            "last_used": time.monotonic(),
+        }
+        with self._lock:
+            entries = self._entries.setdefault(filename, [])
+            entries.append(entry)
+            if len(entries) > self.max_entries_per_document:
+                entries.remove(min(entries, key=lambda e: e["last_used"]))
+
+    def invalidate(self, filename: str = None):
+        """Drops the entries of filename, or of every document if filename is None."""
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(filename, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "documents": len(self._entries),
+            "entries": sum(len(entries) for entries in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
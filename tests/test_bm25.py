@@ -0,0 +1,21 @@
+# tests/test_bm25.py
+import array
+
+from core.document.chunk_record import ChunkRecord
+from core.vector_database.local_vector_db_client import LocalVectorDBClient
+from retrieval.bm25 import BM25Index
+
+def record(filename: str) -> ChunkRecord:
+    return ChunkRecord(content="payment terms", token_length=2, char_length=13, section_indexes=[], roles=[], heading=None, page_numbers=[1], chunk_number=0, filename=filename, id=f"{filename}-0", vector=array.array("f", [1.0, 0.0]))
+
+def test_rebuild_drops_chunks_deleted_elsewhere():
+    client = LocalVectorDBClient(path=None)
+    client.add_data_objects("Chunks", [record("a.pdf"), record("b.pdf")])
+    bm25_index = BM25Index()
+    bm25_index.add_objects(client.iter_objects("Chunks"))
+    assert len(bm25_index.search("payment", limit=5)) == 2
+
+    client.delete_objects("Chunks", ["a.pdf-0"])
+    bm25_index.rebuild(client.iter_objects("Chunks"))
+    assert [result.uuid for result in bm25_index.search("payment", limit=5)] == ["b.pdf-0"]
+    assert "a.pdf-0" not in bm25_index
@@ -0,0 +1,46 @@
+# tests/test_chunker_golden.py
+"""chunk_document output against fixtures written by the chunker as it was before the series.
+
+Regenerate the fixtures only for intended changes to the chunk output: run chunk_document on the
+layouts below from inside tests/fixtures/chunker_golden/<case> and dump the record properties.
+"""
+import json
+import os
+
+import pytest
+
+from benchmarks.fake_llm_client import FakeLLMClient
+from benchmarks.synthetic_layout import generate_layout
+from core.document.chunker import chunk_document
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "chunker_golden")
+
+# case -> (generate_layout arguments, min_chunk_tokens)
+GOLDEN_CASES = {
+    "small": (dict(pages=4, sections=24, paragraphs_per_section=3, tables=2, words_per_paragraph=16, seed=1), 60),
+    "mixed": (dict(pages=4, sections=24, paragraphs_per_section=2, tables=5, table_rows=3, nested_ratio=0.3, mixed_ref_ratio=0.3, words_per_paragraph=16, seed=2), 200),
+}
+
+def read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+@pytest.mark.parametrize("case", sorted(GOLDEN_CASES))
+def test_chunk_document_matches_golden_output(case, tmp_path, monkeypatch):
+    params, min_chunk_tokens = GOLDEN_CASES[case]
+    expected = os.path.join(FIXTURES, case)
+    monkeypatch.chdir(tmp_path)
+
+    records = chunk_document(FakeLLMClient(), generate_layout(**params), min_chunk_tokens, "fake-embedding", "golden.pdf")
+
+    properties = []
+    for record in records:
+        assert record.vector is not None
+        record_properties = record.properties()
+        # roles comes from a set, so its order depends on the hash seed
+        record_properties["roles"] = sorted(record_properties["roles"])
+        properties.append(record_properties)
+    with open(os.path.join(expected, "records.json"), "r", encoding="utf-8") as f:
+        assert properties == json.load(f)
+    assert read_text("chunks.txt") == read_text(os.path.join(expected, "chunks.txt"))
+    assert read_text("sections.txt") == read_text(os.path.join(expected, "sections.txt"))
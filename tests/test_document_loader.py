@@ -0,0 +1,31 @@
+# tests/test_document_loader.py
+import gzip
+
+import pytest
+
+from core.document.document_loader import AnalysisCache, CachingDocumentAnalyzer, DocumentAnalyzer
+
+class CountingAnalyzer(DocumentAnalyzer):
+    model_id = "prebuilt-layout"
+
+    def __init__(self):
+        self.calls = 0
+
+    def analyze(self, document_bytes: bytes) -> dict:
+        self.calls += 1
+        return {"paragraphs": [{"content": document_bytes.decode()}]}
+
+@pytest.mark.parametrize("entry", [b"", b"\x1f\x8b\x08\x00trunc", gzip.compress(b'{"paragraphs": ['), gzip.compress(b"\xff\xfe")])
+def test_unreadable_cache_entry_is_reanalyzed(tmp_path, entry):
+    cache = AnalysisCache(str(tmp_path))
+    path = cache.path_for(b"contract", "prebuilt-layout")
+    tmp_path.joinpath("prebuilt-layout").mkdir()
+    with open(path, "wb") as f:
+        f.write(entry)
+
+    analyzer = CountingAnalyzer()
+    caching_analyzer = CachingDocumentAnalyzer(analyzer, cache)
+    assert caching_analyzer.analyze(b"contract") == {"paragraphs": [{"content": "contract"}]}
+    assert caching_analyzer.analyze(b"contract") == {"paragraphs": [{"content": "contract"}]}
+    assert analyzer.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
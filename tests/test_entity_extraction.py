@@ -0,0 +1,28 @@
+# tests/test_entity_extraction.py
+import pytest
+
+pytest.importorskip("atomic_agents")
+
+from agents.entity_extraction import date_key, dedupe, money_key
+
+@pytest.mark.parametrize("key, first, second", [
+    (date_key, "Payment due within 30 days of invoice", "Notice period of 30 days"),
+    (date_key, "Renewal term of 2 years", "Term of 2 years"),
+    (date_key, "Section 4: 30 days", "Section 5: 30 days"),
+    (money_key, "Interest at 2% per annum", "Late fee of 2% per month"),
+    (money_key, "$5,000 monthly rent", "$5,000 deposit"),
+    (money_key, "Section 4: $20,000 penalty", "Section 4: $10,000 fee"),
+    (money_key, "5,000", "$5,000"),
+])
+def test_dedupe_keeps_distinct_values(key, first, second):
+    assert dedupe([first, second], key) == [first, second]
+
+@pytest.mark.parametrize("key, first, second", [
+    (date_key, "January 1st, 2024", "1 January 2024"),
+    (date_key, "30 days", "thirty (30) days"),
+    (money_key, "$5,000", "USD 5000"),
+    (money_key, "$5k", "$5,000.00"),
+    (money_key, "EUR 2 million", "€2,000,000"),
+])
+def test_dedupe_merges_equal_values(key, first, second):
+    assert dedupe([first, second], key) == [first]
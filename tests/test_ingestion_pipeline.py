@@ -0,0 +1,63 @@
+# tests/test_ingestion_pipeline.py
+import pytest
+
+from benchmarks.fake_llm_client import FakeLLMClient
+from benchmarks.synthetic_layout import generate_layout
+from core.document.ingestion_pipeline import ENTITY_COLLECTION_NAME, ingest_document
+from core.vector_database.local_vector_db_client import LocalVectorDBClient
+from core.vector_database.vector_db_client import BatchWriteError
+from retrieval.bm25 import BM25Index
+
+LAYOUT = dict(pages=3, sections=12, paragraphs_per_section=2, tables=1, words_per_paragraph=20)
+
+class FailingWriteClient(LocalVectorDBClient):
+    """With fail set, stores the first object of a stream and reports the rest as failed, like a Weaviate batch with errors."""
+    fail = False
+
+    def add_data_object_stream(self, collection_name, data_objects, batch_size=100):
+        if not self.fail:
+            return super().add_data_object_stream(collection_name, data_objects, batch_size)
+        data_objects = list(data_objects)
+        self.add_data_objects(collection_name, data_objects[:1])
+        raise BatchWriteError(collection_name, 1, [o.id for o in data_objects[1:]], ["rejected"])
+
+class FakeEntityExtractor:
+    """Tags each chunk with one party naming its first words; reduce collects the parties in chunk order."""
+    def extract(self, text, context):
+        return {"parties": [" ".join(text.split()[:6])]}
+
+    def reduce(self, chunk_properties):
+        return {"parties": [party for properties in chunk_properties for party in properties.get("parties") or []]}
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The chunker writes chunks.txt and sections.txt to the working directory
+
+def test_failed_write_keeps_the_stored_chunks():
+    client = FailingWriteClient(path=None)
+    bm25_index = BM25Index()
+    ingest_document(FakeLLMClient(), client, "Chunks", generate_layout(**LAYOUT), 30, "fake-embedding", "a.pdf", bm25_index=bm25_index)
+    old_ids = client.get_object_ids("Chunks", "a.pdf")
+    indexed = len(bm25_index)
+
+    client.fail = True
+    with pytest.raises(BatchWriteError):
+        ingest_document(FakeLLMClient(), client, "Chunks", generate_layout(**LAYOUT, seed=1), 30, "fake-embedding", "a.pdf", bm25_index=bm25_index)
+    assert old_ids <= client.get_object_ids("Chunks", "a.pdf")
+    assert len(bm25_index) == indexed
+
+@pytest.mark.parametrize("extract_again", [True, False])
+def test_reingest_with_removed_chunks_updates_the_entity_aggregate(extract_again):
+    client = LocalVectorDBClient(path=None)
+    ingest_document(FakeLLMClient(), client, "Chunks", generate_layout(**LAYOUT), 30, "fake-embedding", "a.pdf", entity_extractor=FakeEntityExtractor())
+    old_parties = client.get_document_entities(ENTITY_COLLECTION_NAME, "a.pdf")["parties"]
+
+    counts = ingest_document(FakeLLMClient(), client, "Chunks", generate_layout(**dict(LAYOUT, sections=4)), 30, "fake-embedding", "a.pdf", entity_extractor=FakeEntityExtractor() if extract_again else None)
+    assert counts["deleted"] > 0
+    aggregate = client.get_document_entities(ENTITY_COLLECTION_NAME, "a.pdf")
+    if extract_again:
+        stored = client.fetch_document_chunks("Chunks", "a.pdf", properties=["parties"])
+        assert aggregate["parties"] == [party for chunk in stored for party in chunk["parties"]]
+        assert aggregate["parties"] != old_parties
+    else:
+        assert aggregate is None
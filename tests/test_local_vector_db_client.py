@@ -0,0 +1,32 @@
+# tests/test_local_vector_db_client.py
+import array
+
+from core.document.chunk_record import ChunkRecord
+from core.vector_database.local_vector_db_client import LocalVectorDBClient
+
+def record(number: int, vector=None) -> ChunkRecord:
+    vector = vector or [float(number % 7 + 1), float(number % 3), 1.0, 0.0]
+    return ChunkRecord(content=f"chunk {number}", token_length=2, char_length=7, section_indexes=[], roles=[], heading=None, page_numbers=[1], chunk_number=number, filename="a.pdf", id=f"id-{number}", vector=array.array("f", vector))
+
+def test_upsert_dedupes_ids_within_a_batch():
+    client = LocalVectorDBClient(path=None)
+    client.add_data_objects("Chunks", [record(1, [1.0, 0.0, 0.0, 0.0]), record(2), record(1, [0.0, 1.0, 0.0, 0.0])])
+    collection = client.collections["Chunks"]
+    assert collection.ids == ["id-1", "id-2"]
+    assert collection.vectors.shape == (2, 4)
+    assert collection.vectors[0].tolist() == [0.0, 1.0, 0.0, 0.0]
+
+def test_stream_saves_once_and_reloads(tmp_path):
+    client = LocalVectorDBClient(path=str(tmp_path))
+    saves = []
+    save = client._save
+    client._save = lambda *args, **kwargs: (saves.append(args), save(*args, **kwargs))
+    assert client.add_data_object_stream("Chunks", (record(n) for n in range(250)), batch_size=100) == 250
+    assert len(saves) == 1
+
+    reloaded = LocalVectorDBClient(path=str(tmp_path))
+    assert reloaded.collections["Chunks"].vectors.shape == (250, 4)
+    reloaded.add_data_objects("Chunks", [record(250), record(3, [0.0, 0.0, 0.0, 1.0])])
+    assert reloaded.delete_objects("Chunks", ["id-0"]) == 1
+    assert len(reloaded.get_object_ids("Chunks", "a.pdf")) == 250
+    assert reloaded.hybrid_search("Chunks", "", 0.5, 1, vector=[0.0, 0.0, 0.0, 1.0])[0].uuid == "id-3"
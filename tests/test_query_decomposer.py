@@ -0,0 +1,38 @@
+# tests/test_query_decomposer.py
+import pytest
+
+from agents.query_decomposer import QueryDecomposer, classify_query, normalize_query
+
+@pytest.mark.parametrize("query, simple", [
+    ("Who are the parties to the agreement?", True),
+    ("What is the governing law?", True),
+    ("When does the agreement terminate?", True),
+    ("What is the notice period under clause 14.1?", True),
+    ("What are the terms and conditions of payment?", True),
+    ("Is the supplier liable for indirect damages?", True),
+    ("What is the governing law, venue and notice address?", False),
+    ("What is the term and the renewal period?", False),
+    ("What is the governing law, and the venue?", False),
+    ("Are late fees or interest charged?", False),
+    ("What is the term and when does it renew?", False),
+    ("What is the term? When does it renew?", False),
+    ("List the obligations of the supplier", False),
+    ("Compare the warranty periods", False),
+    ("What are the differences between schedule A versus schedule B", False),
+    ("1. payment terms 2. delivery terms", False),
+    ("", False),
+    ("What does the agreement say about " + "liability " * 20, False),
+])
+def test_classify_query(query, simple):
+    assert classify_query(query, max_words=16)[0] is simple
+
+def test_normalize_query():
+    assert normalize_query("  What is the  Term? ") == "what is the term"
+
+def test_decompose_bypasses_simple_questions_without_building_the_agent():
+    def get_agent():
+        raise AssertionError("agent built for a simple question")
+
+    decomposer = QueryDecomposer(get_agent)
+    assert decomposer.decompose("Who are the parties?") == (["Who are the parties?"], "bypass")
+    assert decomposer.stats()["bypassed"] == 1
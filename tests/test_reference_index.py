@@ -0,0 +1,88 @@
+# tests/test_reference_index.py
+"""ReferenceIndex against the straightforward implementations the chunker used before it.
+
+The reference implementations below are the original chunker functions, kept here as the spec
+the compiled index has to match.
+"""
+from typing import Any, Dict, List, Set
+
+import pytest
+
+from benchmarks.synthetic_layout import CASES, generate_layout
+from core.document.chunker import extract_indexed_table_html
+from core.document.reference_index import ReferenceIndex, classify_normalized_refs
+
+def resolve_reference(ref: str, data: Dict[str, Any]) -> Any:
+    ref = ref.lstrip("/")
+    parts = ref.split("/")
+    if len(parts) == 2:
+        collection_name = parts[0]
+        try:
+            index = int(parts[1])
+            return data.get(collection_name, [])[index]
+        except (ValueError, IndexError):
+            return None
+    return None
+
+def extract_table_content_html(table: Dict[str, Any], paragraphs: List[Dict[str, Any]]) -> tuple[str, List[int]]:
+    html_table = "<table>\n"
+    rows = {}
+    for cell in table.get("cells", []):
+        rows.setdefault(cell.get("rowIndex", 0), []).append(cell)
+    page_numbers: Set[int] = set()
+    for row_index, cells_in_row in sorted(rows.items()):
+        html_table += "  <tr>\n"
+        for cell in sorted(cells_in_row, key=lambda c: c.get("columnIndex", 0)):
+            cell_content = []
+            for ref in cell.get("elements", []):
+                paragraph = resolve_reference(ref, {"paragraphs": paragraphs})
+                if paragraph and isinstance(paragraph, dict) and "content" in paragraph:
+                    cell_content.append(paragraph["content"].strip())
+                    for region in paragraph.get("boundingRegions", []):
+                        page_numbers.add(region.get("pageNumber"))
+            tag = "th" if cell.get("kind") == "columnHeader" else "td"
+            html_table += f"    <{tag}>{' '.join(cell_content)}</{tag}>\n"
+        html_table += "  </tr>\n"
+    html_table += "</table>\n"
+    return html_table, list(page_numbers)
+
+def classify_refs(refs: List[str]) -> str:
+    normalized = [ref.lstrip("/") for ref in refs]
+    has_sections = any(ref.startswith("sections/") for ref in normalized)
+    has_tables = any(ref.startswith("table") for ref in normalized)
+    has_other = any(not ref.startswith("sections/") and not ref.startswith("table") for ref in normalized)
+    if has_sections and not has_other and not has_tables:
+        return "only_sections"
+    elif has_tables and not has_other and not has_sections:
+        return "only_tables"
+    elif (has_sections and has_other) or (has_tables and has_other) or (has_sections and has_tables):
+        return "mixed"
+    elif not has_sections and not has_tables and has_other:
+        return "only_non_sections"
+    else:
+        return "empty_or_unknown"
+
+LAYOUTS = [generate_layout(**CASES[name], seed=seed) for name in ("small", "table_heavy", "mixed_refs") for seed in (0, 1)]
+
+@pytest.mark.parametrize("data", LAYOUTS)
+def test_indexed_tables_match_reference(data):
+    ref_index = ReferenceIndex(data)
+    for table in data["tables"]:
+        html, pages = extract_indexed_table_html(ref_index, table)
+        expected_html, expected_pages = extract_table_content_html(table, data["paragraphs"])
+        assert html == expected_html
+        assert sorted(pages) == sorted(expected_pages)
+
+def test_table_cell_refs_out_of_range_and_malformed():
+    data = {"paragraphs": [{"content": " a ", "boundingRegions": [{"pageNumber": 2}]}, {}], "tables": [], "sections": []}
+    table = {"cells": [{"rowIndex": 0, "columnIndex": 0, "elements": ["/paragraphs/0", "/paragraphs/1", "/paragraphs/9", "/paragraphs/x", "/figures/0", "/paragraphs/-2"]}]}
+    assert extract_indexed_table_html(ReferenceIndex(data), table) == extract_table_content_html(table, data["paragraphs"])
+
+@pytest.mark.parametrize("data", LAYOUTS)
+def test_section_types_match_reference(data):
+    ref_index = ReferenceIndex(data)
+    assert ref_index.section_types == [classify_refs(section.get("elements", [])) for section in data["sections"]]
+
+@pytest.mark.parametrize("refs", [[], ["/sections/1"], ["table0", "table3"], ["/tables/0", "/paragraphs/1"], ["/sections/2", "/tables/0"], ["/figures/0"], ["/paragraphs/0", "/sections/1"]])
+def test_classify_normalized_refs_matches_reference(refs):
+    assert classify_normalized_refs([ref.lstrip("/") for ref in refs]) == classify_refs(refs)
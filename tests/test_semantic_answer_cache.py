@@ -0,0 +1,30 @@
+# tests/test_semantic_answer_cache.py
+import array
+
+from benchmarks.fake_llm_client import FakeLLMClient
+from core.document.chunk_record import ChunkRecord
+from core.vector_database.local_vector_db_client import LocalVectorDBClient
+from retrieval import semantic_answer_cache
+from retrieval.semantic_answer_cache import SemanticAnswerCache
+
+def record(filename: str) -> ChunkRecord:
+    return ChunkRecord(content="text", token_length=1, char_length=4, section_indexes=[], roles=[], heading=None, page_numbers=[1], chunk_number=0, filename=filename, id=f"{filename}-0", vector=array.array("f", [1.0, 0.0]))
+
+def test_write_to_another_document_invalidates_entries():
+    client = LocalVectorDBClient(path=None)
+    cache = SemanticAnswerCache(FakeLLMClient(), "fake-embedding", client)
+    cache.store("a.pdf", "What is the term?", "Two years", ["a.pdf-0"])
+    assert cache.lookup("a.pdf", "What is the term?")["answer"] == "Two years"
+
+    client.add_data_objects("Chunks", [record("b.pdf")])
+    assert cache.lookup("a.pdf", "What is the term?") is None
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_answer_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(FakeLLMClient(), "fake-embedding", LocalVectorDBClient(path=None), ttl=60)
+    cache.store("a.pdf", "What is the term?", "Two years", ["a.pdf-0"])
+    now[0] += 59
+    assert cache.lookup("a.pdf", "What is the term?") is not None
+    now[0] += 2
+    assert cache.lookup("a.pdf", "What is the term?") is None
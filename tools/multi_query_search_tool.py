@@ -0,0 +1,35 @@
+from atomic_agents.lib.base.base_tool import BaseTool, BaseToolConfig
+from typing import List, Dict, Any
+from pydantic import BaseModel
+from atomic_agents.agents.base_agent import BaseIOSchema
+# Input/output schemas
+class MultiQuerySearchToolInputSchema(BaseIOSchema):
+    """Input schema for the Multi Query Search Tool. Contains the sub-queries to search for."""
+
+    queries: List[str]
+    top_k: int = 5
+
+class MultiQuerySearchToolOutputSchema(BaseIOSchema):
+    """Output schema for the Multi Query Search Tool. Contains the merged chunks and per sub-query timings."""
+
+    results: List[str]
+    object_ids: List[str]
+    timings: List[Dict[str, Any]]
+
+# Tool definition
+class MultiQuerySearchTool(BaseTool):
+    name = "multi_query_search_tool"
+    description = "Runs hybrid searches for several sub-queries concurrently and merges the chunks, deduplicated by object ID."
+    input_schema = MultiQuerySearchToolInputSchema
+    output_schema = MultiQuerySearchToolOutputSchema
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+
+    def run(self, input: MultiQuerySearchToolInputSchema) -> MultiQuerySearchToolOutputSchema:
+        chunks, timings = self.retriever.retrieve_for_queries(queries=input.queries, top_k=input.top_k)
+        return MultiQuerySearchToolOutputSchema(
+            results=[c.properties["content"] for c in chunks],
+            object_ids=[str(c.uuid) for c in chunks],
+            timings=timings
+        )
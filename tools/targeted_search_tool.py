@@ -21,7 +21,7 @@ class TargetedSearchToolOutputSchema(BaseIOSchema):
 # Tool definition
 class TargetedSearchTool(BaseTool):
     name = "targeted_search_tool"
-    description = "Performs a filtered search based on metadata fields (e.g., page number, filename)."
+    description = "Performs a filtered search based on metadata fields (e.g., page number, filename, or the extracted parties, dates, amounts and obligations)."
     input_schema = TargetedSearchToolInputSchema
     output_schema = TargetedSearchToolOutputSchema
 
@@ -31,8 +31,8 @@ class TargetedSearchTool(BaseTool):
     def run(self, input: TargetedSearchToolInputSchema) -> TargetedSearchToolOutputSchema:
         chunks = self.retriever.targeted_search(
             query=input.query,
-            metadata_key=input.metadata_key,
-            metadata_value=input.metadata_value,
+            key=input.metadata_key,
+            value=input.metadata_value,
             top_k=input.top_k,
         )
         return TargetedSearchToolOutputSchema(results=[c.properties["content"] for c in chunks])
@@ -1,131 +1,115 @@
 import streamlit as st
 from config.config import config
-from core.llm.openai_client import OpenAIClient
-from core.vector_database.weaviate_client import WeaviateClient
-from core.document.document_loader import load_document_from_upload
-from core.document.chunker import chunk_document
-from weaviate.classes.query import Filter
-from weaviate.classes.config import Configure, Property, DataType, VectorDistances
-from retrieval.retriever import Retriever
-from agents.decompose_query_agent import decompose_query_agent,DecomposeInputSchema
-from agents.metadata_matcher_agent import metadata_matcher_agent,MetadataMatcherInputSchema
-from agents.final_answer_agent import final_answer_agent,FinalAnswerInputSchema
-from tools.hybrid_search_tool import HybridSearchTool, HybridSearchToolInputSchema
-from tools.targeted_search_tool import TargetedSearchTool
+from core.tracing import span, add_to_span
+from ui.app_context import get_app_context
 
-# ---- Init Clients ----
-llm_client = OpenAIClient(base_url=config["lm_studio_url"], api_key="lm-studio")
-weaviate_client = WeaviateClient()
-weaviate_client.connect(config["weaviate_url"], headers={"X-Openai-Api-Key": "lmstudio"})
-
-collection_name = config.get("weaviate_collection_name", "Document")
-embedding_model_name = config.get("embedding_model")
-azure_endpoint = config.get("azure_di_endpoint")
-azure_key = config.get("azure_di_key")
-
-retriever = Retriever(vector_db_client=weaviate_client, llm_client=llm_client, embedding_model=embedding_model_name)
-
-# ---- Init Tools ----
-hybrid_tool = HybridSearchTool(retriever)
-targeted_tool = TargetedSearchTool(retriever)
-
-# ---- Ensure Collection Exists ----
-def ensure_collection(client):
-    vector_index_config = Configure.VectorIndex.hnsw(distance_metric=VectorDistances.COSINE)
-    vectorizer_config = Configure.Vectorizer.text2vec_openai(
-        base_url="http://host.docker.internal:1234",
-        model="text-embedding-granite-embedding-278m-multilingual"
-    )
-    properties = [
-        Property(name="content", data_type=DataType.TEXT),
-        Property(name="token_length", data_type=DataType.INT),
-        Property(name="char_length", data_type=DataType.INT),
-        Property(name="section_indexes", data_type=DataType.INT_ARRAY),
-        Property(name="roles", data_type=DataType.TEXT_ARRAY),
-        Property(name="heading", data_type=DataType.TEXT),
-        Property(name="page_numbers", data_type=DataType.INT_ARRAY),
-        Property(name="filename", data_type=DataType.TEXT),
-        Property(name="chunk_number", data_type=DataType.INT)
-    ]
-    if not client.check_collection_exists(collection_name):
-        client.create_collection(collection_name, vector_index_config, vectorizer_config, properties)
-    return client.get_collection(collection_name)
-
-document_collection = ensure_collection(weaviate_client)
+# Clients, indexes and agents are built on first use and shared by all sessions (see ui.app_context)
+app = get_app_context()
+collection_name = app.collection_name
+stage_metrics = app.stage_metrics
+stream_answers = config.get("stream_answers", True)
 
 # ---- Streamlit UI ----
 st.title("Contract QA with Agents")
 
 uploaded_file = st.file_uploader("Upload a contract document", type=["pdf", "txt", "docx"])
+extract_entities = st.checkbox("Extract entities during ingestion", value=config.get("ingest_extract_entities", False), help="Runs the entity agent once per new chunk and stores parties, dates, amounts and obligations with the document.")
+
+def get_entity_extractor():
+    if not extract_entities:
+        return None
+    from agents.entity_extraction import ChunkEntityExtractor
+    return ChunkEntityExtractor()
 
 if uploaded_file:
     filename = uploaded_file.name
     st.session_state["filename"] = filename
 
-    existing_chunks = document_collection.query.fetch_objects(
-        filters=Filter.by_property("filename").equal(filename), limit=1
-    )
-
-    if existing_chunks.objects:
+    if app.document_exists(filename):
         st.warning(f"Document '{filename}' already exists.")
         if st.button("Reprocess Document"):
-            document_data = load_document_from_upload(azure_endpoint, azure_key, uploaded_file)
-            chunks = chunk_document(llm_client, document_data, config["min_chunk_tokens"], embedding_model_name, filename)
-            weaviate_client.add_data_objects(collection_name, chunks)
-            st.success("Document re-processed successfully.")
+            counts = app.ingest_upload(uploaded_file, entity_extractor=get_entity_extractor())
+            st.success(f"Document re-processed: {counts['written']} chunks updated, {counts['unchanged']} unchanged, {counts['deleted']} removed.")
+            st.caption(f"Embedding cache: {app.embedding_cache.stats()}")
     else:
         if st.button("Process Document"):
-            document_data = load_document_from_upload(azure_endpoint, azure_key, uploaded_file)
-            chunks = chunk_document(llm_client, document_data, config["min_chunk_tokens"], embedding_model_name, filename)
-            weaviate_client.add_data_objects(collection_name, chunks)
+            app.ingest_upload(uploaded_file, entity_extractor=get_entity_extractor())
             st.success("Document processed successfully.")
+            st.caption(f"Embedding cache: {app.embedding_cache.stats()}")
 
 # ---- Query Interface ----
 query = st.text_input("Ask a question about the contract:", placeholder="e.g. What are the key obligations?")
 
-if query and document_collection:
-    with st.spinner("Thinking..."):
-        decompose_input_schema = DecomposeInputSchema(query=query)
-        decomp = decompose_query_agent.run(decompose_input_schema)
-        sub_queries = decomp.subqueries or [query]
-        all_results = []
-
-        for q in sub_queries: #Commenting Metadata analyzer agent because of inconsistent behaviour until further analysis
-            #metadata_input_schema = MetadataMatcherInputSchema(query=q)
-            #match = metadata_matcher_agent.run(metadata_input_schema)
-            #if match.matches_metadata:
-            #   results = targeted_tool.run({
-            #       "query": q,
-            #        "metadata_key": match.matched_property,
-            #       "metadata_value": match.value
-            #    })
-            #else:
-            #    hybrid_input = HybridSearchToolInputSchema(query=q, top_k=5)
-            #    results = hybrid_tool.run(hybrid_input)
-            hybrid_input = HybridSearchToolInputSchema(query=q, top_k=5)
-            results = hybrid_tool.run(hybrid_input)
-            all_results.extend(results.results)
-
-        # ✅ Deduplicate by chunk 'text'
-        seen = set()
-        deduped_chunks = []
-        for chunk in all_results:
-            if chunk not in seen:
-                seen.add(chunk)
-                deduped_chunks.append(chunk)
-        final_input_schema = FinalAnswerInputSchema(query=query, retrieved_chunks=deduped_chunks)    
-        answer = final_answer_agent.run(final_input_schema)
-        st.subheader("Answer")
-        st.write(answer.answer)
-
-
-from ui.view_chunks_tab import view_chunks_tab
-from ui.entity_agent_summarizer import entity_summarizer_tab  # You'll create this next
+if query and app.document_collection:
+    filename = st.session_state.get("filename")
+    # One trace per question: answer cache, decomposition, search (per sub-query and dedupe) and final answer
+    with span("qa"):
+        with span("answer_cache"):
+            cached = app.answer_cache.lookup(filename, query) if filename else None
+            add_to_span(cache_hits=1 if cached else 0)
+        if cached:
+            st.subheader("Answer")
+            st.write(cached["answer"])
+            st.caption(f"♻️ Reused the answer to a similar question (similarity {cached['similarity']:.2f}): {cached['question']}")
+            st.caption(f"Source chunks: {', '.join(cached['source_ids'])}")
+        else:
+            from agents.final_answer_agent import FinalAnswerInputSchema, stream_final_answer
+            from tools.multi_query_search_tool import MultiQuerySearchToolInputSchema
+
+            with st.spinner("Thinking..."):
+                # Simple questions and repeats skip the decomposition LLM call
+                with span("decompose"):
+                    sub_queries, decompose_source = app.query_decomposer.decompose(query)
+                    add_to_span(subqueries=len(sub_queries))
+
+                # Commenting Metadata analyzer agent because of inconsistent behaviour until further analysis
+                #for q in sub_queries:
+                #    metadata_input_schema = MetadataMatcherInputSchema(query=q)
+                #    match = app.metadata_matcher_agent.run(metadata_input_schema)
+                #    if match.matches_metadata:
+                #       results = app.targeted_tool.run({
+                #           "query": q,
+                #            "metadata_key": match.matched_property,
+                #           "metadata_value": match.value
+                #        })
+
+                # ✅ Search all sub-queries concurrently; results come back deduplicated by object ID
+                with span("search") as search_span:
+                    search_output = app.multi_query_tool.run(MultiQuerySearchToolInputSchema(queries=sub_queries, top_k=5))
+                    deduped_chunks = search_output.results
+                    add_to_span(chunks=len(deduped_chunks))
+                    if search_span is not None:
+                        # Per sub-query timings go into the trace record of the search stage
+                        search_span.set(subquery_timings=[{"query": t["query"], "ms": round(t["seconds"] * 1000, 2), "results": t["results"]} for t in search_output.timings])
+            final_input_schema = FinalAnswerInputSchema(query=query, retrieved_chunks=deduped_chunks)
+            with span("final_answer"):
+                if stream_answers:
+                    # Rendered as the answer field streams in, instead of after the whole completion
+                    st.subheader("Answer")
+                    answer_text = st.write_stream(stream_final_answer(app.final_answer_agent, final_input_schema))
+                else:
+                    with st.spinner("Writing the answer..."):
+                        answer_text = app.final_answer_agent.run(final_input_schema).answer
+                    st.subheader("Answer")
+                    st.write(answer_text)
+            if filename and answer_text:
+                app.answer_cache.store(filename, query, answer_text, search_output.object_ids)
+            st.caption(f"Answer cache: {app.answer_cache.stats()}")
+            decompose_stats = app.query_decomposer.stats()
+            st.caption(f"Decomposition: {decompose_source} for this question; LLM call avoided for {decompose_stats['llm_avoided_rate']:.0%} of {decompose_stats['queries']} questions ({decompose_stats['bypass_rate']:.0%} bypassed), ~{decompose_stats['saved_ms'] / 1000:.1f} s saved")
 
 tab = st.sidebar.selectbox("Choose a tab", ["Main QA", "View Chunks", "Entity Summarizer"])
 
 if tab == "View Chunks":
-    view_chunks_tab(document_collection)
+    from ui.view_chunks_tab import view_chunks_tab
+    view_chunks_tab(app.document_collection)
 elif tab == "Entity Summarizer":
-    entity_summarizer_tab(vector_db_client=weaviate_client)
-    
\ No newline at end of file
+    from ui.entity_agent_summarizer import entity_summarizer_tab
+    entity_summarizer_tab(vector_db_client=app.vector_db_client, collection_name=collection_name)
+    
+
+with st.sidebar.expander("Stage metrics (p50/p95/p99 ms)"):
+    st.json(stage_metrics.snapshot())
+
+with st.sidebar.expander("Query decomposition"):
+    st.json(app.query_decomposer.stats())
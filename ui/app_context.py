@@ -0,0 +1,221 @@
+# ui/app_context.py
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import streamlit as st
+from config.config import config
+
+class AppContext:
+    """Clients, indexes and agents shared by every session of a Streamlit app, each built on first use.
+
+    Nothing is imported or connected until a component is first accessed, so a page render only pays for
+    what it uses: the Azure SDK is first imported by an upload that misses the DI cache, the agents by the
+    first question. Components are built once per process under a lock; timings records how long each
+    build took, including any components it needed that were not built yet.
+    """
+
+    def __init__(self, collection_name: str = None, embedding_model: str = None):
+        self.collection_name = collection_name or config.get("weaviate_collection_name", "Document")
+        self.embedding_model = embedding_model or config.get("embedding_model")
+        self.timings: Dict[str, float] = {}
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def _component(self, name: str, build: Callable[[], Any]) -> Any:
+        if name in self._components:
+            return self._components[name]
+        with self._lock:
+            if name in self._components:
+                return self._components[name]
+            start = time.perf_counter()
+            component = build()
+            self.timings[name] = time.perf_counter() - start
+            # A failed build (exception or None) is retried on the next access
+            if component is not None:
+                self._components[name] = component
+                print(f"[STARTUP] {name} ready in {self.timings[name] * 1000:.0f} ms")
+            return component
+
+    def is_built(self, name: str) -> bool:
+        return name in self._components
+
+    # ---- Clients ----
+    @property
+    def embedding_cache(self):
+        def build():
+            from core.llm.embedding_cache import EmbeddingCache
+            return EmbeddingCache(config.get("embedding_cache_path", "embedding_cache.sqlite3"), config.get("embedding_cache_max_entries", 200000))
+        return self._component("embedding_cache", build)
+
+    @property
+    def llm_client(self):
+        def build():
+            from core.llm.openai_client import OpenAIClient
+            from core.llm.embedding_cache import CachingLLMClient
+            return CachingLLMClient(OpenAIClient(base_url=config.get("lm_studio_url"), api_key="lm-studio"), self.embedding_cache)
+        return self._component("llm_client", build)
+
+    @property
+    def llm_handler(self):
+        def build():
+            from core.llm.async_openai_client import AsyncOpenAIClient
+            from llm_interaction.llm_handler import LLMHandler
+            async_llm_client = AsyncOpenAIClient(base_url=config.get("lm_studio_url"), api_key="lm-studio")
+            return LLMHandler(llm_client=self.llm_client, chat_model=config.get("chat_model"), async_llm_client=async_llm_client)
+        return self._component("llm_handler", build)
+
+    @property
+    def vector_db_client(self):
+        def build():
+            from core.vector_database.weaviate_client import WeaviateClient
+            client = WeaviateClient()
+            client.connect(config.get("weaviate_url"), headers={"X-Openai-Api-Key": "lmstudio"})
+            return client
+        return self._component("vector_db_client", build)
+
+    @property
+    def document_collection(self):
+        """The chunk collection, created with the chunk schema if missing; None if that failed."""
+        return self._component("document_collection", self._ensure_document_collection)
+
+    def _ensure_document_collection(self):
+        from weaviate.classes.config import Configure, Property, DataType, VectorDistances
+        client = self.vector_db_client
+        if client.check_collection_exists(self.collection_name):
+            return client.get_collection(self.collection_name)
+        print(f"Collection '{self.collection_name}' does not exist. Creating it...")
+        vector_index_config = Configure.VectorIndex.hnsw(distance_metric=VectorDistances.COSINE)
+        # Vectors are computed in-process at import and query time, so Weaviate needs no vectorizer module
+        vectorizer_config = Configure.Vectorizer.none()
+        properties = [
+            Property(name="content", data_type=DataType.TEXT),
+            Property(name="token_length", data_type=DataType.INT),
+            Property(name="char_length", data_type=DataType.INT),
+            Property(name="section_indexes", data_type=DataType.INT_ARRAY),
+            Property(name="roles", data_type=DataType.TEXT_ARRAY),
+            Property(name="heading", data_type=DataType.TEXT),
+            Property(name="page_numbers", data_type=DataType.INT_ARRAY),
+            Property(name="filename", data_type=DataType.TEXT),
+            Property(name="chunk_number", data_type=DataType.INT),
+            # Filled in when entities are extracted during ingestion; usable as retrieval filters
+            Property(name="parties", data_type=DataType.TEXT_ARRAY),
+            Property(name="dates", data_type=DataType.TEXT_ARRAY),
+            Property(name="amounts", data_type=DataType.TEXT_ARRAY),
+            Property(name="obligations", data_type=DataType.TEXT_ARRAY)
+        ]
+        try:
+            client.create_collection(self.collection_name, vector_index_config, vectorizer_config, properties)
+            print(f"Collection '{self.collection_name}' created successfully.")
+            return client.get_collection(self.collection_name)
+        except Exception as e:
+            print(f"Error during collection creation: {e}")
+            return None
+
+    @property
+    def document_analyzer(self):
+        def build():
+            from core.document.document_loader import get_document_analyzer
+            return get_document_analyzer(config.get("azure_di_endpoint"), config.get("azure_di_key"))
+        return self._component("document_analyzer", build)
+
+    # ---- Retrieval ----
+    @property
+    def bm25_index(self):
+        def build():
+            from retrieval.bm25 import BM25Index
+            # Keyword index fused with vector results; rebuilt from the stored chunks and kept current by ingestion
+            bm25_index = BM25Index()
+            if self.vector_db_client.check_collection_exists(self.collection_name):
+                bm25_index.add_objects(self.vector_db_client.iter_objects(self.collection_name))
+            return bm25_index
+        return self._component("bm25_index", build)
+
+    @property
+    def retriever(self):
+        def build():
+            from retrieval.retriever import Retriever, CLIENT_SIDE_QUERY_VECTORS
+            if not CLIENT_SIDE_QUERY_VECTORS:
+                # The collection is created with Vectorizer.none(), so Weaviate can't embed queries itself
+                raise ValueError("client_side_query_vectors: false is not supported: the document collection has no vectorizer, so hybrid search would silently lose its vector side.")
+            return Retriever(vector_db_client=self.vector_db_client, llm_client=self.llm_client, embedding_model=self.embedding_model, bm25_index=self.bm25_index)
+        return self._component("retriever", build)
+
+    @property
+    def answer_cache(self):
+        def build():
+            from retrieval.semantic_answer_cache import SemanticAnswerCache
+            return SemanticAnswerCache(llm_client=self.llm_client, embedding_model=self.embedding_model, vector_db_client=self.vector_db_client)
+        return self._component("answer_cache", build)
+
+    # ---- Agents and tools ----
+    @property
+    def decompose_query_agent(self):
+        def build():
+            from agents.decompose_query_agent import create_decompose_query_agent
+            return create_decompose_query_agent()
+        return self._component("decompose_query_agent", build)
+
+    @property
+    def query_decomposer(self):
+        def build():
+            from agents.query_decomposer import QueryDecomposer
+            # The agent is looked up per call, so it isn't built while every question is bypassed
+            return QueryDecomposer(lambda: self.decompose_query_agent)
+        return self._component("query_decomposer", build)
+
+    @property
+    def metadata_matcher_agent(self):
+        def build():
+            from agents.metadata_matcher_agent import create_metadata_matcher_agent
+            return create_metadata_matcher_agent()
+        return self._component("metadata_matcher_agent", build)
+
+    @property
+    def final_answer_agent(self):
+        def build():
+            from agents.final_answer_agent import create_final_answer_agent
+            return create_final_answer_agent()
+        return self._component("final_answer_agent", build)
+
+    @property
+    def targeted_tool(self):
+        def build():
+            from tools.targeted_search_tool import TargetedSearchTool
+            return TargetedSearchTool(self.retriever)
+        return self._component("targeted_tool", build)
+
+    @property
+    def multi_query_tool(self):
+        def build():
+            from tools.multi_query_search_tool import MultiQuerySearchTool
+            return MultiQuerySearchTool(self.retriever)
+        return self._component("multi_query_tool", build)
+
+    # ---- Monitoring ----
+    @property
+    def stage_metrics(self):
+        """Per-stage latency and token metrics of core.tracing, also served for scraping at /metrics."""
+        def build():
+            from core.tracing import get_stage_metrics, start_metrics_server
+            start_metrics_server()
+            return get_stage_metrics()
+        return self._component("stage_metrics", build)
+
+    # ---- Ingestion ----
+    def document_exists(self, filename: str) -> bool:
+        from weaviate.classes.query import Filter
+        existing_chunks = self.document_collection.query.fetch_objects(filters=Filter.by_property("filename").equal(filename), limit=1)
+        return bool(existing_chunks.objects)
+
+    def ingest_upload(self, uploaded_file, entity_extractor=None) -> Dict[str, int]:
+        """Analyzes an uploaded file and ingests it into the chunk collection and the BM25 index."""
+        from core.document.document_loader import load_document_from_upload
+        from core.document.ingestion_pipeline import ingest_document
+        document_data = load_document_from_upload(config.get("azure_di_endpoint"), config.get("azure_di_key"), uploaded_file, analyzer=self.document_analyzer)
+        return ingest_document(self.llm_client, self.vector_db_client, self.collection_name, document_data, config["min_chunk_tokens"], self.embedding_model, uploaded_file.name, bm25_index=self.bm25_index, entity_extractor=entity_extractor)
+
+# Cached per process, so every session and rerun shares one context and the caches inside it
+@st.cache_resource
+def get_app_context() -> AppContext:
+    return AppContext()
@@ -1,17 +1,21 @@
 import streamlit as st
-from agents.entity_agent import entity_agent, EntityAgentInputSchema, EntityAgentOutputSchema
+from agents.entity_agent import create_entity_agent, EntityAgentInputSchema, EntityAgentOutputSchema
+from agents.entity_extraction import extract_entities_parallel, reduce_insights, properties_to_insight
+from core.document.chunk_record import ChunkRecord
+from core.document.ingestion_pipeline import ENTITY_COLLECTION_NAME, has_stored_entities
 from core.vector_database.vector_db_client import VectorDBClient
-import weaviate
 import json
 
 
-def entity_summarizer_tab(vector_db_client: VectorDBClient):
+def entity_summarizer_tab(vector_db_client: VectorDBClient, collection_name: str = "Document"):
     st.header("📄 Entity Insight Summarizer")
 
     # --- FILE INPUT TEXTBOX ---
     with st.sidebar:
         st.subheader("Choose Document")
         selected_filename = st.text_input("Enter the filename (exact match):")
+        mode = st.radio("Extraction mode", ["Sequential", "Parallel map-reduce"], help="Parallel mode extracts all chunks concurrently and merges the results deterministically.")
+        rerun = st.button("Re-run extraction", help="Ignore the entities stored at ingestion and extract them again.")
 
     # --- HELPER: DISPLAY ENTITY INSIGHT ---
     def display_insight(insight: EntityAgentOutputSchema, index: int):
@@ -55,54 +59,71 @@ def entity_summarizer_tab(vector_db_client: VectorDBClient):
         return "\n".join(prose_parts)
 
     # --- MAIN EXECUTION ---
-    if selected_filename:
+    insights, final_insight = [], None
+    stored_entities = vector_db_client.get_document_entities(ENTITY_COLLECTION_NAME, selected_filename) if selected_filename and not rerun else None
+    chunk_entities = vector_db_client.fetch_document_chunks(collection_name, selected_filename, properties=list(ChunkRecord.ENTITY_PROPERTY_NAMES)) if stored_entities else []
+
+    if any(has_stored_entities(chunk) for chunk in chunk_entities):
+        # Extracted once at ingestion: render from the stored chunk properties and aggregate record
+        st.info(f"Showing entities stored at ingestion for: {selected_filename}")
+        insights = [properties_to_insight(chunk) for chunk in chunk_entities]
+        for i, insight in enumerate(insights):
+            display_insight(insight, i)
+        final_insight = properties_to_insight(stored_entities)
+
+    elif selected_filename:
         st.info(f"Running entity summarizer for: {selected_filename}")
 
-        client = weaviate.connect_to_local()
-        collection = client.collections.get("Document")
-
-        # Fetch and filter chunks by filename
-        filtered_chunks = [
-            item.properties for item in collection.iterator()
-            if item.properties.get("filename") == selected_filename
-        ]
-
-        # Sort chunks by chunk_number
-        sorted_chunks = sorted(filtered_chunks, key=lambda c: c.get("chunk_number", 0))
+        # Fetch only this document's chunks, filtered and ordered by chunk_number on the server
+        sorted_chunks = vector_db_client.fetch_document_chunks(collection_name, selected_filename, properties=["content"])
 
         insights = []
 
-        for i, chunk in enumerate(sorted_chunks):
-            prev_chunks = [c["content"] for c in sorted_chunks[max(0, i - 3):i]]
-            prev_insights = [insight.model_dump() for insight in insights[max(0, i - 3):i]]
-
-            entity_input_schema = EntityAgentInputSchema(
-                chunk=chunk["content"],
-                context_so_far=prev_chunks,
-                prior_insights=prev_insights
+        if mode == "Parallel map-reduce":
+            progress = st.progress(0.0, text="Extracting entities...")
+            insights = extract_entities_parallel(
+                [chunk["content"] for chunk in sorted_chunks],
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Extracted {done}/{total} chunks")
             )
-
-            result = entity_agent.run(entity_input_schema)
-
-            insights.append(result)
-            display_insight(result, i)
-
-        # --- FINAL SUMMARY ---
+            for i, result in enumerate(insights):
+                display_insight(result, i)
+        else:
+            # One agent per run, built on first use rather than at import
+            entity_agent = create_entity_agent()
+            for i, chunk in enumerate(sorted_chunks):
+                prev_chunks = [c["content"] for c in sorted_chunks[max(0, i - 3):i]]
+                prev_insights = [insight.model_dump() for insight in insights[max(0, i - 3):i]]
+
+                entity_input_schema = EntityAgentInputSchema(
+                    chunk=chunk["content"],
+                    context_so_far=prev_chunks,
+                    prior_insights=prev_insights
+                )
+
+                result = entity_agent.run(entity_input_schema)
+
+                insights.append(result)
+                display_insight(result, i)
+
+        # In parallel mode no chunk has seen the others, so the final insight is the merged one
         if insights:
-            final_insight = insights[-1]
-            st.subheader("📘 Final Document Insight")
-            display_insight(final_insight, len(insights) - 1)
-
-            # JSON Download
-            final_json = json.dumps(final_insight.model_dump(), indent=2)
-            st.download_button(
-                label="📥 Download Final Insight as JSON",
-                data=final_json,
-                file_name=f"{selected_filename}_insight.json",
-                mime="application/json"
-            )
-
-            # Prose Summary
-            st.subheader("📝 Final Prose Summary")
-            prose_summary = generate_prose_summary(final_insight)
-            st.text(prose_summary)
+            final_insight = insights[-1] if mode == "Sequential" else reduce_insights(insights)
+
+    # --- FINAL SUMMARY ---
+    if final_insight is not None:
+        st.subheader("📘 Final Document Insight")
+        display_insight(final_insight, len(insights) - 1)
+
+        # JSON Download
+        final_json = json.dumps(final_insight.model_dump(), indent=2)
+        st.download_button(
+            label="📥 Download Final Insight as JSON",
+            data=final_json,
+            file_name=f"{selected_filename}_insight.json",
+            mime="application/json"
+        )
+
+        # Prose Summary
+        st.subheader("📝 Final Prose Summary")
+        prose_summary = generate_prose_summary(final_insight)
+        st.text(prose_summary)